@@ -1,24 +1,57 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+import re
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional
 from langchain.agents import AgentExecutor
 from langchain.tools import BaseTool
 from langchain.agents import initialize_agent, AgentType
-from langchain.memory import ConversationBufferMemory
+from langchain.agents.mrkl.prompt import PREFIX
+from langchain.memory.chat_memory import BaseChatMemory
 from langchain_core.messages import SystemMessage
+from instrumentation import InstrumentationHandler, RequestTrace, current_trace, request_metrics
+from streaming import StreamingEventHandler
+from tools.parallel_tools_tool import ParallelToolsTool
+
+# Words that refer back to earlier turns; such questions are not answered from the cache
+CONTEXT_REFERENCES = re.compile(
+    r"\b(he|she|they|him|her|them|his|hers|their|it|its|that|those|these|this|same|previous|above|again)\b",
+    re.IGNORECASE,
+)
 
 class MarketingAnalyticsAgent:
     """Core marketing analytics agent class"""
     
-    def __init__(self, tools: List[BaseTool], llm: Any, memory: ConversationBufferMemory):
+    def __init__(self, tools: List[BaseTool], llm: Any, memory: BaseChatMemory,
+                 schema_summary: Optional[str] = None, answer_cache: Any = None,
+                 data_version: Optional[Callable[[], Any]] = None, router: Any = None,
+                 parallel_tool_calls: int = 0):
         """
         Initialize the marketing analytics agent
         
         Args:
             tools: List of available tools for the agent
             llm: Language model instance
+            schema_summary: Optional graph schema description added to the prompt
+            answer_cache: Optional AnswerCache shared by the agents of the process
+            data_version: Returns the graph data version answers are cached under
+            router: Optional IntentRouter answering frequent questions without the LLM
+            parallel_tool_calls: When above 0, the agent may run several independent tool
+                calls in one step (run_tools_in_parallel), this many at a time
         """
+        if parallel_tool_calls > 0:
+            # return_direct tools end the run, so they cannot be batched with other calls
+            tools = list(tools) + [ParallelToolsTool(
+                tools=[tool for tool in tools if not tool.return_direct],
+                max_concurrency=parallel_tool_calls,
+            )]
         self.tools = tools
         self.llm = llm
         self.memory = memory
+        self.schema_summary = schema_summary
+        self.answer_cache = answer_cache
+        self.data_version = data_version or (lambda: 0)
+        self.router = router
+        # Result of the latest analyze() call, shown on the Tool Debug page
+        self.last_result = None
         self.agent_executor = self._create_agent_executor()
         
     def _create_agent_executor(self) -> AgentExecutor:
@@ -27,6 +60,11 @@ class MarketingAnalyticsAgent:
         Always resolve references like "he", "she", or "they" by checking the memory for prior user mentions.
         Use tools only if necessary and maintain context between user turns.
         """)
+        agent_kwargs = {"system_message": system_message}
+        if self.schema_summary:
+            # The prompt prefix is a template, so literal braces are escaped
+            schema = self.schema_summary.replace("{", "{{").replace("}", "}}")
+            agent_kwargs["prefix"] = f"{schema}\n\n{PREFIX}"
         return initialize_agent(
             tools=self.tools,
             llm=self.llm,
@@ -34,31 +72,142 @@ class MarketingAnalyticsAgent:
             memory=self.memory,
             verbose=True,
             handle_parsing_errors=True,
-            agent_kwargs={"system_message": system_message}, 
+            agent_kwargs=agent_kwargs,
         )
 
     
     def analyze_sync(self, query: str) -> str:
         """Synchronous analysis call"""
-        return self.agent_executor.run(query)
+        trace = RequestTrace(query)
+        token = current_trace.set(trace)
+        callbacks = [InstrumentationHandler(trace)]
+        outcome, error = "agent", None
+        try:
+            if self.router is not None and not self._depends_on_context(query):
+                routed = self.router.route(query, callbacks=callbacks)
+                if routed is not None:
+                    self.memory.save_context({"input": query}, {"output": routed["analysis"]})
+                    outcome = "router"
+                    return routed["analysis"]
+            return self.agent_executor.run(query, callbacks=callbacks)
+        except Exception as e:
+            outcome, error = "error", str(e)
+            raise
+        finally:
+            current_trace.reset(token)
+            trace.finish(outcome, error=error)
+            request_metrics.record(trace)
+
+    def _depends_on_context(self, query: str) -> bool:
+        """Whether a question may refer back to earlier turns of the conversation"""
+        return bool(self.memory.chat_memory.messages and CONTEXT_REFERENCES.search(query))
+
+    def _cacheable(self, query: str) -> bool:
+        return self.answer_cache is not None and not self._depends_on_context(query)
 
-    async def analyze(self, query: str,  chat_history: Optional[List[Dict]] = None) -> Dict[str, Any]:
+    async def analyze(self, query: str,  chat_history: Optional[List[Dict]] = None,
+                      use_cache: bool = True, use_router: bool = True,
+                      callbacks: Optional[List[Any]] = None) -> Dict[str, Any]:
         """
         Asynchronous analysis task (for use with Streamlit)
 
         Args:
             query: User's natural language request
             chat_history: Optional conversation history (currently unused)
+            use_cache: Answer from the answer cache when possible; with False the agent
+                always runs and its answer replaces the cached one
+            use_router: Let the intent router answer frequent questions without the LLM
+            callbacks: Callback handlers for the tool and LLM events of the run
 
         Returns:
-            Dictionary containing analysis result and intermediate steps
+            Dictionary containing analysis result, intermediate steps, the cache match
+            ("exact", "similar" or None), the fast-path intent (or None) and the
+            request's latency trace (see instrumentation.py)
         """
-        result = await self.agent_executor.ainvoke({"input": query})
-        return {
-            "analysis": result["output"],
-            "intermediate_steps": result.get("intermediate_steps", [])
-        }
+        trace = RequestTrace(query)
+        token = current_trace.set(trace)
+        callbacks = list(callbacks or []) + [InstrumentationHandler(trace)]
+        try:
+            output = await self._analyze(query, use_cache, use_router, callbacks)
+        except Exception as e:
+            trace.finish("error", error=str(e))
+            raise
+        else:
+            trace.finish("cache" if output["cached"] else "router" if output["routed"] else "agent")
+        finally:
+            current_trace.reset(token)
+            request_metrics.record(trace)
+        output["trace"] = trace.to_dict()
+        self.last_result = output
+        return output
+
+    async def _analyze(self, query: str, use_cache: bool, use_router: bool,
+                       callbacks: List[Any]) -> Dict[str, Any]:
+        data_version = None
+        if self._cacheable(query):
+            data_version = await asyncio.to_thread(self.data_version)
+            hit = await asyncio.to_thread(self.answer_cache.lookup, query, data_version) if use_cache else None
+            if hit is not None:
+                entry, match = hit
+                # Keep the conversation memory consistent with an agent run
+                self.memory.save_context({"input": query}, {"output": entry["analysis"]})
+                return {
+                    "analysis": entry["analysis"],
+                    "intermediate_steps": entry["intermediate_steps"],
+                    "cached": match,
+                    "routed": None,
+                }
+
+        routed = None
+        if use_router and self.router is not None and not self._depends_on_context(query):
+            routed = await self.router.aroute(query, callbacks=callbacks)
+
+        if routed is not None:
+            self.memory.save_context({"input": query}, {"output": routed["analysis"]})
+            output = dict(routed, cached=None)
+        else:
+            result = await self.agent_executor.ainvoke({"input": query}, config={"callbacks": callbacks})
+            output = {
+                "analysis": result["output"],
+                "intermediate_steps": result.get("intermediate_steps", []),
+                "cached": None,
+                "routed": None,
+            }
+        # Runs cut short by the iteration or time limit are not worth repeating
+        if data_version is not None and not output["analysis"].startswith("Agent stopped"):
+            self.answer_cache.store(query, data_version, output)
+        return output
     
+    async def astream_analyze(self, query: str, use_cache: bool = True,
+                              use_router: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run analyze() and yield its progress as it happens
+
+        Yields tool_start / tool_end / token events (see streaming.py), then a
+        {"type": "final", "result": ...} event with analyze()'s result, or an
+        {"type": "error", "error": ...} event if the run failed.
+        """
+        queue = asyncio.Queue()
+
+        async def run():
+            try:
+                result = await self.analyze(query, use_cache=use_cache, use_router=use_router,
+                                            callbacks=[StreamingEventHandler(queue)])
+                await queue.put({"type": "final", "result": result})
+            except Exception as e:
+                await queue.put({"type": "error", "error": str(e)})
+            finally:
+                await queue.put(None)
+
+        task = asyncio.create_task(run())
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            # The consumer stopped early: do not leave the run going in the background
+            if not task.done():
+                task.cancel()
+
     def get_available_tools(self) -> List[str]:
         """Get the list of available tools"""
         return [tool.name for tool in self.tools] 
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Answer cache in front of MarketingAnalyticsAgent.analyze
+
+Final answers (with their intermediate steps) are keyed by the normalized question,
+the date window it resolves to and the graph data version they were computed on, so
+an import makes earlier answers unreachable. Besides exact matches, near-identical
+wordings naming the same entities can be matched by cosine similarity of question
+embeddings held in a local numpy index.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from date_window import parse_date_window
+
+
+# Time references relative to today that parse_date_window does not resolve to dates;
+# answers to questions using them are not cached
+RELATIVE_TIME = re.compile(
+    r"\b(today|tonight|yesterday|tomorrow|recent\w*|lately|currently|now|so far|to date|ytd"
+    r"|(this|last|past|previous|next) (day|week|month|quarter|year)|\d+ (day|week|month|quarter|year)s? ago)\b",
+    re.IGNORECASE,
+)
+
+# Capitalized words that start questions rather than name something
+QUESTION_WORDS = {"how", "what", "which", "who", "whom", "whose", "when", "where", "why", "is", "was", "are",
+                  "were", "did", "does", "do", "can", "could", "show", "tell", "give", "list", "get", "find",
+                  "analyze", "analyse", "summarize", "summarise", "describe", "compare", "please", "the", "a",
+                  "an", "i"}
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case a question, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s$%.-]", " ", question.lower()).split()).strip(" .")
+
+
+def question_entities(question: str) -> frozenset:
+    """
+    Ids, quoted and capitalized names, numbers and dates of a question
+
+    A similarity match must name exactly the same ones: embeddings of questions that
+    differ only in the campaign or user they ask about score above any useful threshold.
+    """
+    quoted = re.findall(r"[\"“]([^\"”]+)[\"”]|(?<!\w)'([^']+)'(?!\w)", question)
+    entities = {("quoted", text.lower()) for pair in quoted for text in pair if text}
+    entities |= {("id", m.lower()) for m in re.findall(r"\b[A-Za-z]+_\d+\b", question)}
+    entities |= {("number", m) for m in re.findall(r"(?<![\w.])\d+(?:[.,:-]\d+)*", question)}
+    entities |= {("name", w.lower()) for w in re.findall(r"\b[A-Z][\w-]*", question)
+                 if w.lower() not in QUESTION_WORDS}
+    return frozenset(entities)
+
+
+def question_period(question: str) -> Optional[str]:
+    """
+    The date window a question names, resolved to dates ("" for none)
+
+    Relative windows ("last 7 days") resolve to different dates every day, so the
+    period is part of the cache key. Returns None for questions that cannot be
+    cached: those with a time reference that does not resolve to dates ("this week",
+    "recently") or a malformed window.
+    """
+    try:
+        text, window = parse_date_window(question)
+    except ValueError:
+        return None
+    if RELATIVE_TIME.search(text):
+        return None
+    return window.describe() if window else ""
+
+
+class AnswerCache:
+    """
+    Thread-safe bounded LRU cache of agent answers with a per-entry time-to-live
+
+    Args:
+        max_entries: Answers kept at most
+        ttl_seconds: Lifetime of an answer
+        embeddings: Optional LangChain Embeddings used for similarity matches
+        similarity_threshold: Minimum cosine similarity of a similarity match
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600.0, embeddings: Any = None,
+                 similarity_threshold: float = 0.95) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        if self.embeddings is None:
+            return None
+        try:
+            vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        except Exception as e:
+            print(f"Answer cache embedding failed, using exact matches only: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _expire(self, now: float) -> None:
+        for key in [k for k, entry in self._entries.items() if entry["expires"] <= now]:
+            del self._entries[key]
+
+    def lookup(self, question: str, data_version) -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        Return (entry, match) for a cached answer to the question on data_version, or None
+
+        match is "exact" or "similar"; entry holds the question it was computed for, its
+        analysis and intermediate_steps. A similar match must name the same entities
+        (see question_entities) and date window as the question.
+        """
+        period = question_period(question)
+        if period is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        key = (data_version, normalize_question(question), period)
+        entities = question_entities(question)
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry, "exact"
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if k[0] == data_version and k[2] == period and e["entities"] == entities
+                          and e["vector"] is not None]
+
+        vector = self._embed(key[1]) if candidates else None
+        if vector is not None:
+            keys = [k for k, _ in candidates]
+            scores = np.stack([e["vector"] for _, e in candidates]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                with self._lock:
+                    if keys[best] in self._entries:
+                        self._entries.move_to_end(keys[best])
+                    self.similar_hits += 1
+                return dict(candidates[best][1], similarity=float(scores[best])), "similar"
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, question: str, data_version, result: Dict[str, Any]) -> None:
+        """Cache an answer, unless the question's period cannot be pinned down (see question_period)"""
+        period = question_period(question)
+        if period is None:
+            return
+        normalized = normalize_question(question)
+        key = (data_version, normalized, period)
+        entry = {
+            "question": question,
+            "analysis": result["analysis"],
+            "intermediate_steps": result.get("intermediate_steps", []),
+            "entities": question_entities(question),
+            "vector": self._embed(normalized),
+            "expires": time.monotonic() + self.ttl_seconds,
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "similarity_matching": self.embeddings is not None,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 3) if lookups else 0.0,
+        }
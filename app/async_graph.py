@@ -0,0 +1,108 @@
+"""
+Async Neo4j client for the tools' native _arun implementations
+
+AsyncNeo4jGraph exposes `await query(query, params)` with the same result shape as
+Neo4jGraph.query, on top of the Neo4j async driver and its connection pool, so
+concurrent sessions and concurrent tool calls overlap their database round trips
+instead of blocking the event loop.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List
+
+from neo4j import AsyncGraphDatabase, Query, RoutingControl
+
+from query_cache import DATA_VERSION_ID, READ_DATA_VERSION, CachedGraph, cache_key, is_write_query
+
+
+class AsyncNeo4jGraph:
+    """
+    Pooled async Neo4j client
+
+    Async drivers are bound to the event loop they run on, and Streamlit starts a new
+    loop on every rerun, so the driver lives on one long-lived loop in a background
+    thread. Callers on any loop await their work on it, and the process keeps a single
+    pool of up to max_connection_pool_size connections.
+    """
+
+    def __init__(self, url: str, username: str, password: str, database: str = None,
+                 max_connection_pool_size: int = 50, connection_acquisition_timeout: float = 60.0,
+                 timeout: float = None) -> None:
+        self.url = url
+        self.auth = (username, password)
+        self.database = database
+        self.timeout = timeout
+        self.driver_config = {
+            "max_connection_pool_size": max_connection_pool_size,
+            "connection_acquisition_timeout": connection_acquisition_timeout,
+        }
+        self._loop = None
+        self._driver = None
+        self._lock = threading.Lock()
+
+    def _driver_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="neo4j-async-driver", daemon=True).start()
+            return self._loop
+
+    async def _with_driver(self, work: Callable[[Any], Awaitable[Any]]):
+        # Runs on the driver loop, the only place the driver is created or used
+        if self._driver is None:
+            self._driver = AsyncGraphDatabase.driver(self.url, auth=self.auth, **self.driver_config)
+        return await work(self._driver)
+
+    async def run(self, work: Callable[[Any], Awaitable[Any]]):
+        """Await work(driver) on the driver's loop from any event loop"""
+        future = asyncio.run_coroutine_threadsafe(self._with_driver(work), self._driver_loop())
+        return await asyncio.wrap_future(future)
+
+    async def query(self, query: str, params: dict = {}) -> List[Dict[str, Any]]:
+        routing = RoutingControl.WRITE if is_write_query(query) else RoutingControl.READ
+
+        async def execute(driver):
+            records, _, _ = await driver.execute_query(
+                Query(text=query, timeout=self.timeout),
+                parameters_=params,
+                routing_=routing,
+                database_=self.database,
+            )
+            return [record.data() for record in records]
+
+        return await self.run(execute)
+
+    async def close(self) -> None:
+        """Close the driver; the next query opens a new one"""
+        if self._loop is None:
+            return
+
+        async def close_driver():
+            driver, self._driver = self._driver, None
+            if driver is not None:
+                await driver.close()
+
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(close_driver(), self._loop))
+
+
+class AsyncCachedGraph(CachedGraph):
+    """CachedGraph over an AsyncNeo4jGraph: the same QueryCache logic, awaiting the graph"""
+
+    async def _sync_data_version(self) -> None:
+        if self._version_check_due():
+            rows = await self.graph.query(READ_DATA_VERSION, params={"id": DATA_VERSION_ID})
+            self._set_data_version(rows[0]["version"])
+
+    async def query(self, query: str, params: dict = {}) -> List[Dict[str, Any]]:
+        if is_write_query(query):
+            result = await self.graph.query(query, params=params)
+            self.invalidate()
+            return result
+
+        await self._sync_data_version()
+        key = cache_key(query, params)
+        hit, result = self._cached(key)
+        if not hit:
+            result = await self.graph.query(query, params=params)
+            self._store(key, result)
+        return result
@@ -0,0 +1,158 @@
+"""
+Headless batch runner for analysis questions
+
+Reads questions from a text file (one per line, '#' comments skipped) or JSONL (one
+object per line with a question / query / input / text / title field, an optional
+id and an optional session), answers them with MarketingAnalyticsAgent.analyze and
+writes one JSONL record per question with its answer, intermediate steps, latency
+and trace. Every session gets its own agent and conversation memory: questions
+sharing a session run in order on one agent, every other question runs alone.
+Sessions run concurrently, at most --concurrency at a time.
+
+    python app/batch_runner.py example_questions.txt --out answers.jsonl --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from main import init_agent
+
+
+QUESTION_FIELDS = ["question", "query", "input", "text", "title"]
+ID_FIELDS = ["id", "question_id", "request_id"]
+
+
+def read_questions(path, field: str = None) -> List[Dict[str, Any]]:
+    """
+    Read questions as [{id, session, question}] from a .jsonl file or a plain text file
+
+    Args:
+        path: Input file; .jsonl / .ndjson files are read as JSON lines
+        field: JSONL field holding the question (default: the first of QUESTION_FIELDS present)
+    """
+    path = Path(path)
+    questions = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.suffix not in (".jsonl", ".ndjson"):
+                questions.append({"id": str(line_number), "session": None, "question": line})
+                continue
+            record = json.loads(line)
+            fields = [field] if field else QUESTION_FIELDS
+            question = next((record[f] for f in fields if record.get(f)), None)
+            if question is None:
+                raise ValueError(f"{path}:{line_number}: no question field ({', '.join(fields)})")
+            question_id = next((record[f] for f in ID_FIELDS if record.get(f) is not None), line_number)
+            questions.append({"id": str(question_id), "session": record.get("session"), "question": question})
+    return questions
+
+
+def _sessions(questions: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group questions by session, keeping the input order; unsessioned questions run alone"""
+    sessions, by_key = [], {}
+    for question in questions:
+        if question["session"] is None:
+            sessions.append([question])
+        elif question["session"] in by_key:
+            by_key[question["session"]].append(question)
+        else:
+            by_key[question["session"]] = [question]
+            sessions.append(by_key[question["session"]])
+    return sessions
+
+
+def _steps(intermediate_steps) -> List[Dict[str, Any]]:
+    return [{"tool": action.tool, "tool_input": action.tool_input, "observation": observation}
+            for action, observation in intermediate_steps]
+
+
+async def _answer(agent, question: Dict[str, Any], use_cache: bool, use_router: bool,
+                  timeout: float) -> Dict[str, Any]:
+    record = {"id": question["id"], "session": question["session"], "question": question["question"]}
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(
+            agent.analyze(question["question"], use_cache=use_cache, use_router=use_router), timeout)
+        record.update(
+            answer=result["analysis"],
+            cached=result["cached"],
+            routed=result["routed"],
+            intermediate_steps=_steps(result["intermediate_steps"]),
+            trace={k: v for k, v in result["trace"].items() if k not in ("question", "steps")},
+            error=None,
+        )
+    except asyncio.TimeoutError:
+        record.update(answer=None, error=f"Timed out after {timeout}s")
+    except Exception as e:
+        record.update(answer=None, error=str(e))
+    record["latency_ms"] = round(1000 * (time.perf_counter() - started), 1)
+    return record
+
+
+async def run_batch(questions: List[Dict[str, Any]], out_path, concurrency: int = 4, use_cache: bool = True,
+                    use_router: bool = True, timeout: float = 300.0) -> Dict[str, Any]:
+    """
+    Answer the questions and write their records to out_path as they finish
+
+    Returns throughput and latency statistics of the batch.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    lock = asyncio.Lock()
+    records = []
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    async def run_session(session, out):
+        async with semaphore:
+            # A fresh agent per session keeps conversation memory isolated
+            agent = await asyncio.to_thread(init_agent)
+            for question in session:
+                record = await _answer(agent, question, use_cache, use_router, timeout)
+                async with lock:
+                    records.append(record)
+                    out.write(json.dumps(record, default=str) + "\n")
+                    out.flush()
+                status = "error" if record["error"] else "ok"
+                print(f"[{len(records)}/{len(questions)}] {record['id']} {status} in {record['latency_ms']} ms")
+
+    started = time.perf_counter()
+    with open(out_path, "w") as out:
+        await asyncio.gather(*(run_session(session, out) for session in _sessions(questions)))
+    seconds = time.perf_counter() - started
+
+    latencies = sorted(r["latency_ms"] for r in records)
+    return {
+        "questions": len(records),
+        "errors": sum(1 for r in records if r["error"]),
+        "cached": sum(1 for r in records if r.get("cached")),
+        "routed": sum(1 for r in records if r.get("routed")),
+        "seconds": round(seconds, 2),
+        "questions_per_sec": round(len(records) / seconds, 3) if seconds else 0.0,
+        "p50_latency_ms": statistics.median(latencies) if latencies else 0.0,
+        "p95_latency_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a file of questions with the analytics agent")
+    parser.add_argument("input", help="questions: .txt (one per line) or .jsonl")
+    parser.add_argument("--out", required=True, help="output JSONL path")
+    parser.add_argument("--field", help="JSONL field holding the question")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions answered at the same time")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds allowed per question")
+    parser.add_argument("--no-cache", action="store_true", help="always run the agent instead of the answer cache")
+    parser.add_argument("--no-router", action="store_true", help="send every question to the agent")
+    args = parser.parse_args()
+
+    questions = read_questions(args.input, field=args.field)
+    print(f"Answering {len(questions)} questions with concurrency {args.concurrency}")
+    stats = asyncio.run(run_batch(questions, args.out, concurrency=args.concurrency, use_cache=not args.no_cache,
+                                  use_router=not args.no_router, timeout=args.timeout))
+    print(json.dumps(stats, indent=2))
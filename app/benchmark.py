@@ -0,0 +1,230 @@
+"""
+Loader and tool benchmarks on synthetic graphs of increasing size
+
+For every scale of synthetic_graph, the suite generates a graph, loads it and times:
+  - loading: insert_data (bulk, and the legacy per-row path on small graphs) against
+    Neo4j, or building the in-process MemoryGraph
+  - each analysis tool's _run on the largest campaign, the most active user, the
+    campaign ranking and the schema (and graph_query on Neo4j)
+  - GraphQueryTool._format_output on result sets of increasing size
+Results are written as JSON; compare_results reports the timings that got slower
+than a saved baseline.
+
+    python app/benchmark.py --scales tiny small medium --out data/benchmarks/latest.json \
+        --compare data/benchmarks/baseline.json
+
+The Neo4j backend replaces the contents of the configured database, so it only runs
+with --allow-wipe.
+"""
+import argparse
+import datetime
+import json
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from synthetic_graph import SCALES, generate_graph
+from memory_graph import MemoryGraph
+from tools.analyze_campaign_tool import AnalyzeCampaignTool
+from tools.analyze_userBehavior_tool import AnalyzeUserBehaviorTool
+from tools.graph_query_tool import GraphQueryTool
+from tools.rank_campaigns_tool import RankCampaignsTool
+from tools.schema_tool import SchemaTool
+
+
+DEFAULT_RESULTS_DIR = Path(__file__).resolve().parent.parent / "data" / "benchmarks"
+
+# The legacy insert path runs one statement per row, so it is only timed on small graphs
+LEGACY_INSERT_MAX_RELATIONSHIPS = 5_000
+
+FORMAT_OUTPUT_ROWS = [50, 1_000, 10_000]
+
+# Date window of the windowed tool cases, inside the synthetic graphs' year
+WINDOW = "from 2024-06-01 to 2024-06-30"
+
+WIPE_QUERY = "MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS"
+
+GRAPH_QUERY_BENCHMARK = """
+MATCH (u:User)-[v:VIEWED]->(a:Ad)-[:PART_OF]->(c:Campaign)
+RETURN c.name AS campaign, count(DISTINCT u) AS viewers, sum(v.view_count) AS views
+ORDER BY views DESC
+"""
+
+
+def _time(fn: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        durations.append(1000 * (time.perf_counter() - started))
+    return {"median_ms": round(statistics.median(durations), 3), "min_ms": round(min(durations), 3),
+            "runs": repeats}
+
+
+def _busiest(data: dict, label: str, position: str) -> str:
+    """Id of the node with the most relationships of the given type at the given end"""
+    counts = Counter(r[position] for r in data["relationships"] if r["label"] == label)
+    return counts.most_common(1)[0][0]
+
+
+def _format_rows(data: dict, size: int) -> List[Dict[str, Any]]:
+    """Rows shaped like graph_query results: node property maps, node / relationship maps and scalars"""
+    users = [n for n in data["nodes"] if n["label"] == "User"]
+    views = [r for r in data["relationships"] if r["label"] == "VIEWED"]
+    rows = []
+    for i in range(size):
+        user, view = users[i % len(users)], views[i % len(views)]
+        rows.append({
+            "u": user["properties"],
+            "a": {"labels": ["Ad"], "properties": {"id": view["to"]}},
+            "v": {"type": "VIEWED", "properties": view["properties"]},
+            "views": view["properties"]["view_count"],
+        })
+    return rows
+
+
+def _wipe(neo4j_graph) -> None:
+    neo4j_graph.query(WIPE_QUERY)
+
+
+def _load_neo4j(data: dict, repeats: int) -> tuple:
+    from connections import get_graph
+    from data_loader import insert_data
+
+    cached = get_graph()
+    # Time the database itself: the tools below bypass the shared query cache
+    graph = cached.graph
+    timings = {}
+    if len(data["relationships"]) <= LEGACY_INSERT_MAX_RELATIONSHIPS:
+        _wipe(graph)
+        timings["insert_data_legacy"] = _time(lambda: insert_data(data, graph), 1)
+    _wipe(graph)
+    timings["insert_data_bulk"] = _time(lambda: insert_data(data, graph, bulk=True), 1)
+    cached.invalidate()
+    return graph, timings
+
+
+def _load_memory(data: dict, repeats: int) -> tuple:
+    built = {}
+    timings = {"memory_graph_build": _time(
+        lambda: built.update(graph=MemoryGraph(data["nodes"], data["relationships"])), repeats)}
+    return built["graph"], timings
+
+
+def benchmark_scale(scale: str, backend: str = "memory", repeats: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """Generate, load and benchmark one scale; returns its timings"""
+    started = time.perf_counter()
+    data = generate_graph(scale, seed=seed)
+    result = {
+        "nodes": len(data["nodes"]),
+        "relationships": len(data["relationships"]),
+        "generate_ms": round(1000 * (time.perf_counter() - started), 3),
+    }
+    print(f"[{scale}] {result['nodes']} nodes, {result['relationships']} relationships")
+
+    graph, result["load"] = (_load_neo4j if backend == "neo4j" else _load_memory)(data, repeats)
+
+    campaign = _busiest(data, "PART_OF", "to")
+    user = _busiest(data, "VIEWED", "from")
+    campaign_tool = AnalyzeCampaignTool(neo4j_graph=graph)
+    user_tool = AnalyzeUserBehaviorTool(neo4j_graph=graph)
+    rank_tool = RankCampaignsTool(neo4j_graph=graph)
+    schema_tool = SchemaTool(neo4j_graph=graph)
+    graph_query_tool = GraphQueryTool(neo4j_graph=graph)
+
+    cases = {
+        "analyze_campaign[largest]": lambda: campaign_tool._run(campaign),
+        "analyze_campaign[largest, 1 month]": lambda: campaign_tool._run(f"{campaign}; {WINDOW}"),
+        "analyze_user_behavior[most_active]": lambda: user_tool._run(user),
+        "analyze_user_behavior[most_active, 1 month]": lambda: user_tool._run(f"{user}; {WINDOW}"),
+        "rank_campaigns[roi]": lambda: rank_tool._run("metric=roi; top=10"),
+        "schema_tool": lambda: schema_tool._run(""),
+    }
+    if backend == "neo4j":
+        cases["graph_query[views_by_campaign]"] = lambda: graph_query_tool._run(GRAPH_QUERY_BENCHMARK)
+    result["tools"] = {name: _time(fn, repeats) for name, fn in cases.items()}
+
+    result["format_output"] = {}
+    for size in FORMAT_OUTPUT_ROWS:
+        rows = _format_rows(data, size)
+        result["format_output"][f"rows_{size}"] = _time(lambda: graph_query_tool._format_output(rows), repeats)
+
+    for section in ("load", "tools", "format_output"):
+        for name, timing in result[section].items():
+            print(f"[{scale}] {section}/{name}: {timing['median_ms']} ms")
+    return result
+
+
+def run_benchmarks(scales: List[str] = ("tiny", "small", "medium"), backend: str = "memory",
+                   repeats: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """Benchmark every scale in turn"""
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "backend": backend,
+        "repeats": repeats,
+        "seed": seed,
+        "scales": {scale: benchmark_scale(scale, backend, repeats, seed) for scale in scales},
+    }
+
+
+def _timings(results: Dict[str, Any]) -> Dict[str, float]:
+    flat = {}
+    for scale, result in results["scales"].items():
+        for section in ("load", "tools", "format_output"):
+            for name, timing in result.get(section, {}).items():
+                flat[f"{scale}/{section}/{name}"] = timing["median_ms"]
+    return flat
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 1.25,
+                    min_ms: float = 1.0) -> List[Dict[str, Any]]:
+    """
+    Timings at least tolerance times slower than in the baseline
+
+    Timings below min_ms in both runs are ignored, since they are mostly noise.
+    """
+    before, after = _timings(baseline), _timings(current)
+    regressions = []
+    for key in sorted(before.keys() & after.keys()):
+        if max(before[key], after[key]) < min_ms:
+            continue
+        ratio = after[key] / before[key] if before[key] else float("inf")
+        if ratio >= tolerance:
+            regressions.append({"benchmark": key, "baseline_ms": before[key], "current_ms": after[key],
+                                "ratio": round(ratio, 2)})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the loader and tools on synthetic graphs")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["tiny", "small", "medium"])
+    parser.add_argument("--backend", choices=["memory", "neo4j"], default="memory")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="results JSON path (default: data/benchmarks/<backend>-<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline results JSON to report regressions against")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="slowdown ratio reported as a regression (default 1.25)")
+    parser.add_argument("--allow-wipe", action="store_true",
+                        help="allow the neo4j backend to delete everything in the configured database")
+    args = parser.parse_args()
+
+    if args.backend == "neo4j" and not args.allow_wipe:
+        parser.error("the neo4j backend deletes the configured database's contents; pass --allow-wipe")
+
+    results = run_benchmarks(args.scales, args.backend, args.repeats, args.seed)
+    out = Path(args.out) if args.out else \
+        DEFAULT_RESULTS_DIR / f"{args.backend}-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {out}")
+
+    if args.compare:
+        regressions = compare_results(results, json.loads(Path(args.compare).read_text()), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['benchmark']}: {r['baseline_ms']} ms -> {r['current_ms']} ms ({r['ratio']}x)")
+        print(f"{len(regressions)} regression(s) against {args.compare}")
+        if regressions:
+            raise SystemExit(1)
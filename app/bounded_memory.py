@@ -0,0 +1,97 @@
+"""
+Token-budgeted conversation memory shared by the agent and fallback_tool
+
+The most recent turns are kept verbatim within a token budget and a message window;
+older turns are folded into a rolling LLM-written summary. Token counts and the
+rendered history text are maintained per message as turns are added, so neither
+pruning nor rendering re-processes the whole session.
+"""
+from typing import List, Optional
+
+from langchain.memory import ConversationSummaryBufferMemory
+from langchain_core.messages import BaseMessage
+from pydantic import PrivateAttr
+
+
+class BoundedConversationMemory(ConversationSummaryBufferMemory):
+    """
+    ConversationSummaryBufferMemory with a message window and incremental bookkeeping
+
+    max_token_limit bounds the tokens of the verbatim turns and max_messages their
+    number; rendered_history() returns the summary and turns as prompt text.
+    """
+
+    max_messages: int = 20
+
+    _token_counts: List[int] = PrivateAttr(default_factory=list)
+    _lines: List[str] = PrivateAttr(default_factory=list)
+    _rendered: Optional[str] = PrivateAttr(default=None)
+
+    def _count_tokens(self, message: BaseMessage) -> int:
+        try:
+            tokens = self.llm.get_num_tokens(message.content)
+        except Exception:
+            # Tokenizer unavailable (e.g. offline): approximate with 4 characters per token
+            tokens = len(message.content) // 4
+        # Role and message framing overhead
+        return tokens + 4
+
+    @staticmethod
+    def _render(message: BaseMessage) -> str:
+        return f"{message.type.title()}: {message.content}\n"
+
+    def _sync(self) -> None:
+        """Account for the messages added to chat_memory since the last call"""
+        messages = self.chat_memory.messages
+        if len(self._token_counts) > len(messages):
+            # The history was replaced or cleared outside this class
+            self._token_counts, self._lines, self._rendered = [], [], None
+        new_messages = messages[len(self._token_counts):]
+        if not new_messages:
+            return
+        new_lines = [self._render(message) for message in new_messages]
+        self._token_counts.extend(self._count_tokens(message) for message in new_messages)
+        self._lines.extend(new_lines)
+        if self._rendered is not None:
+            self._rendered += "".join(new_lines)
+
+    def _pop_excess(self) -> List[BaseMessage]:
+        self._sync()
+        messages = self.chat_memory.messages
+        total = sum(self._token_counts)
+        pruned = []
+        while messages and (total > self.max_token_limit or len(messages) > self.max_messages):
+            pruned.append(messages.pop(0))
+            total -= self._token_counts.pop(0)
+            self._lines.pop(0)
+        return pruned
+
+    def prune(self) -> None:
+        """Fold the turns beyond the token budget or message window into the summary"""
+        pruned = self._pop_excess()
+        if pruned:
+            self.moving_summary_buffer = self.predict_new_summary(pruned, self.moving_summary_buffer)
+            self._rendered = None
+
+    async def aprune(self) -> None:
+        pruned = self._pop_excess()
+        if pruned:
+            self.moving_summary_buffer = await self.apredict_new_summary(pruned, self.moving_summary_buffer)
+            self._rendered = None
+
+    def rendered_history(self) -> str:
+        """The summary of older turns followed by the recent turns, one 'Role: text' line each"""
+        self._sync()
+        if self._rendered is None:
+            summary = f"Summary of earlier conversation: {self.moving_summary_buffer}\n" \
+                if self.moving_summary_buffer else ""
+            self._rendered = summary + "".join(self._lines)
+        return self._rendered
+
+    def clear(self) -> None:
+        super().clear()
+        self._token_counts, self._lines, self._rendered = [], [], None
+
+    async def aclear(self) -> None:
+        await super().aclear()
+        self._token_counts, self._lines, self._rendered = [], [], None
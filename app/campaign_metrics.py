@@ -0,0 +1,222 @@
+from typing import Any, Dict
+
+
+CAMPAIGN_FULLTEXT_MATCH = """
+    CALL db.index.fulltext.queryNodes($name_index, $search) YIELD node, score
+    RETURN node AS c, 2 AS priority, score
+"""
+
+# Stand-in for the full-text lookup on a database created before the index existed
+CAMPAIGN_SCAN_MATCH = """
+    MATCH (c:Campaign) WHERE toLower(c.name) CONTAINS toLower($campaign_name)
+    RETURN c, 2 AS priority, 0.0 AS score
+"""
+
+# Resolve one campaign from free input through the id constraint, the name text
+# index and the name full-text index, preferring exact matches over fuzzy ones.
+# Expects $campaign_name, $search (see graph_schema.fulltext_search_term) and $name_index.
+CAMPAIGN_LOOKUP = """
+CALL {
+    MATCH (c:Campaign {id: $campaign_name}) RETURN c, 0 AS priority, 0.0 AS score
+    UNION
+    MATCH (c:Campaign {name: $campaign_name}) RETURN c, 1 AS priority, 0.0 AS score
+    UNION""" + CAMPAIGN_FULLTEXT_MATCH + """}
+WITH c, min(priority) AS priority, max(score) AS score
+ORDER BY priority, score DESC
+LIMIT 1
+"""
+
+# Metrics of the campaign bound to `c`. Each metric is computed along its own path in
+# a separate subquery and aggregated once, so the work is linear in the campaign's
+# edges instead of the targets x ads x viewers x clickers x conversions cross product:
+#   - views: VIEWED edges into the campaign's ads
+#   - clicks / total_clicks: CLICKED edges (and their click_count) from users who also
+#     viewed the ad
+#   - conversions / total_conversion_value: distinct products converted by the
+#     campaign's distinct viewers, and the value of those conversions
+CAMPAIGN_TARGETS = """
+CALL {
+    WITH c
+    OPTIONAL MATCH (c)-[:TARGETS]->(d:Demographic)
+    RETURN collect(DISTINCT d.age_group + "-" + d.gender) AS targets
+}
+"""
+
+CAMPAIGN_COUNTERS = """
+CALL {
+    WITH c
+    MATCH (a:Ad)-[:PART_OF]->(c)
+    CALL {
+        WITH a
+        OPTIONAL MATCH (u:User)-[cl:CLICKED]->(a)
+        WHERE EXISTS { (u)-[:VIEWED]->(a) }
+        RETURN count(cl) AS ad_clicks, sum(toInteger(cl.click_count)) AS ad_total_clicks
+    }
+    WITH a, ad_clicks, ad_total_clicks, COUNT { (:User)-[:VIEWED]->(a) } AS ad_views
+    RETURN count(a) AS ad_count,
+           sum(ad_views) AS views,
+           sum(ad_clicks) AS clicks,
+           sum(ad_total_clicks) AS total_clicks
+}
+CALL {
+    WITH c
+    MATCH (u:User)-[:VIEWED]->(:Ad)-[:PART_OF]->(c)
+    WITH DISTINCT u
+    OPTIONAL MATCH (u)-[conv:CONVERTED]->(p:Product)
+    RETURN count(DISTINCT p) AS conversions,
+           sum(toFloat(conv.conversion_value)) AS total_conversion_value
+}
+"""
+
+# The same counters restricted to engagement dated inside [$since, $until]: views by
+# date_first_viewed, clicks by date_last_clicked and conversions by conversion_date.
+# The view and click edges are found through their date range indexes and joined to
+# the campaign's ads, so a narrow window only reads the edges inside it.
+CAMPAIGN_WINDOW_COUNTERS = """
+CALL {
+    WITH c
+    OPTIONAL MATCH (a:Ad)-[:PART_OF]->(c)
+    RETURN count(a) AS ad_count, collect(a) AS ads
+}
+CALL {
+    WITH ads
+    MATCH (:User)-[v:VIEWED]->(a:Ad)
+    WHERE v.date_first_viewed >= $since AND v.date_first_viewed <= $until AND a IN ads
+    RETURN count(v) AS views
+}
+CALL {
+    WITH ads
+    MATCH (u:User)-[cl:CLICKED]->(a:Ad)
+    WHERE cl.date_last_clicked >= $since AND cl.date_last_clicked <= $until AND a IN ads
+      AND EXISTS { (u)-[:VIEWED]->(a) }
+    RETURN count(cl) AS clicks, sum(toInteger(cl.click_count)) AS total_clicks
+}
+CALL {
+    WITH ads
+    UNWIND ads AS a
+    MATCH (u:User)-[:VIEWED]->(a)
+    WITH DISTINCT u
+    MATCH (u)-[conv:CONVERTED]->(p:Product)
+    WHERE conv.conversion_date >= $since AND conv.conversion_date <= $until
+    RETURN count(DISTINCT p) AS conversions,
+           sum(toFloat(conv.conversion_value)) AS total_conversion_value
+}
+"""
+
+# Counters stored on the (:CampaignStats {id}) rollup node of each campaign
+CAMPAIGN_COUNTER_FIELDS = ["ad_count", "views", "clicks", "total_clicks", "conversions", "total_conversion_value"]
+
+CAMPAIGN_METRICS_RETURN = """
+RETURN
+    c.id AS campaign_id,
+    c.name AS campaign_name,
+    c.start_date AS start,
+    c.end_date AS end,
+    c.campaign_budget AS budget,
+    targets,
+    ad_count,
+    views,
+    clicks,
+    total_clicks,
+    conversions,
+    total_conversion_value
+"""
+
+CAMPAIGN_METRICS = CAMPAIGN_TARGETS + CAMPAIGN_COUNTERS + CAMPAIGN_METRICS_RETURN
+
+# Same row as CAMPAIGN_METRICS, with the counters read from the campaign's rollup node
+CAMPAIGN_ROLLUP = CAMPAIGN_TARGETS + """
+OPTIONAL MATCH (s:CampaignStats {id: c.id})
+RETURN
+    s IS NOT NULL AS has_rollup,
+    c.id AS campaign_id,
+    c.name AS campaign_name,
+    c.start_date AS start,
+    c.end_date AS end,
+    c.campaign_budget AS budget,
+    targets,
+    s.ad_count AS ad_count,
+    s.views AS views,
+    s.clicks AS clicks,
+    s.total_clicks AS total_clicks,
+    s.conversions AS conversions,
+    s.total_conversion_value AS total_conversion_value
+"""
+
+CAMPAIGN_METRICS_QUERY = CAMPAIGN_LOOKUP + CAMPAIGN_METRICS
+
+CAMPAIGN_ROLLUP_QUERY = CAMPAIGN_LOOKUP + CAMPAIGN_ROLLUP
+
+# Campaign metrics within a date window; rollups hold all-time counters, so always live
+CAMPAIGN_WINDOW_QUERY = CAMPAIGN_LOOKUP + CAMPAIGN_TARGETS + CAMPAIGN_WINDOW_COUNTERS + CAMPAIGN_METRICS_RETURN
+
+ALL_CAMPAIGN_METRICS_QUERY = "MATCH (c:Campaign)" + CAMPAIGN_METRICS
+
+# Counters of every campaign read from the rollups in one pass, for cross-campaign ranking
+CAMPAIGN_LEADERBOARD_QUERY = """
+MATCH (c:Campaign)
+OPTIONAL MATCH (s:CampaignStats {id: c.id})
+RETURN
+    s IS NOT NULL AS has_rollup,
+    c.id AS campaign_id,
+    c.name AS campaign_name,
+    c.campaign_budget AS budget,
+    s.ad_count AS ad_count,
+    s.views AS views,
+    s.clicks AS clicks,
+    s.total_clicks AS total_clicks,
+    s.conversions AS conversions,
+    s.total_conversion_value AS total_conversion_value
+"""
+
+
+def _date_text(value):
+    """ISO text of a date property (a Neo4j DATE or a string from an older import)"""
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def campaign_scan_query(query: str) -> str:
+    """A CAMPAIGN_LOOKUP based query with the full-text lookup replaced by a label scan"""
+    return query.replace(CAMPAIGN_FULLTEXT_MATCH, CAMPAIGN_SCAN_MATCH)
+
+
+def campaign_result(r: Dict[str, Any], window=None) -> Dict[str, Any]:
+    """
+    Build the analyze_campaign result dict from a campaign metrics row
+
+    With a date_window.DateWindow the counters are those of the window, which the
+    result and its summary state.
+    """
+    roi = (
+        float(r["total_conversion_value"] or 0) / float(r["budget"])
+        if r["budget"] not in (None, 0, "N/A") else None
+    )
+    total_clicks = r["total_clicks"] or 0
+    total_conversion_value = float(r["total_conversion_value"] or 0)
+    start, end = _date_text(r.get("start", "N/A")), _date_text(r.get("end", "N/A"))
+    period = f"{window.describe().capitalize()} it" if window else "It"
+
+    result = {
+        "campaign_name": r.get("campaign_name", "Unknown"),
+        "start_date": start,
+        "end_date": end,
+        "budget": r.get("budget", "N/A"),
+        "target_demographics": r.get("targets", []),
+        "ad_count": r["ad_count"],
+        "views": r["views"],
+        "clicks": r["clicks"],
+        "total_clicks": total_clicks,
+        "conversions": r["conversions"],
+        "total_conversion_value": total_conversion_value,
+        "roi": round(roi, 2) if roi is not None else "N/A",
+        "summary": (
+            f"Campaign '{r.get('campaign_name')}' ran from {start} to {end} "
+            f"with ${r.get('budget')} budget, targeting {', '.join(r.get('targets', []))}. "
+            f"{period} had {r['ad_count']} ads, {r['views']} views, {total_clicks} clicks, and "
+            f"{r['conversions']} conversions totaling ${total_conversion_value:.2f}. "
+            f"ROI: {round(roi, 2) if roi else 'N/A'}."
+        )
+    }
+    if window:
+        result["date_window"] = window.describe()
+    return result
@@ -0,0 +1,115 @@
+"""
+Process-wide registry of graph connections
+
+Every Streamlit session, agent, tool and loader call shares the objects created here
+instead of opening its own driver. They are created lazily, on first use, so
+importing the app does not touch the database. Neo4jGraph is created with
+refresh_schema=False: nothing reads its schema string, and the schema tool queries
+the schema itself when asked.
+"""
+import os
+import threading
+from pathlib import Path
+
+from dotenv import load_dotenv
+from langchain_community.graphs import Neo4jGraph
+
+from async_graph import AsyncCachedGraph, AsyncNeo4jGraph
+from graph_schema import report_missing_schema
+from query_cache import CachedGraph, QueryCache
+from schema_snapshot import SCHEMA_SNAPSHOT_PATH, SchemaSnapshot
+
+
+ENV_PATH = Path(__file__).parent.parent / "config" / ".env_loader"
+load_dotenv(dotenv_path=ENV_PATH)
+
+# Result cache shared by the tools of every agent in this process
+query_cache = QueryCache(
+    max_entries=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("QUERY_CACHE_TTL", "300")),
+)
+
+_lock = threading.Lock()
+_graph = None
+_async_graph = None
+_memory_graph = None
+_schema_snapshot = None
+
+
+def _credentials() -> dict:
+    url = os.getenv("NEO4J_URI")
+    username = os.getenv("NEO4J_USERNAME")
+    password = os.getenv("NEO4J_PASSWORD")
+    if not all([url, username, password]):
+        raise ValueError(f"Please make sure NEO4J_URI, NEO4J_USERNAME, and NEO4J_PASSWORD are set in {ENV_PATH}")
+    return {"url": url, "username": username, "password": password, "database": os.getenv("NEO4J_DATABASE")}
+
+
+def get_graph() -> CachedGraph:
+    """
+    Return the shared Neo4j client, connecting on the first call
+
+    The client is wrapped in a CachedGraph on the shared query_cache, so writes made
+    through it (imports, rollup refreshes) invalidate cached tool results right away.
+    """
+    global _graph
+    with _lock:
+        if _graph is None:
+            credentials = _credentials()
+            graph = Neo4jGraph(
+                url=credentials["url"],
+                username=credentials["username"],
+                password=credentials["password"],
+                database=credentials["database"],
+                refresh_schema=False,
+                driver_config={"max_connection_pool_size": int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))},
+            )
+            print(f"Connected to Neo4j at {credentials['url']}")
+            report_missing_schema(graph)
+            _graph = CachedGraph(graph, cache=query_cache)
+        return _graph
+
+
+def get_async_graph() -> AsyncCachedGraph:
+    """Return the shared pooled async Neo4j client (its drivers connect on first query)"""
+    global _async_graph
+    with _lock:
+        if _async_graph is None:
+            credentials = _credentials()
+            _async_graph = AsyncCachedGraph(AsyncNeo4jGraph(
+                url=credentials["url"],
+                username=credentials["username"],
+                password=credentials["password"],
+                database=credentials["database"],
+                max_connection_pool_size=int(os.getenv("NEO4J_MAX_POOL_SIZE", "50")),
+            ), cache=query_cache)
+        return _async_graph
+
+
+def get_memory_graph():
+    """Return the shared in-process graph backend (GRAPH_BACKEND=memory), loading it once"""
+    global _memory_graph
+    with _lock:
+        if _memory_graph is None:
+            from memory_graph import MemoryGraph
+            from data_loader import DEFAULT_DATA_PATH
+            _memory_graph = MemoryGraph.from_file(os.getenv("GRAPH_DATA_PATH", str(DEFAULT_DATA_PATH)))
+        return _memory_graph
+
+
+def get_schema_snapshot() -> SchemaSnapshot:
+    """
+    Return the shared schema snapshot of the configured backend
+
+    The Neo4j snapshot is persisted next to the data; the memory backend's is kept in
+    memory, since it is rebuilt from the data file with every process.
+    """
+    global _schema_snapshot
+    with _lock:
+        if _schema_snapshot is None:
+            _schema_snapshot = SchemaSnapshot(None if use_memory_graph() else SCHEMA_SNAPSHOT_PATH)
+        return _schema_snapshot
+
+
+def use_memory_graph() -> bool:
+    return os.getenv("GRAPH_BACKEND", "neo4j").lower() == "memory"
@@ -0,0 +1,168 @@
+"""
+Literal-to-parameter rewriting for LLM-written Cypher
+
+Neo4j caches compiled plans by query text, so `WHERE u.age > 30` and
+`WHERE u.age > 40` are planned separately. parameterize_cypher lifts string and
+number literals into parameters, upper-cases keywords and collapses whitespace, so
+questions of the same shape send the same text and reuse one cached plan.
+PlanCacheStats counts how often a query shape repeats, i.e. how often the server
+can skip planning.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+
+KEYWORDS = {
+    "MATCH", "OPTIONAL", "WHERE", "RETURN", "WITH", "UNWIND", "AS", "ORDER", "BY", "ASC", "ASCENDING",
+    "DESC", "DESCENDING", "SKIP", "LIMIT", "DISTINCT", "CREATE", "MERGE", "SET", "DELETE", "DETACH",
+    "REMOVE", "CALL", "YIELD", "UNION", "ALL", "AND", "OR", "XOR", "NOT", "IN", "IS", "NULL", "TRUE",
+    "FALSE", "CASE", "WHEN", "THEN", "ELSE", "END", "EXISTS", "ON", "CONTAINS", "STARTS", "ENDS",
+    "FOREACH", "EXPLAIN", "PROFILE",
+}
+
+_TOKEN = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<backtick>`(?:[^`]|``)*`)
+  | (?P<param>\$(?:\w+|`[^`]*`))
+  | (?P<number>0x[0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+  | (?P<word>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<space>\s+)
+  | (?P<other>\.\.|.)
+""", re.VERBOSE | re.DOTALL)
+
+# Administration and schema commands do not accept parameters everywhere
+_UNPARAMETERIZABLE = re.compile(
+    r"^\s*(SHOW|DROP|ALTER|GRANT|DENY|REVOKE|START|STOP|CREATE\s+(OR\s+REPLACE\s+)?"
+    r"(RANGE\s+|TEXT\s+|POINT\s+|LOOKUP\s+|FULLTEXT\s+|VECTOR\s+)?(INDEX|CONSTRAINT|DATABASE|USER|ROLE|ALIAS))\b",
+    re.IGNORECASE,
+)
+
+_ESCAPES = {"\\": "\\", "'": "'", '"': '"', "n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+
+def _unescape(literal: str) -> str:
+    def replace(match):
+        escape = match.group(1)
+        if escape[0] in "uU":
+            return chr(int(escape[1:], 16))
+        return _ESCAPES.get(escape, "\\" + escape)
+    return re.sub(r"\\(u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|.)", replace, literal[1:-1])
+
+
+def _number(literal: str):
+    if literal.lower().startswith("0x"):
+        return int(literal, 16)
+    if re.fullmatch(r"\d+", literal):
+        return int(literal)
+    return float(literal)
+
+
+def parameterize_cypher(query: str, params: Dict[str, Any] = None) -> Tuple[str, Dict[str, Any], int]:
+    """
+    Lift the string and number literals of a query into parameters and canonicalize its text
+
+    Literals that Cypher does not accept as parameters are kept: variable-length
+    bounds (`*1..3`) and the numbers of SKIP / LIMIT, which guarded_query relies on to
+    cap the result. Administration and schema commands are returned unchanged.
+
+    Returns:
+        The rewritten query, its parameters (the given ones plus the lifted literals)
+        and the number of literals lifted
+    """
+    params = dict(params or {})
+    if _UNPARAMETERIZABLE.match(query):
+        return query, params, 0
+
+    tokens = [(m.lastgroup, m.group()) for m in _TOKEN.finditer(query)]
+    significant = [i for i, (kind, _) in enumerate(tokens) if kind not in ("space", "comment")]
+    position = {token: n for n, token in enumerate(significant)}
+
+    def neighbour(i, step):
+        n = position[i] + step
+        return tokens[significant[n]][1] if 0 <= n < len(significant) else ""
+
+    existing = {name.lstrip("$").strip("`") for kind, name in tokens if kind == "param"} | set(params)
+    counter = 0
+    lifted = 0
+    parts = []
+    for i, (kind, text) in enumerate(tokens):
+        if kind == "comment":
+            continue
+        if kind == "space":
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+            continue
+
+        previous, following = neighbour(i, -1), neighbour(i, 1)
+        literal = None
+        if kind == "string":
+            literal = _unescape(text)
+        elif kind == "number" and previous not in ("*", "..") and following != ".." \
+                and previous.upper() not in ("SKIP", "LIMIT"):
+            literal = _number(text)
+
+        if literal is not None:
+            while f"lit{counter}" in existing:
+                counter += 1
+            name = f"lit{counter}"
+            counter += 1
+            params[name] = literal
+            lifted += 1
+            parts.append(f"${name}")
+        elif kind == "word" and text.upper() in KEYWORDS and previous not in (".", ":") and following != ":":
+            parts.append(text.upper())
+        else:
+            parts.append(text)
+
+    return "".join(parts).strip(), params, lifted
+
+
+class PlanCacheStats:
+    """
+    Counts how often each canonical query shape is sent
+
+    A repeated shape is sent with the same text as before, so Neo4j can serve it from
+    its plan cache. At most max_shapes shapes are remembered (least recently used
+    are forgotten first).
+    """
+
+    def __init__(self, max_shapes: int = 1000) -> None:
+        self.max_shapes = max_shapes
+        self._shapes = OrderedDict()
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.reused = 0
+        self.literals_lifted = 0
+
+    def record(self, shape: str, lifted: int = 0) -> bool:
+        """Count a query of the given shape; returns whether the shape was seen before"""
+        with self._lock:
+            self.queries += 1
+            self.literals_lifted += lifted
+            seen = shape in self._shapes
+            self._shapes[shape] = self._shapes.get(shape, 0) + 1
+            self._shapes.move_to_end(shape)
+            if seen:
+                self.reused += 1
+            while len(self._shapes) > self.max_shapes:
+                self._shapes.popitem(last=False)
+            return seen
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            top = sorted(self._shapes.items(), key=lambda item: item[1], reverse=True)[:5]
+            return {
+                "queries": self.queries,
+                "distinct_shapes": len(self._shapes),
+                "reused": self.reused,
+                "reuse_rate": round(self.reused / self.queries, 3) if self.queries else 0.0,
+                "literals_lifted": self.literals_lifted,
+                "top_shapes": [{"query": shape, "count": count} for shape, count in top],
+            }
+
+
+# Shape statistics of the queries sent by graph_query in this process
+plan_cache_stats = PlanCacheStats()
@@ -1,8 +1,13 @@
-from dotenv import load_dotenv
 from pathlib import Path
-from langchain_community.graphs import Neo4jGraph
 import os
 import json
+import time
+from graph_schema import ensure_schema, typed_properties
+from rollups import RollupTracker, drop_orphan_rollups, refresh_rollups
+from query_cache import bump_data_version, read_data_version
+from import_manifest import ImportManifest
+from schema_snapshot import SchemaChanges
+from connections import get_graph, get_schema_snapshot
 
 
 class BaseLogger:
@@ -13,98 +18,613 @@ class BaseLogger:
 def load_graph():
     """
     Function to load the graph client
-    """
-    # Environment set up
-    root_dir = Path(__file__).parent.parent
-
-    env_path = root_dir / "config" / ".env_loader"
-    load_dotenv(dotenv_path=env_path)
-
-    url = os.getenv("NEO4J_URI")
-    username = os.getenv("NEO4J_USERNAME")
-    password = os.getenv("NEO4J_PASSWORD")
-
-    print("Loaded config:", url, username, password) 
 
+    Returns the process-wide connection shared with the agents (see connections.get_graph)
+    """
     # if Neo4j is local, you can go to http://localhost:7474/ to browse the database
-    neo4j_graph = Neo4jGraph(url=url, 
-                             username=username, 
-                             password=password) 
-    
-    return neo4j_graph
+    return get_graph()
+
+
+NODE_BATCH_QUERY = """
+UNWIND $rows AS row
+MERGE (n:{label} {{id: row.id}})
+SET n += row.properties
+"""
+
+RELATIONSHIP_BATCH_QUERY = """
+UNWIND $rows AS row
+MATCH (a:{from_label} {{id: row.from}})
+MATCH (b:{to_label} {{id: row.to}})
+MERGE (a)-[r:{type}]->(b)
+ON CREATE SET r += row.properties
+"""
+
+# Delta imports replace the properties of changed rows and delete rows that disappeared
+NODE_REPLACE_QUERY = """
+UNWIND $rows AS row
+MERGE (n:{label} {{id: row.id}})
+SET n = row.properties, n.id = row.id
+"""
+
+RELATIONSHIP_REPLACE_QUERY = """
+UNWIND $rows AS row
+MATCH (a:{from_label} {{id: row.from}})
+MATCH (b:{to_label} {{id: row.to}})
+MERGE (a)-[r:{type}]->(b)
+SET r = row.properties
+"""
+
+NODE_DELETE_QUERY = """
+UNWIND $rows AS row
+MATCH (n:{label} {{id: row.id}})
+DETACH DELETE n
+"""
+
+RELATIONSHIP_DELETE_QUERY = """
+UNWIND $rows AS row
+MATCH (a:{from_label} {{id: row.from}})-[r:{type}]->(b:{to_label} {{id: row.to}})
+DELETE r
+"""
+
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DEFAULT_DATA_PATH = DATA_DIR / "dummy_graph_data.json"
+DEFAULT_CHECKPOINT_PATH = DATA_DIR / ".import_checkpoint.json"
+DEFAULT_MANIFEST_PATH = DATA_DIR / ".import_manifest.sqlite"
 
 
 def load_data() -> dict:
     '''
     Function to load in the dummy data
     '''
-    base_path = os.path.dirname(__file__)
-    file_path = os.path.join(base_path, "../data/dummy_graph_data.json")
-    with open(file_path) as data:
+    with open(DEFAULT_DATA_PATH) as data:
         data_json = json.load(data)
     return data_json
 
 
-def insert_data(data: dict, neo4j_graph) -> None:
+class _JsonStream:
     '''
-    Function to upload the dummy data to Neo4J
+    Minimal incremental JSON reader over a text file, decoding one value at a time
     '''
-    # Define query bases
-    node_query_base = """
-    MERGE (n:{type} {{
-        id: $id,
-    """
-    relationship_query_base = """
-    MATCH (a {{id: $from}}), (b {{id: $to}})
-    MERGE (a)-[r:{type}]->(b)
-    ON CREATE SET """
 
-    # Loop through the data to insert
-    for node in data['nodes']:
-        # Reset the query
-        node_query = node_query_base
+    def __init__(self, file, read_size: int) -> None:
+        self.file = file
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self) -> None:
+        chunk = self.file.read(self.read_size)
+        if not chunk:
+            self.eof = True
+            return
+        # Drop the consumed prefix so memory stays bounded by the largest single value
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ""
+            self._read_more()
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Malformed graph file: expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value ending exactly at the buffer end may be a truncated number
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._read_more()
+
+
+def iter_graph_file(file_path, read_size: int = 1 << 16):
+    '''
+    Incrementally parse a graph JSON file in the nodes/relationships format
 
-        # Format the query and add the properties individually
-        properties = node.get("properties", {})
+    Yields (section, item) pairs where section is "nodes" or "relationships", holding
+    only one item and one read buffer in memory at a time
+    '''
+    with open(file_path, encoding="utf-8") as file:
+        stream = _JsonStream(file, read_size)
+        stream.expect("{")
+        while stream.peek() != "}":
+            key = stream.decode()
+            stream.expect(":")
+            if key in ("nodes", "relationships") and stream.peek() == "[":
+                stream.expect("[")
+                while stream.peek() != "]":
+                    yield key, stream.decode()
+                    if stream.peek() == ",":
+                        stream.expect(",")
+                stream.expect("]")
+            else:
+                stream.decode()
+            if stream.peek() == ",":
+                stream.expect(",")
+
+
+def _quote(identifier: str) -> str:
+    '''
+    Backtick-quote a label or relationship type so it can be formatted into a query
+    '''
+    return "`" + identifier.replace("`", "``") + "`"
 
-        for k, v in properties.items():
-            node_query += f"{k}: '{v}',\n"
 
-        node_query = node_query[:-2] + "}})"
+def _typed(item: dict) -> dict:
+    '''
+    Copy of a node or relationship with its date properties as datetime.date
+    '''
+    if not item.get('properties'):
+        return item
+    return dict(item, properties=typed_properties(item['properties']))
 
-        # Format the query and execute
-        node_query_fmt = node_query.format(type=node['label']) 
 
-        neo4j_graph.query(node_query_fmt, params={'id':node['id']})
+def _node_statements(nodes: list, query: str = NODE_BATCH_QUERY) -> list:
+    '''
+    Group nodes by label into (query, rows) pairs for NODE_BATCH_QUERY (or another
+    query over the same rows)
+    '''
+    rows_by_label = {}
+    for node in nodes:
+        rows_by_label.setdefault(node['label'], []).append(
+            {'id': node['id'], 'properties': node.get('properties', {})})
 
+    return [(query.format(label=_quote(label)), rows)
+            for label, rows in rows_by_label.items()]
 
-    print("--- All Nodes Inserted ---")
-    
 
-    for relationship in data['relationships']:
-        # Reset the query
-        relationship_query = relationship_query_base
+def _relationship_statements(relationships: list, id_labels: dict, query: str = RELATIONSHIP_BATCH_QUERY) -> tuple:
+    '''
+    Group relationships by (type, start label, end label) into (query, rows) pairs for
+    RELATIONSHIP_BATCH_QUERY (or another query over the same rows)
+
+    Returns the statements and the number of relationships skipped because an
+    endpoint id is not a known node
+    '''
+    rows_by_key = {}
+    skipped = 0
+    for relationship in relationships:
+        from_label = id_labels.get(relationship['from'])
+        to_label = id_labels.get(relationship['to'])
+        if from_label is None or to_label is None:
+            skipped += 1
+            continue
+        key = (relationship['label'], from_label, to_label)
+        rows_by_key.setdefault(key, []).append(
+            {'from': relationship['from'], 'to': relationship['to'],
+             'properties': relationship.get('properties') or {}})
+
+    statements = [
+        (query.format(
+            type=_quote(rel_type), from_label=_quote(from_label), to_label=_quote(to_label)), rows)
+        for (rel_type, from_label, to_label), rows in rows_by_key.items()
+    ]
+    return statements, skipped
+
+
+def _run_statements(tx, statements: list) -> None:
+    for query, rows in statements:
+        tx.run(query, rows=rows).consume()
+
+
+def _write_batches(neo4j_graph, statements: list, batch_size: int) -> None:
+    '''
+    Send each statement's rows in batches, one explicit write transaction per batch
+    '''
+    with neo4j_graph._driver.session(database=neo4j_graph._database) as session:
+        for query, rows in statements:
+            for start in range(0, len(rows), batch_size):
+                session.execute_write(_run_statements, [(query, rows[start:start + batch_size])])
+
+
+def _write_chunk(neo4j_graph, statements: list) -> None:
+    '''
+    Write all statements of a chunk in a single transaction so the chunk commits atomically
+    '''
+    with neo4j_graph._driver.session(database=neo4j_graph._database) as session:
+        session.execute_write(_run_statements, statements)
+
 
-        properties = relationship.get("properties", None)
+def _report_schema_changes(neo4j_graph, changes: SchemaChanges) -> int:
+    '''
+    Bump the data version after an import and merge its schema changes into the snapshot
 
-        if properties:
-            for k, v in properties.items():
-                relationship_query += f"r.{k} = '{v}', "
+    Returns the new data version
+    '''
+    version = bump_data_version(neo4j_graph)
+    get_schema_snapshot().apply(changes, version)
+    return version
+
+
+def _import_stats(node_count: int, relationship_count: int, skipped: int, started: float) -> dict:
+    elapsed = time.perf_counter() - started
+    total_rows = node_count + relationship_count
+    stats = {
+        'nodes': node_count,
+        'relationships': relationship_count,
+        'skipped_relationships': skipped,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(total_rows / elapsed, 1) if elapsed > 0 else float(total_rows),
+    }
+    if skipped:
+        print(f"Skipped {skipped} relationships with an endpoint missing from the nodes list")
+    print(f"Imported {total_rows} rows in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec)")
+    return stats
+
+
+def bulk_insert_data(data: dict, neo4j_graph, batch_size: int = 1000) -> dict:
+    '''
+    Function to upload the data to Neo4J in parameterized UNWIND batches
 
-            relationship_query = relationship_query[:-2] 
+    Nodes are grouped by label and relationships by (type, start label, end label), so
+    every group runs the same query text and Neo4j can reuse its plan. Relationship
+    endpoints are matched by label and id instead of scanning every node.
 
-            # Format the query and execute
-            relationship_query_fmt = relationship_query.format(type=relationship['label'])
+    Returns import statistics (row counts, elapsed seconds and rows/sec)
+    '''
+    started = time.perf_counter()
+    nodes = [_typed(node) for node in data['nodes']]
+    relationships = [_typed(relationship) for relationship in data['relationships']]
+
+    id_labels = {node['id']: node['label'] for node in nodes}
+    ensure_schema(neo4j_graph, labels=set(id_labels.values()))
+    _write_batches(neo4j_graph, _node_statements(nodes), batch_size)
+    print(f"--- All Nodes Inserted ({len(id_labels)}) ---")
+
+    statements, skipped = _relationship_statements(relationships, id_labels)
+    _write_batches(neo4j_graph, statements, batch_size)
+    relationship_count = sum(len(rows) for _, rows in statements)
+    print(f"--- All Relationships Inserted ({relationship_count}) ---")
+
+    tracker = RollupTracker()
+    tracker.track_nodes(nodes)
+    tracker.track(relationships)
+    rollups = tracker.flush(neo4j_graph)
+
+    changes = SchemaChanges()
+    changes.track_nodes(nodes)
+    changes.track_relationships(relationships)
+    _report_schema_changes(neo4j_graph, changes)
+
+    stats = _import_stats(len(id_labels), relationship_count, skipped, started)
+    stats['rollups'] = rollups
+    return stats
+
+
+def _source_signature(file_path) -> dict:
+    stat = os.stat(file_path)
+    return {'source': str(Path(file_path).resolve()), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def read_checkpoint(file_path, checkpoint_path=DEFAULT_CHECKPOINT_PATH) -> dict:
+    '''
+    Return the committed item counts of an interrupted import of file_path, or None
+    '''
+    try:
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
 
+    signature = _source_signature(file_path)
+    if any(checkpoint.get(k) != v for k, v in signature.items()):
+        return None
+    return checkpoint
+
+
+def _write_checkpoint(checkpoint_path, checkpoint: dict) -> None:
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def stream_insert_data(file_path, neo4j_graph, batch_size: int = 1000,
+                       checkpoint_path=DEFAULT_CHECKPOINT_PATH, resume: bool = True) -> dict:
+    '''
+    Function to stream a graph JSON file into Neo4J in chunks of batch_size items
+
+    The file is parsed incrementally by iter_graph_file. Each chunk is committed in one
+    transaction, after which the committed counts are written to checkpoint_path. With
+    resume=True an import interrupted earlier skips the chunks that were already
+    committed. Only the id -> label map of the nodes is kept in memory, to match
+    relationship endpoints by label.
+
+    Returns import statistics (row counts, elapsed seconds, rows/sec and resume point)
+    '''
+    started = time.perf_counter()
+    ensure_schema(neo4j_graph)
+
+    checkpoint = read_checkpoint(file_path, checkpoint_path) if resume else None
+    if checkpoint is None:
+        checkpoint = dict(_source_signature(file_path), nodes=0, relationships=0)
+    resumed_from = {'nodes': checkpoint['nodes'], 'relationships': checkpoint['relationships']}
+    if any(resumed_from.values()):
+        print(f"Resuming import from checkpoint: {resumed_from}")
+
+    id_labels = {}
+    tracker = RollupTracker()
+    changes = SchemaChanges()
+    seen = {'nodes': 0, 'relationships': 0}
+    written = {'nodes': 0, 'relationships': 0}
+    skipped = 0
+    chunk = []
+    chunk_section = None
+
+    def flush():
+        nonlocal skipped
+        if not chunk:
+            return
+        if chunk_section == 'nodes':
+            statements = _node_statements(chunk)
+            tracker.track_nodes(chunk)
+        else:
+            statements, chunk_skipped = _relationship_statements(chunk, id_labels)
+            skipped += chunk_skipped
+            tracker.track(chunk)
+        _write_chunk(neo4j_graph, statements)
+        written[chunk_section] += len(chunk)
+        checkpoint[chunk_section] += len(chunk)
+        _write_checkpoint(checkpoint_path, checkpoint)
+        chunk.clear()
+
+    for section, item in iter_graph_file(file_path):
+        item = _typed(item)
+        if section != chunk_section:
+            flush()
+            chunk_section = section
+        if section == 'nodes':
+            id_labels[item['id']] = item['label']
+            changes.track_nodes([item])
         else:
-            relationship_query_fmt = relationship_query.format(type=relationship['label']).strip('ON CREATE SET ')
+            changes.track_relationships([item])
+
+        seen[section] += 1
+        if seen[section] <= resumed_from[section]:
+            continue
+
+        chunk.append(item)
+        if len(chunk) >= batch_size:
+            flush()
+    flush()
+
+    print("--- All Nodes and Relationships Inserted ---")
 
-        neo4j_graph.query(relationship_query_fmt, 
-                          params={'from':relationship['from'], 'to':relationship['to']})
-        
+    # Relationships committed before an interruption were not tracked, so a resumed
+    # import refreshes every rollup
+    if any(resumed_from.values()):
+        rollups = refresh_rollups(neo4j_graph)
+    else:
+        rollups = tracker.flush(neo4j_graph)
+    _report_schema_changes(neo4j_graph, changes)
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    stats = _import_stats(written['nodes'], written['relationships'], skipped, started)
+    stats['resumed_from'] = resumed_from
+    stats['rollups'] = rollups
+    return stats
+
+
+def delta_insert_data(file_path, neo4j_graph, batch_size: int = 1000,
+                      manifest_path=DEFAULT_MANIFEST_PATH) -> dict:
+    '''
+    Function to apply only the differences between a graph JSON file and the last import
+
+    The content hash of every node and relationship written is kept in an
+    ImportManifest at manifest_path. Rows of the file whose hash matches the manifest
+    are skipped; new and changed rows are written (changed ones have their properties
+    replaced), and rows in the manifest but missing from the file are deleted. Only the
+    rollups touched by the written relationships are refreshed.
+
+    The manifest is trusted only while the graph's data version is the one it recorded:
+    after any other write (another loader, a rollup recompute) the first delta import
+    writes every row again. An interrupted delta import refreshes every rollup on its
+    next run.
+
+    Relationships repeating the (type, from, to) key of an earlier row are counted as
+    duplicates and not written, so the edge keeps the first row's properties as with
+    bulk_insert_data.
+
+    Returns per-section counts of new, changed, unchanged and deleted rows (and
+    duplicate relationships)
+    '''
+    started = time.perf_counter()
+    ensure_schema(neo4j_graph)
+
+    manifest = ImportManifest(manifest_path)
+    try:
+        graph_version = read_data_version(neo4j_graph)
+        if manifest.data_version != graph_version:
+            if not manifest.is_empty():
+                print("Import manifest is out of date with the graph, writing every row")
+            manifest.reset()
+        interrupted = manifest.get_meta('in_progress') is not None
+        if interrupted:
+            print("Previous delta import was interrupted, every rollup will be refreshed")
+        manifest.set_meta('in_progress', 1)
+
+        id_labels = {}
+        tracker = RollupTracker()
+        changes = SchemaChanges()
+        stats = {section: {'new': 0, 'changed': 0, 'unchanged': 0, 'deleted': 0}
+                 for section in ('nodes', 'relationships')}
+        stats['relationships']['duplicate'] = 0
+        relabeled = 0
+        skipped = 0
+        chunk = []
+        chunk_section = None
+
+        def flush():
+            nonlocal skipped, relabeled
+            if not chunk:
+                return
+            if chunk_section == 'nodes':
+                diff = manifest.diff_nodes(chunk)
+                relabeled += len(diff['relabeled'])
+                written = diff['new'] + diff['changed']
+                # A node that changed label is a different node in the graph: remove the old one
+                statements = [(NODE_DELETE_QUERY.format(label=_quote(label)), [{'id': node_id}])
+                              for node_id, label in diff['relabeled']]
+                statements += _node_statements(written, query=NODE_REPLACE_QUERY)
+                if statements:
+                    _write_chunk(neo4j_graph, statements)
+                if diff['relabeled']:
+                    manifest.forget_relationships_of([node_id for node_id, _ in diff['relabeled']])
+                manifest.store_nodes(written)
+                tracker.track_nodes(written)
+                changes.track_nodes(written)
+            else:
+                known = [r for r in chunk if r['from'] in id_labels and r['to'] in id_labels]
+                skipped += len(chunk) - len(known)
+                diff = manifest.diff_relationships(known)
+                written = diff['new'] + diff['changed']
+                statements, _ = _relationship_statements(written, id_labels, query=RELATIONSHIP_REPLACE_QUERY)
+                if statements:
+                    _write_chunk(neo4j_graph, statements)
+                manifest.store_relationships(written, id_labels)
+                tracker.track(written)
+                changes.track_relationships(written)
+            for kind in stats[chunk_section]:
+                stats[chunk_section][kind] += len(diff.get(kind, ()))
+            chunk.clear()
+
+        for section, item in iter_graph_file(file_path):
+            item = _typed(item)
+            if section != chunk_section:
+                flush()
+                chunk_section = section
+            if section == 'nodes':
+                id_labels[item['id']] = item['label']
+            chunk.append(item)
+            if len(chunk) >= batch_size:
+                flush()
+        flush()
+
+        # Rows of the last import missing from this file: relationships first, so
+        # their endpoints are still there to match them
+        removed_relationships = manifest.unseen_relationships()
+        if removed_relationships:
+            rows_by_key = {}
+            for r in removed_relationships:
+                rows_by_key.setdefault((r['label'], r['from_label'], r['to_label']), []).append(
+                    {'from': r['from'], 'to': r['to']})
+            _write_batches(neo4j_graph, [
+                (RELATIONSHIP_DELETE_QUERY.format(
+                    type=_quote(rel_type), from_label=_quote(from_label), to_label=_quote(to_label)), rows)
+                for (rel_type, from_label, to_label), rows in rows_by_key.items()], batch_size)
+            manifest.remove_relationships(removed_relationships)
+
+        removed_nodes = manifest.unseen_nodes()
+        if removed_nodes:
+            _write_batches(neo4j_graph, _node_statements(
+                [{'id': node_id, 'label': label} for node_id, label in removed_nodes], query=NODE_DELETE_QUERY),
+                batch_size)
+            removed_ids = [node_id for node_id, _ in removed_nodes]
+            manifest.forget_relationships_of(removed_ids)
+            manifest.remove_nodes(removed_ids)
+        stats['relationships']['deleted'] = len(removed_relationships)
+        stats['nodes']['deleted'] = len(removed_nodes)
+
+        # Relabeling a node drops its old relationships too
+        deleted = bool(removed_relationships or removed_nodes or relabeled)
+        modified = deleted or any(stats[section][kind] for section in stats for kind in ('new', 'changed'))
+        rollups = {'campaigns': 0, 'users': 0}
+        if interrupted or deleted:
+            # Deleted edges can affect campaigns no longer reachable from the tracked ids
+            rollups = refresh_rollups(neo4j_graph)
+            drop_orphan_rollups(neo4j_graph)
+        elif modified:
+            rollups = tracker.flush(neo4j_graph)
+
+        if interrupted or deleted:
+            version = bump_data_version(neo4j_graph)
+            # Deletions can remove labels and properties: rebuild the schema snapshot
+            get_schema_snapshot().invalidate()
+        elif modified:
+            version = _report_schema_changes(neo4j_graph, changes)
+        else:
+            version = graph_version
+        manifest.data_version = version
+        manifest.set_meta('in_progress', None)
+    finally:
+        manifest.close()
+
+    elapsed = time.perf_counter() - started
+    stats.update(skipped_relationships=skipped, rollups=rollups, seconds=round(elapsed, 3))
+    if skipped:
+        print(f"Skipped {skipped} relationships with an endpoint missing from the nodes list")
+    print(f"Delta import in {stats['seconds']}s: nodes {stats['nodes']}, relationships {stats['relationships']}")
+    return stats
+
+
+def insert_data(data: dict, neo4j_graph, bulk: bool = False, batch_size: int = 1000):
+    '''
+    Function to upload the dummy data to Neo4J
+
+    With bulk=True the data is written by bulk_insert_data in batches of batch_size
+    '''
+    if bulk:
+        return bulk_insert_data(data, neo4j_graph, batch_size=batch_size)
+
+    nodes = [_typed(node) for node in data['nodes']]
+    relationships = [_typed(relationship) for relationship in data['relationships']]
+    ensure_schema(neo4j_graph, labels={node['label'] for node in nodes})
+
+    # Properties are sent as parameters so numbers keep their type and dates become DATE values
+    node_query_base = """
+    MERGE (n:{type} {{id: $id}})
+    SET n += $properties
+    """
+    relationship_query_base = """
+    MATCH (a {{id: $from}}), (b {{id: $to}})
+    MERGE (a)-[r:{type}]->(b)
+    ON CREATE SET r += $properties
+    """
+
+    # Loop through the data to insert
+    for node in nodes:
+        node_query_fmt = node_query_base.format(type=_quote(node['label']))
+        neo4j_graph.query(node_query_fmt, params={'id': node['id'], 'properties': node.get("properties", {})})
+
+    print("--- All Nodes Inserted ---")
+
+    for relationship in relationships:
+        relationship_query_fmt = relationship_query_base.format(type=_quote(relationship['label']))
+        neo4j_graph.query(relationship_query_fmt,
+                          params={'from': relationship['from'], 'to': relationship['to'],
+                                  'properties': relationship.get("properties") or {}})
 
     print("--- All Relationships Inserted ---")
 
+    tracker = RollupTracker()
+    tracker.track_nodes(nodes)
+    tracker.track(relationships)
+    tracker.flush(neo4j_graph)
+
+    changes = SchemaChanges()
+    changes.track_nodes(nodes)
+    changes.track_relationships(relationships)
+    _report_schema_changes(neo4j_graph, changes)
+
     return True
 
 
@@ -0,0 +1,122 @@
+"""
+Date windows for time-bounded analysis questions
+
+parse_date_window finds a window phrase in free tool input or a question, such as
+"last 30 days", "since 2024-09-01", "from 2024-09-01 to 2024-09-30",
+"until=2024-10-01" or "in September 2024", and returns the input without it plus
+the DateWindow it denotes. Relative windows end today. Dates are ISO (YYYY-MM-DD).
+"""
+import calendar
+import datetime
+import re
+from typing import Any, Dict, Optional, Tuple
+
+
+_DATE = r"\d{4}-\d{2}-\d{2}"
+_MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+_UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+# Connecting words that belong to the window phrase ("over the last 30 days")
+_LEAD = r"(?:\b(?:in|during|over|for|within)\s+)?(?:the\s+)?"
+
+_PATTERNS = [
+    ("range", re.compile(_LEAD + rf"\b(?:from|between)\s+(?P<since>{_DATE})\s+(?:to|until|and|-)\s+(?P<until>{_DATE})",
+                         re.IGNORECASE)),
+    ("relative", re.compile(_LEAD + r"\b(?:last|past)\s+(?:(?P<count>\d+)\s+)?(?P<unit>day|week|month|year)s?\b",
+                            re.IGNORECASE)),
+    ("since", re.compile(_LEAD + rf"\b(?:since|after|from)\s*[=:]?\s*(?P<since>{_DATE})", re.IGNORECASE)),
+    ("until", re.compile(_LEAD + rf"\b(?:until|till|before|to)\s*[=:]?\s*(?P<until>{_DATE})", re.IGNORECASE)),
+    ("month", re.compile(r"\b(?:in|during)\s+(?P<month>" + "|".join(_MONTHS) + r")\s+(?P<year>\d{4})\b",
+                         re.IGNORECASE)),
+    ("year", re.compile(r"\b(?:in|during)\s+(?P<year>\d{4})\b", re.IGNORECASE)),
+]
+
+
+class DateWindow:
+    """Inclusive date range; a missing bound leaves that side open"""
+
+    def __init__(self, since: Optional[datetime.date] = None, until: Optional[datetime.date] = None) -> None:
+        if since and until and since > until:
+            raise ValueError(f"Date window starts after it ends: {since} > {until}")
+        self.since = since
+        self.until = until
+
+    def params(self) -> Dict[str, Any]:
+        """$since / $until query parameters, open bounds replaced by the extreme dates"""
+        return {"since": self.since or datetime.date.min, "until": self.until or datetime.date.max}
+
+    def contains(self, value) -> bool:
+        """Whether a date (or ISO date string) falls inside the window; missing dates do not"""
+        if value is None:
+            return False
+        day = str(value)[:10]
+        return (self.since is None or day >= self.since.isoformat()) and \
+               (self.until is None or day <= self.until.isoformat())
+
+    def describe(self) -> str:
+        if self.since and self.until:
+            return f"from {self.since} to {self.until}"
+        if self.since:
+            return f"since {self.since}"
+        return f"until {self.until}"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DateWindow) and (self.since, self.until) == (other.since, other.until)
+
+    def __repr__(self) -> str:
+        return f"DateWindow(since={self.since}, until={self.until})"
+
+
+def _parse_date(text: str) -> datetime.date:
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Invalid date '{text}', expected YYYY-MM-DD")
+
+
+def _window(kind: str, match, today: datetime.date) -> DateWindow:
+    groups = match.groupdict()
+    if kind == "relative":
+        days = int(groups["count"] or 1) * _UNIT_DAYS[groups["unit"].lower()]
+        return DateWindow(today - datetime.timedelta(days=days), today)
+    if kind == "month":
+        year, month = int(groups["year"]), _MONTHS[groups["month"].lower()]
+        return DateWindow(datetime.date(year, month, 1),
+                          datetime.date(year, month, calendar.monthrange(year, month)[1]))
+    if kind == "year":
+        year = int(groups["year"])
+        return DateWindow(datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+    return DateWindow(_parse_date(groups["since"]) if groups.get("since") else None,
+                      _parse_date(groups["until"]) if groups.get("until") else None)
+
+
+def parse_date_window(text: str, today: datetime.date = None) -> Tuple[str, Optional[DateWindow]]:
+    """
+    Split a date window phrase off free text
+
+    A "since" and an "until" phrase in the same text are combined into one window.
+    Raises ValueError for malformed dates or a window that ends before it starts.
+
+    Returns:
+        The text without the window phrase (and separators left dangling by it), and
+        the window, or None when the text names no window
+    """
+    today = today or datetime.date.today()
+    since = until = None
+    found = False
+    for kind, pattern in _PATTERNS:
+        match = pattern.search(text)
+        if match is None:
+            continue
+        window = _window(kind, match, today)
+        since, until = since or window.since, until or window.until
+        text = text[:match.start()] + " " + text[match.end():]
+        found = True
+        if kind not in ("since", "until"):
+            break
+
+    if not found:
+        return text, None
+    text = re.sub(r"\s+([?.!])", r"\1", re.sub(r"\s+", " ", text))
+    text = re.sub(r"\s*([;,])(\s*[;,])+", r"\1", text)
+    return text.strip(" ;,"), DateWindow(since, until)
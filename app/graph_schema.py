@@ -0,0 +1,204 @@
+import datetime
+import re
+
+
+# Node labels of the marketing graph; every node is keyed by a unique `id`
+NODE_LABELS = ["User", "Ad", "Product", "Campaign", "Demographic"]
+
+# Materialized rollup nodes (see rollups.py), keyed by the id of their campaign/user,
+# and segmentation cube cells (see segments.py), keyed by campaign|age_group|gender|location
+ROLLUP_LABELS = ["CampaignStats", "UserStats", "SegmentStats"]
+
+# Index name -> (label, property) for range lookups on rollup nodes
+ROLLUP_INDEXES = {
+    "segmentstats_campaign_id": ("SegmentStats", "campaign_id"),
+}
+
+# Index name -> (label, property) for name lookups in the analysis tools
+TEXT_INDEXES = {
+    "user_name_text": ("User", "name"),
+    "campaign_name_text": ("Campaign", "name"),
+}
+
+USER_NAME_FULLTEXT = "user_name_fulltext"
+CAMPAIGN_NAME_FULLTEXT = "campaign_name_fulltext"
+
+FULLTEXT_INDEXES = {
+    USER_NAME_FULLTEXT: ("User", "name"),
+    CAMPAIGN_NAME_FULLTEXT: ("Campaign", "name"),
+}
+
+# Index name -> (relationship type, property) for date range filters on engagement edges
+RELATIONSHIP_DATE_INDEXES = {
+    "viewed_date_first_viewed": ("VIEWED", "date_first_viewed"),
+    "clicked_date_last_clicked": ("CLICKED", "date_last_clicked"),
+    "converted_conversion_date": ("CONVERTED", "conversion_date"),
+}
+
+# Node properties holding dates; with the relationship date properties above they are
+# stored as native DATE values
+NODE_DATE_PROPERTIES = {
+    "Campaign": ["start_date", "end_date"],
+}
+
+DATE_PROPERTY_NAMES = {prop for props in NODE_DATE_PROPERTIES.values() for prop in props} | \
+    {prop for _, prop in RELATIONSHIP_DATE_INDEXES.values()}
+
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Neo4j's error for db.index.fulltext.queryNodes on an index that was never created
+_MISSING_FULLTEXT = re.compile(r"no such fulltext schema index", re.IGNORECASE)
+
+# Schema introspection queries used by schema_tool
+LABELS_QUERY = "CALL db.labels() YIELD label RETURN collect(label) AS labels"
+RELATIONSHIP_TYPES_QUERY = "CALL db.relationshipTypes() YIELD relationshipType RETURN collect(relationshipType) AS types"
+META_SCHEMA_QUERY = "CALL apoc.meta.schema() YIELD value RETURN value"
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+def constraint_name(label: str) -> str:
+    """Name of the id uniqueness constraint of a label"""
+    return f"{label.lower()}_id_unique"
+
+
+def schema_statements(labels=None) -> list:
+    """Idempotent DDL statements for the id constraints and lookup indexes"""
+    statements = [
+        f"CREATE CONSTRAINT {constraint_name(label)} IF NOT EXISTS "
+        f"FOR (n:{_quote(label)}) REQUIRE n.id IS UNIQUE"
+        for label in (labels or NODE_LABELS)
+    ]
+    statements += [
+        f"CREATE TEXT INDEX {name} IF NOT EXISTS FOR (n:{_quote(label)}) ON (n.{prop})"
+        for name, (label, prop) in TEXT_INDEXES.items()
+    ]
+    statements += [
+        f"CREATE FULLTEXT INDEX {name} IF NOT EXISTS FOR (n:{_quote(label)}) ON EACH [n.{prop}]"
+        for name, (label, prop) in FULLTEXT_INDEXES.items()
+    ]
+    statements += [
+        f"CREATE RANGE INDEX {name} IF NOT EXISTS FOR (n:{_quote(label)}) ON (n.{prop})"
+        for name, (label, prop) in ROLLUP_INDEXES.items()
+    ]
+    statements += [
+        f"CREATE RANGE INDEX {name} IF NOT EXISTS FOR ()-[r:{_quote(rel_type)}]-() ON (r.{prop})"
+        for name, (rel_type, prop) in RELATIONSHIP_DATE_INDEXES.items()
+    ]
+    return statements
+
+
+def ensure_schema(neo4j_graph, labels=None) -> None:
+    """
+    Create the id uniqueness constraints and lookup indexes if they do not exist yet,
+    and convert dates left as strings by older imports (see convert_string_dates)
+
+    Args:
+        neo4j_graph: Graph client exposing query()
+        labels: Extra node labels to constrain besides NODE_LABELS and ROLLUP_LABELS
+    """
+    labels = sorted(set(NODE_LABELS) | set(ROLLUP_LABELS) | set(labels or []))
+    for statement in schema_statements(labels):
+        neo4j_graph.query(statement)
+    convert_string_dates(neo4j_graph)
+
+
+def typed_properties(properties: dict) -> dict:
+    """
+    Properties with ISO date strings of the date properties converted to datetime.date
+
+    Numbers and other values are kept as they are. The Neo4j driver sends a date as a
+    Cypher DATE, which the relationship range indexes can serve in date filters.
+    """
+    if not properties:
+        return properties or {}
+    typed = dict(properties)
+    for key, value in properties.items():
+        if key in DATE_PROPERTY_NAMES and isinstance(value, str) and _ISO_DATE.fullmatch(value):
+            typed[key] = datetime.date.fromisoformat(value)
+    return typed
+
+
+def convert_string_dates(neo4j_graph) -> None:
+    """
+    Convert date properties still stored as ISO strings (by an older import) to DATE
+
+    The STARTS WITH '' predicate only matches strings, through the range index where
+    there is one, so graphs already holding dates pay a single index lookup.
+    """
+    targets = [(f"(n:{_quote(label)})", "n", prop) for label, props in NODE_DATE_PROPERTIES.items() for prop in props]
+    targets += [(f"()-[r:{_quote(rel_type)}]->()", "r", prop) for rel_type, prop in RELATIONSHIP_DATE_INDEXES.values()]
+    for pattern, var, prop in targets:
+        neo4j_graph.query(
+            f"MATCH {pattern} WHERE {var}.{prop} STARTS WITH '' AND {var}.{prop} =~ '\\\\d{{4}}-\\\\d{{2}}-\\\\d{{2}}' "
+            f"SET {var}.{prop} = date({var}.{prop})")
+
+
+def missing_schema(neo4j_graph, labels=None) -> list:
+    """Return the names of the expected constraints and indexes missing from the database"""
+    expected = [constraint_name(label) for label in (labels or NODE_LABELS + ROLLUP_LABELS)]
+    expected += list(TEXT_INDEXES) + list(FULLTEXT_INDEXES) + list(ROLLUP_INDEXES) + list(RELATIONSHIP_DATE_INDEXES)
+
+    existing = {row["name"] for row in neo4j_graph.query("SHOW CONSTRAINTS YIELD name RETURN name")}
+    existing |= {row["name"] for row in neo4j_graph.query("SHOW INDEXES YIELD name RETURN name")}
+    return [name for name in expected if name not in existing]
+
+
+def report_missing_schema(neo4j_graph) -> list:
+    """Print a warning listing missing constraints and indexes; returns the missing names"""
+    try:
+        missing = missing_schema(neo4j_graph)
+    except Exception as e:
+        print(f"Could not check graph indexes: {e}")
+        return []
+
+    if missing:
+        print(f"Missing graph constraints/indexes: {', '.join(missing)}. "
+              "Run the data loader to create them; until then name lookups scan every "
+              "Campaign/User node instead of using the full-text indexes.")
+    return missing
+
+
+def is_missing_fulltext_index(error: Exception) -> bool:
+    """Whether a query failed because a full-text index it calls does not exist"""
+    return _MISSING_FULLTEXT.search(str(error)) is not None
+
+
+def query_with_scan_fallback(neo4j_graph, query: str, params: dict, scan_query: str) -> list:
+    """
+    Run a lookup query, retrying with scan_query (its full-text lookup replaced by a
+    label scan) when the database has no full-text index yet
+    """
+    try:
+        return neo4j_graph.query(query, params=params)
+    except Exception as e:
+        if not is_missing_fulltext_index(e):
+            raise
+        return neo4j_graph.query(scan_query, params=params)
+
+
+async def aquery_with_scan_fallback(async_graph, query: str, params: dict, scan_query: str) -> list:
+    """query_with_scan_fallback on an async graph"""
+    try:
+        return await async_graph.query(query, params=params)
+    except Exception as e:
+        if not is_missing_fulltext_index(e):
+            raise
+        return await async_graph.query(scan_query, params=params)
+
+
+def fulltext_search_term(text: str) -> str:
+    """
+    Build a Lucene query for a full-text name index from free user input
+
+    Every word must match as a prefix, and the exact phrase is boosted so that
+    "Campaign 1" ranks "Campaign 1" above "Campaign 12". Returns "" when the
+    input contains no word characters.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return ""
+    prefixes = " AND ".join(f"{word}*" for word in words)
+    return f'"{" ".join(words)}"^4 OR ({prefixes})'
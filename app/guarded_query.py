@@ -0,0 +1,161 @@
+"""
+Guarded execution of ad-hoc (LLM-written) Cypher for graph_query
+
+Before a query runs, its EXPLAIN plan is checked against an estimated row budget.
+The query then runs in a read transaction with a server-side timeout, a LIMIT is
+injected (or tightened) on its final RETURN when that can be done safely, and
+records are streamed so that at most max_rows are materialized; the rest of the
+result is discarded on the server.
+"""
+import re
+from typing import Any, Dict
+
+from neo4j import unit_of_work
+
+from instrumentation import graph_step
+
+
+class QueryRejected(Exception):
+    """The query's plan exceeds the configured cost budget"""
+
+
+_UNION = re.compile(r"\bUNION\b", re.IGNORECASE)
+_RETURN = re.compile(r"\bRETURN\b", re.IGNORECASE)
+_FINAL_LIMIT = re.compile(r"\bLIMIT\s+(\d+)\s*$", re.IGNORECASE)
+_PLAN_PREFIX = re.compile(r"^\s*(EXPLAIN|PROFILE)\b", re.IGNORECASE)
+
+
+def cap_query(query: str, max_rows: int) -> tuple:
+    """
+    Add or tighten a LIMIT on the final RETURN of a query so it returns at most max_rows + 1 rows
+
+    The extra row lets the caller detect truncation. Queries whose last clause is not
+    a plain RETURN (UNIONs, subqueries at the end, procedure calls, parameter limits)
+    are left unchanged and only capped while streaming.
+    Returns the query and whether it was changed.
+    """
+    text = query.strip().rstrip(";").rstrip()
+    returns = list(_RETURN.finditer(text))
+    if not returns or _UNION.search(text) or "}" in text[returns[-1].end():]:
+        return query, False
+
+    cap = max_rows + 1
+    limit = _FINAL_LIMIT.search(text, returns[-1].end())
+    if limit is None:
+        if re.search(r"\b(SKIP|LIMIT)\b", text[returns[-1].end():], re.IGNORECASE):
+            return query, False
+        return f"{text}\nLIMIT {cap}", True
+    if int(limit.group(1)) <= cap:
+        return query, False
+    return f"{text[:limit.start(1)]}{cap}", True
+
+
+def max_estimated_rows(plan: Dict[str, Any]) -> float:
+    """Largest EstimatedRows of any operator in an EXPLAIN plan"""
+    if not plan:
+        return 0.0
+    estimate = float(plan.get("args", {}).get("EstimatedRows", 0) or 0)
+    return max([estimate] + [max_estimated_rows(child) for child in plan.get("children", [])])
+
+
+def _check_plan(plan: Dict[str, Any], row_budget: float) -> float:
+    estimate = max_estimated_rows(plan)
+    if row_budget and estimate > row_budget:
+        raise QueryRejected(
+            f"The query plan estimates {estimate:,.0f} rows in an intermediate step (budget {row_budget:,.0f}). "
+            "Add selective MATCH filters or aggregate before returning."
+        )
+    return estimate
+
+
+def _stream(records, max_rows: int) -> tuple:
+    rows = []
+    for record in records:
+        if len(rows) == max_rows:
+            return rows, True
+        rows.append(record.data())
+    return rows, False
+
+
+def run_guarded(neo4j_graph, query: str, params: Dict[str, Any] = None, max_rows: int = 50,
+                timeout: float = 10.0, row_budget: float = 1_000_000) -> Dict[str, Any]:
+    """
+    Run an ad-hoc read query with a cost check, row cap, timeout and streaming
+
+    Args:
+        neo4j_graph: Neo4jGraph (or CachedGraph wrapper) exposing _driver and _database
+        query: Cypher text
+        params: Query parameters
+        max_rows: Rows returned at most; further rows are not fetched
+        timeout: Server-side transaction timeout in seconds
+        row_budget: Largest EstimatedRows allowed in the EXPLAIN plan (0 disables the check)
+
+    Returns:
+        dict with rows, truncated, estimated_rows and limit_injected
+
+    Raises:
+        QueryRejected: when the plan exceeds row_budget
+    """
+    capped, limit_injected = cap_query(query, max_rows)
+    params = params or {}
+
+    @unit_of_work(timeout=timeout)
+    def explain(tx):
+        return tx.run(f"EXPLAIN {capped}", params).consume().plan
+
+    @unit_of_work(timeout=timeout)
+    def fetch(tx):
+        result = tx.run(capped, params)
+        rows, truncated = _stream(result, max_rows)
+        # Tell the server to drop the remaining records instead of sending them
+        result.consume()
+        return rows, truncated
+
+    # A small fetch size keeps the client from pulling a large batch past the cap
+    with graph_step(capped) as step, \
+            neo4j_graph._driver.session(database=neo4j_graph._database, fetch_size=max_rows + 1) as session:
+        estimate = 0.0
+        if not _PLAN_PREFIX.match(capped):
+            estimate = _check_plan(session.execute_read(explain), row_budget)
+        rows, truncated = session.execute_read(fetch)
+        step["rows"] = len(rows)
+
+    return {"rows": rows, "truncated": truncated, "estimated_rows": estimate, "limit_injected": limit_injected}
+
+
+async def arun_guarded(async_graph, query: str, params: Dict[str, Any] = None, max_rows: int = 50,
+                       timeout: float = 10.0, row_budget: float = 1_000_000) -> Dict[str, Any]:
+    """run_guarded on an AsyncNeo4jGraph (or AsyncCachedGraph wrapper)"""
+    capped, limit_injected = cap_query(query, max_rows)
+    params = params or {}
+
+    @unit_of_work(timeout=timeout)
+    async def explain(tx):
+        result = await tx.run(f"EXPLAIN {capped}", params)
+        return (await result.consume()).plan
+
+    @unit_of_work(timeout=timeout)
+    async def fetch(tx):
+        result = await tx.run(capped, params)
+        rows, truncated = [], False
+        async for record in result:
+            if len(rows) == max_rows:
+                truncated = True
+                break
+            rows.append(record.data())
+        await result.consume()
+        return rows, truncated
+
+    async def execute(driver):
+        async with driver.session(database=async_graph.database, fetch_size=max_rows + 1) as session:
+            estimate = 0.0
+            if not _PLAN_PREFIX.match(capped):
+                estimate = _check_plan(await session.execute_read(explain), row_budget)
+            rows, truncated = await session.execute_read(fetch)
+        return rows, truncated, estimate
+
+    with graph_step(capped) as step:
+        rows, truncated, estimate = await async_graph.run(execute)
+        step["rows"] = len(rows)
+
+    return {"rows": rows, "truncated": truncated, "estimated_rows": estimate, "limit_injected": limit_injected}
@@ -0,0 +1,203 @@
+"""
+Content-hash manifest of the rows a delta import has written
+
+The manifest is a local SQLite file holding, for every node (by id) and relationship
+(by type, start and end id) written by data_loader.delta_insert_data, a hash of its
+label and properties. Comparing an incoming row's hash with the manifest tells
+whether it is new, changed or unchanged; manifest rows not seen in an import are the
+deletions. The manifest also records the graph data version it describes, so a
+write made by any other path (which bumps the version) makes it untrusted.
+"""
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+# Host parameters per SQLite statement stay well below its default limit
+LOOKUP_BATCH_SIZE = 500
+
+
+def content_hash(label: str, properties: Dict[str, Any]) -> str:
+    payload = json.dumps([label, properties or {}], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def relationship_key(relationship: Dict[str, Any]) -> Tuple[str, str, str]:
+    return relationship['label'], relationship['from'], relationship['to']
+
+
+class ImportManifest:
+    """
+    SQLite-backed hashes of the imported nodes and relationships
+
+    Besides the stored hashes, the manifest tracks the keys seen during the current
+    import (in temporary tables) so the rows missing from it can be listed at the end.
+    """
+
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS nodes (id TEXT PRIMARY KEY, label TEXT NOT NULL, hash TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS relationships (
+                type TEXT NOT NULL, source TEXT NOT NULL, target TEXT NOT NULL,
+                source_label TEXT NOT NULL, target_label TEXT NOT NULL, hash TEXT NOT NULL,
+                PRIMARY KEY (type, source, target));
+            CREATE INDEX IF NOT EXISTS relationships_target ON relationships (target);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TEMP TABLE seen_nodes (id TEXT PRIMARY KEY);
+            CREATE TEMP TABLE seen_relationships (type TEXT, source TEXT, target TEXT,
+                PRIMARY KEY (type, source, target));
+        """)
+
+    def get_meta(self, key: str):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value) -> None:
+        if value is None:
+            self._db.execute("DELETE FROM meta WHERE key = ?", (key,))
+        else:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+        self._db.commit()
+
+    @property
+    def data_version(self):
+        version = self.get_meta('data_version')
+        return int(version) if version is not None else None
+
+    @data_version.setter
+    def data_version(self, version: int) -> None:
+        self.set_meta('data_version', version)
+
+    def is_empty(self) -> bool:
+        return self._db.execute("SELECT NOT EXISTS (SELECT 1 FROM nodes)").fetchone()[0] == 1
+
+    def reset(self) -> None:
+        """Forget every stored hash"""
+        self._db.executescript("DELETE FROM nodes; DELETE FROM relationships; DELETE FROM meta;")
+
+    def _lookup(self, query: str, keys: List[tuple]) -> Dict[tuple, tuple]:
+        found = {}
+        width = len(keys[0]) if keys else 1
+        for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            batch = keys[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ",".join(["(" + ",".join("?" * width) + ")"] * len(batch))
+            rows = self._db.execute(query.format(keys=placeholders), [v for key in batch for v in key])
+            for row in rows:
+                found[row[:width]] = row[width:]
+        return found
+
+    def diff_nodes(self, nodes: List[Dict[str, Any]]) -> Dict[str, list]:
+        """
+        Split nodes into new / changed / unchanged and mark them seen
+
+        A node whose label changed is reported in "relabeled" as (id, old label) as well
+        as in "changed". Every returned node carries its hash under "_hash".
+        """
+        stored = self._lookup("SELECT id, label, hash FROM nodes WHERE (id) IN (VALUES {keys})",
+                              [(node['id'],) for node in nodes])
+        result = {"new": [], "changed": [], "unchanged": [], "relabeled": []}
+        for node in nodes:
+            node = dict(node, _hash=content_hash(node['label'], node.get('properties')))
+            previous = stored.get((node['id'],))
+            if previous is None:
+                result["new"].append(node)
+            elif previous[1] != node['_hash']:
+                result["changed"].append(node)
+                if previous[0] != node['label']:
+                    result["relabeled"].append((node['id'], previous[0]))
+            else:
+                result["unchanged"].append(node)
+        self._db.executemany("INSERT OR IGNORE INTO seen_nodes (id) VALUES (?)", [(node['id'],) for node in nodes])
+        return result
+
+    def diff_relationships(self, relationships: List[Dict[str, Any]]) -> Dict[str, list]:
+        """
+        Split relationships into new / changed / unchanged and mark them seen
+
+        Rows repeating the key of an earlier row of this import are reported in
+        "duplicate" and otherwise ignored: the graph holds one edge per key, and the
+        bulk loaders keep the first row's properties (ON CREATE SET), so the delta
+        import does too.
+        """
+        seen = self._lookup(
+            "SELECT type, source, target FROM seen_relationships WHERE (type, source, target) IN (VALUES {keys})",
+            [relationship_key(r) for r in relationships])
+        unique = {}
+        duplicate = []
+        for relationship in relationships:
+            key = relationship_key(relationship)
+            if key in seen or key in unique:
+                duplicate.append(relationship)
+            else:
+                unique[key] = relationship
+        relationships = list(unique.values())
+
+        stored = self._lookup(
+            "SELECT type, source, target, hash FROM relationships WHERE (type, source, target) IN (VALUES {keys})",
+            [relationship_key(r) for r in relationships])
+        result = {"new": [], "changed": [], "unchanged": [], "duplicate": duplicate}
+        for relationship in relationships:
+            relationship = dict(relationship,
+                                _hash=content_hash(relationship['label'], relationship.get('properties')))
+            previous = stored.get(relationship_key(relationship))
+            if previous is None:
+                result["new"].append(relationship)
+            elif previous[0] != relationship['_hash']:
+                result["changed"].append(relationship)
+            else:
+                result["unchanged"].append(relationship)
+        self._db.executemany("INSERT OR IGNORE INTO seen_relationships (type, source, target) VALUES (?, ?, ?)",
+                             [relationship_key(r) for r in relationships])
+        return result
+
+    def store_nodes(self, nodes: Iterable[Dict[str, Any]]) -> None:
+        self._db.executemany("INSERT OR REPLACE INTO nodes (id, label, hash) VALUES (?, ?, ?)",
+                             [(node['id'], node['label'], node['_hash']) for node in nodes])
+        self._db.commit()
+
+    def store_relationships(self, relationships: Iterable[Dict[str, Any]], id_labels: Dict[str, str]) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO relationships (type, source, target, source_label, target_label, hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(r['label'], r['from'], r['to'], id_labels[r['from']], id_labels[r['to']], r['_hash'])
+             for r in relationships])
+        self._db.commit()
+
+    def forget_relationships_of(self, node_ids: List[str]) -> None:
+        """Drop the hashes of the relationships touching these nodes, so they are written again"""
+        for start in range(0, len(node_ids), LOOKUP_BATCH_SIZE):
+            batch = node_ids[start:start + LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            self._db.execute(f"DELETE FROM relationships WHERE source IN ({placeholders}) "
+                             f"OR target IN ({placeholders})", batch + batch)
+        self._db.commit()
+
+    def unseen_nodes(self) -> List[Tuple[str, str]]:
+        """(id, label) of the stored nodes not seen in this import"""
+        return self._db.execute(
+            "SELECT id, label FROM nodes WHERE id NOT IN (SELECT id FROM seen_nodes)").fetchall()
+
+    def unseen_relationships(self) -> List[Dict[str, str]]:
+        """Stored relationships not seen in this import, with their endpoint labels"""
+        rows = self._db.execute("""
+            SELECT r.type, r.source, r.target, r.source_label, r.target_label FROM relationships r
+            LEFT JOIN seen_relationships s ON s.type = r.type AND s.source = r.source AND s.target = r.target
+            WHERE s.type IS NULL""").fetchall()
+        return [{'label': t, 'from': s, 'to': e, 'from_label': sl, 'to_label': el} for t, s, e, sl, el in rows]
+
+    def remove_nodes(self, node_ids: List[str]) -> None:
+        self._db.executemany("DELETE FROM nodes WHERE id = ?", [(node_id,) for node_id in node_ids])
+        self._db.commit()
+
+    def remove_relationships(self, relationships: List[Dict[str, str]]) -> None:
+        self._db.executemany("DELETE FROM relationships WHERE type = ? AND source = ? AND target = ?",
+                             [relationship_key(r) for r in relationships])
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
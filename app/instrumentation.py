@@ -0,0 +1,282 @@
+"""
+Per-request latency, token and row instrumentation of the agent
+
+Every MarketingAnalyticsAgent.analyze call runs with a RequestTrace: the
+InstrumentationHandler callback times the LLM calls (with their token counts) and
+tool runs, and TimedGraph / AsyncTimedGraph time each graph query and count the rows
+it returned and whether the query cache answered it. Finished traces are kept in a
+bounded history (request_metrics) that can be exported as JSONL or Prometheus text.
+"""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+# Trace of the analyze call running in this context, if any
+current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("current_trace", default=None)
+# Set by CachedGraph when the query of the current context was served from the cache
+_query_cache_hit: ContextVar[bool] = ContextVar("query_cache_hit", default=False)
+
+
+def mark_query_cache_hit() -> None:
+    """Flag the graph query running in this context as answered by the query cache"""
+    _query_cache_hit.set(True)
+
+
+class RequestTrace:
+    """Timings of one analyze call, broken down into LLM, tool and graph steps"""
+
+    def __init__(self, question: str) -> None:
+        self.question = question
+        self.timestamp = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.steps: List[Dict[str, Any]] = []
+        self.seconds = 0.0
+        self.outcome = None
+        self.error = None
+
+    def add_step(self, kind: str, name: str, seconds: float, **details) -> None:
+        with self._lock:
+            self.steps.append({"kind": kind, "name": name, "ms": round(1000 * seconds, 2), **details})
+
+    def finish(self, outcome: str = "agent", error: str = None) -> None:
+        self.seconds = time.perf_counter() - self._started
+        self.outcome = outcome
+        self.error = error
+
+    def breakdown(self) -> Dict[str, Any]:
+        """
+        Milliseconds spent in the LLM, in top-level tools (graph time included) and elsewhere
+
+        graph_ms adds up the queries' own durations, so with concurrent tool calls it can
+        exceed tool_ms.
+        """
+        with self._lock:
+            steps = list(self.steps)
+        llm_ms = sum(s["ms"] for s in steps if s["kind"] == "llm")
+        tool_ms = sum(s["ms"] for s in steps if s["kind"] == "tool" and not s.get("nested"))
+        graph_ms = sum(s["ms"] for s in steps if s["kind"] == "graph")
+        total_ms = round(1000 * self.seconds, 2)
+        return {
+            "total_ms": total_ms,
+            "llm_ms": round(llm_ms, 2),
+            "tool_ms": round(tool_ms, 2),
+            "graph_ms": round(graph_ms, 2),
+            "other_ms": round(max(0.0, total_ms - llm_ms - tool_ms), 2),
+            "llm_calls": sum(1 for s in steps if s["kind"] == "llm"),
+            "tool_calls": sum(1 for s in steps if s["kind"] == "tool"),
+            "graph_queries": sum(1 for s in steps if s["kind"] == "graph"),
+            "query_cache_hits": sum(1 for s in steps if s["kind"] == "graph" and s.get("cache_hit")),
+            "rows": sum(s.get("rows", 0) for s in steps if s["kind"] == "graph"),
+            "prompt_tokens": sum(s.get("prompt_tokens", 0) for s in steps),
+            "completion_tokens": sum(s.get("completion_tokens", 0) for s in steps),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = list(self.steps)
+        return {
+            "timestamp": self.timestamp,
+            "question": self.question,
+            "outcome": self.outcome,
+            "error": self.error,
+            **self.breakdown(),
+            "steps": steps,
+        }
+
+
+def _token_usage(response) -> Dict[str, int]:
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {"prompt_tokens": usage.get("prompt_tokens", 0), "completion_tokens": usage.get("completion_tokens", 0)}
+    # Streamed chat responses report usage on the message instead
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                return {"prompt_tokens": metadata.get("input_tokens", 0),
+                        "completion_tokens": metadata.get("output_tokens", 0)}
+    return {}
+
+
+class InstrumentationHandler(BaseCallbackHandler):
+    """Record the LLM calls and tool runs of an agent run into a RequestTrace"""
+
+    # Only bookkeeping: run in the event loop instead of an executor thread
+    run_inline = True
+
+    def __init__(self, trace: RequestTrace) -> None:
+        self.trace = trace
+        self._started = {}
+        self._tool_runs = set()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.trace.add_step("llm", "llm", time.perf_counter() - started, **_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.trace.add_step("llm", "llm", time.perf_counter() - started, error=str(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs) -> None:
+        self._started[run_id] = (time.perf_counter(), (serialized or {}).get("name") or kwargs.get("name", "tool"),
+                                 parent_run_id in self._tool_runs)
+        self._tool_runs.add(run_id)
+
+    def _end_tool(self, run_id, **details) -> None:
+        started = self._started.pop(run_id, None)
+        self._tool_runs.discard(run_id)
+        if started is not None:
+            started_at, name, nested = started
+            # Calls made inside run_tools_in_parallel are part of its time
+            self.trace.add_step("tool", name, time.perf_counter() - started_at, nested=nested, **details)
+
+    def on_tool_end(self, output, *, run_id, **kwargs) -> None:
+        self._end_tool(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs) -> None:
+        self._end_tool(run_id, error=str(error))
+
+
+@contextmanager
+def graph_step(query: str):
+    """
+    Time a graph query of the current trace; the caller may set "rows" on the yielded dict
+
+    Outside an instrumented analyze call this only runs the body.
+    """
+    trace = current_trace.get()
+    step = {}
+    token = _query_cache_hit.set(False)
+    started = time.perf_counter()
+    try:
+        yield step
+    finally:
+        cache_hit = _query_cache_hit.get()
+        _query_cache_hit.reset(token)
+        if trace is not None:
+            trace.add_step("graph", " ".join(query.split())[:120], time.perf_counter() - started,
+                           rows=step.get("rows", 0), cache_hit=cache_hit)
+
+
+class TimedGraph:
+    """Wrapper around a graph client recording every query() into the current RequestTrace"""
+
+    def __init__(self, graph) -> None:
+        self.graph = graph
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+    def query(self, query: str, params: dict = {}) -> List[Dict[str, Any]]:
+        with graph_step(query) as step:
+            result = self.graph.query(query, params=params)
+            step["rows"] = len(result)
+        return result
+
+
+class AsyncTimedGraph:
+    """Async counterpart of TimedGraph"""
+
+    def __init__(self, graph) -> None:
+        self.graph = graph
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+    async def query(self, query: str, params: dict = {}) -> List[Dict[str, Any]]:
+        with graph_step(query) as step:
+            result = await self.graph.query(query, params=params)
+            step["rows"] = len(result)
+        return result
+
+
+class RequestMetrics:
+    """
+    Bounded history of finished RequestTraces plus process-wide totals
+
+    The history keeps the latest max_traces requests; the totals exported to
+    Prometheus cover every request since the process started.
+    """
+
+    def __init__(self, max_traces: int = 200) -> None:
+        self._lock = threading.Lock()
+        self._traces = deque(maxlen=max_traces)
+        self._totals = {}
+        self._outcomes = {}
+
+    def record(self, trace: RequestTrace) -> None:
+        summary = trace.to_dict()
+        with self._lock:
+            self._traces.append(summary)
+            self._outcomes[summary["outcome"]] = self._outcomes.get(summary["outcome"], 0) + 1
+            for key in ("total_ms", "llm_ms", "tool_ms", "graph_ms", "llm_calls", "tool_calls", "graph_queries",
+                        "query_cache_hits", "rows", "prompt_tokens", "completion_tokens"):
+                self._totals[key] = self._totals.get(key, 0) + summary[key]
+
+    def history(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._traces)
+
+    def summary(self) -> Dict[str, Any]:
+        """Request count and average / p50 / p95 latency components over the history"""
+        history = self.history()
+        if not history:
+            return {"requests": 0}
+
+        def percentile(values, q):
+            values = sorted(values)
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        result = {"requests": len(history)}
+        for key in ("total_ms", "llm_ms", "tool_ms", "graph_ms", "other_ms"):
+            values = [trace[key] for trace in history]
+            result[key] = {"avg": round(sum(values) / len(values), 2),
+                           "p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+        for key in ("prompt_tokens", "completion_tokens", "rows", "graph_queries", "query_cache_hits"):
+            result[f"avg_{key}"] = round(sum(trace[key] for trace in history) / len(history), 2)
+        return result
+
+    def to_jsonl(self) -> str:
+        return "".join(json.dumps(trace, default=str) + "\n" for trace in self.history())
+
+    def to_prometheus(self, prefix: str = "marketing_agent") -> str:
+        """Process-wide totals in the Prometheus text exposition format"""
+        with self._lock:
+            totals = dict(self._totals)
+            outcomes = dict(self._outcomes)
+        lines = [f"# TYPE {prefix}_requests_total counter"]
+        lines += [f'{prefix}_requests_total{{outcome="{outcome}"}} {count}' for outcome, count in sorted(outcomes.items())]
+        for component, key in (("request", "total_ms"), ("llm", "llm_ms"), ("tool", "tool_ms"), ("graph", "graph_ms")):
+            name = f"{prefix}_{component}_seconds_total"
+            lines += [f"# TYPE {name} counter", f"{name} {totals.get(key, 0) / 1000:.6f}"]
+        for key in ("llm_calls", "tool_calls", "graph_queries", "query_cache_hits", "rows",
+                    "prompt_tokens", "completion_tokens"):
+            name = f"{prefix}_{key}_total"
+            lines += [f"# TYPE {name} counter", f"{name} {totals.get(key, 0)}"]
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+            self._totals.clear()
+            self._outcomes.clear()
+
+
+# Traces of the analyze calls of every agent in this process
+request_metrics = RequestMetrics()
@@ -0,0 +1,261 @@
+"""
+Deterministic fast path in front of the ReAct agent
+
+IntentRouter recognizes the most frequent question shapes (a campaign's
+performance, a user's behavior, schema questions and raw Cypher), calls the
+matching tool directly and phrases the answer from the tool's result, so these
+questions cost no LLM call. Anything it is not confident about, and any tool
+error, is left to the agent.
+"""
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.agents import AgentAction
+from langchain_core.tools import BaseTool
+
+from date_window import parse_date_window
+
+
+CYPHER_START = re.compile(
+    r"^\s*((OPTIONAL\s+)?MATCH\s*\(|CALL\s+[\w.]+\s*\(|RETURN\s|UNWIND\s|WITH\s"
+    r"|SHOW\s+(\w+\s+)?(INDEXES|CONSTRAINTS|DATABASES|PROCEDURES|FUNCTIONS|TRANSACTIONS)\b)",
+    re.IGNORECASE,
+)
+CAMPAIGN_ID = re.compile(r"\bcampaign_\d+\b", re.IGNORECASE)
+USER_ID = re.compile(r"\buser_\d+\b", re.IGNORECASE)
+
+SCHEMA_QUESTION = re.compile(
+    r"\b(schema|data model|(node )?labels?|relationship types?|what (kinds?|types) of (nodes|relationships)"
+    r"|(what|which) properties)\b",
+    re.IGNORECASE,
+)
+CAMPAIGN_QUESTION = re.compile(
+    r"\b(perform\w*|doing|results?|roi|return on investment|budget|stats|metrics|analy[sz]e|summar\w+|overview"
+    r"|how (is|was|did))\b",
+    re.IGNORECASE,
+)
+USER_QUESTION = re.compile(
+    r"\b(behaviou?r|activity|engagement|interact\w*|views?|clicks?|conversions?|analy[sz]e|summar\w+|profile"
+    r"|what did|how (is|was|did|has))\b",
+    re.IGNORECASE,
+)
+# Lowercase words a capitalized name may contain ("Back to School")
+NAME_CONNECTORS = {"to", "of", "and", "the", "for"}
+
+# Campaign / user named in quotes or as a capitalized phrase next to the entity word
+CAMPAIGN_NAME = re.compile(
+    r"""campaign\s+["'](?P<quoted>[^"']+)["']|["'](?P<quoted_before>[^"']+)["']\s+campaign"""
+    r"""|(?:the\s+)?(?P<titled>[A-Z][\w&'-]*(?:\s+(?:(?:to|of|and|the|for)\s+)*[A-Z][\w&'-]*){0,4})"""
+    r"""\s+campaign\b""",
+)
+USER_NAME = re.compile(
+    r"""user\s+["'](?P<quoted>[^"']+)["']|\buser\s+(?P<titled>[A-Z][\w'-]+(?:\s+[A-Z][\w'-]+)+)"""
+    r"""|\b(?P<possessive>[A-Z][\w'-]+\s+[A-Z][\w'-]+)'s\s+(?:behaviou?r|activity|engagement)""",
+)
+
+# Sentence-initial words a capitalized name match may start with
+LEADING_WORDS = {"how", "what", "show", "analyze", "analyse", "summarize", "summarise", "give", "tell", "did", "is",
+                 "was", "the", "describe", "get", "check"}
+
+# Questions the tools cannot answer directly: comparisons, rankings and advice
+NEEDS_AGENT = re.compile(
+    r"\b(compare|comparison|versus|vs\.?|than|rank\w*|best|worst|top|highest|lowest|most|least|why|should"
+    r"|recommend\w*|suggest\w*|predict\w*)\b",
+    re.IGNORECASE,
+)
+# Time references left over once parse_date_window has taken the window it understands;
+# answering these with all-time numbers would be wrong, so they go to the agent
+TEMPORAL = re.compile(
+    r"\b(today|tonight|yesterday|tomorrow|recent\w*|lately|currently|now|this (day|week|month|quarter|year)"
+    r"|last|past|previous|next|since|until|till|before|after|between|during|q[1-4]|quarter\w*|ytd"
+    r"|(day|week|month|year)s? ago|daily|weekly|monthly|yearly|annual\w*|january|february|march|april|may|june"
+    r"|july|august|september|october|november|december|\d{4}-\d{2}(-\d{2})?)\b",
+    re.IGNORECASE,
+)
+
+# Tool outputs that report a failure instead of a result
+TOOL_ERROR = re.compile(r"^\s*(❌|Query (execution failed|rejected)\b|Failed to\b)")
+
+
+class RouterStats:
+    """Thread-safe counters of how often the fast path answers a question"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.questions = 0
+        self.routed = {}
+        self.fallbacks = {}
+        self.fast_path_seconds = 0.0
+
+    def record_routed(self, intent: str, seconds: float) -> None:
+        with self._lock:
+            self.questions += 1
+            self.routed[intent] = self.routed.get(intent, 0) + 1
+            self.fast_path_seconds += seconds
+
+    def record_fallback(self, reason: str) -> None:
+        with self._lock:
+            self.questions += 1
+            self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routed = sum(self.routed.values())
+            return {
+                "questions": self.questions,
+                "fast_path": routed,
+                "fast_path_rate": round(routed / self.questions, 3) if self.questions else 0.0,
+                "avg_fast_path_ms": round(1000 * self.fast_path_seconds / routed, 1) if routed else 0.0,
+                "routed_by_intent": dict(self.routed),
+                "fallbacks_by_reason": dict(self.fallbacks),
+            }
+
+
+# Fast path statistics of every agent in this process
+router_stats = RouterStats()
+
+
+class IntentRouter:
+    """
+    Route high-frequency questions straight to a tool
+
+    Args:
+        tools: The agent's tools; intents whose tool is missing are not routed
+        min_confidence: Routes scored below this are left to the agent
+    """
+
+    def __init__(self, tools: List[BaseTool], min_confidence: float = 0.8, stats: RouterStats = None) -> None:
+        self.tools = {tool.name: tool for tool in tools}
+        self.min_confidence = min_confidence
+        self.stats = stats if stats is not None else router_stats
+
+    @staticmethod
+    def _name(match) -> Optional[str]:
+        if match is None:
+            return None
+        words = next((value.split() for value in match.groupdict().values() if value), [])
+        while words and (words[0].lower() in LEADING_WORDS or words[0] in NAME_CONNECTORS):
+            words = words[1:]
+        return re.sub(r"['’]s$", "", " ".join(words)) or None
+
+    @staticmethod
+    def _truncated(text: str, match) -> bool:
+        """Whether a capitalized name match is only the tail of a longer capitalized run"""
+        if match is None or not match.group("titled"):
+            return False
+        words = text[:match.start("titled")].split()
+        while words and words[-1] in NAME_CONNECTORS:
+            words.pop()
+        return bool(words) and re.match(r"[A-Z0-9]", words[-1]) is not None \
+            and words[-1].lower() not in LEADING_WORDS
+
+    def match(self, question: str) -> Optional[Dict[str, Any]]:
+        """Return the route {intent, tool, tool_input, confidence} for a question, or None"""
+        text = question.strip()
+        if CYPHER_START.match(text) and re.search(r"\b(RETURN|YIELD|SHOW)\b", text, re.IGNORECASE):
+            return {"intent": "cypher", "tool": "graph_query", "tool_input": text, "confidence": 0.95}
+        # Campaign and user tools take the date window after the name
+        try:
+            text, window = parse_date_window(text)
+        except ValueError:
+            return None
+        route = self._match_entity(text)
+        if route is not None and window is not None:
+            if route["intent"] not in ("campaign", "user"):
+                return None
+            route["tool_input"] = f"{route['tool_input']}; {window.describe()}"
+        return route
+
+    def _match_entity(self, text: str) -> Optional[Dict[str, Any]]:
+        if NEEDS_AGENT.search(text) or TEMPORAL.search(text):
+            return None
+
+        campaign_ids = set(m.lower() for m in CAMPAIGN_ID.findall(text))
+        user_ids = set(m.lower() for m in USER_ID.findall(text))
+        if len(campaign_ids) + len(user_ids) > 1:
+            return None
+        if campaign_ids:
+            confidence = 0.95 if CAMPAIGN_QUESTION.search(text) or len(text.split()) <= 3 else 0.6
+            return {"intent": "campaign", "tool": "analyze_campaign", "tool_input": campaign_ids.pop(),
+                    "confidence": confidence}
+        if user_ids:
+            confidence = 0.95 if USER_QUESTION.search(text) or len(text.split()) <= 3 else 0.6
+            return {"intent": "user", "tool": "analyze_user_behavior", "tool_input": user_ids.pop(),
+                    "confidence": confidence}
+
+        if SCHEMA_QUESTION.search(text):
+            return {"intent": "schema", "tool": "schema_tool", "tool_input": "", "confidence": 0.9}
+
+        campaign_match = CAMPAIGN_NAME.search(text)
+        campaign_name = self._name(campaign_match)
+        if campaign_name and CAMPAIGN_QUESTION.search(text) and not self._truncated(text, campaign_match):
+            return {"intent": "campaign", "tool": "analyze_campaign", "tool_input": campaign_name,
+                    "confidence": 0.85}
+        user_name = self._name(USER_NAME.search(text))
+        if user_name and USER_QUESTION.search(text):
+            return {"intent": "user", "tool": "analyze_user_behavior", "tool_input": user_name,
+                    "confidence": 0.85}
+        return None
+
+    def _accept(self, question: str) -> Optional[Dict[str, Any]]:
+        route = self.match(question)
+        if route is None:
+            self.stats.record_fallback("no_match")
+            return None
+        if route["tool"] not in self.tools:
+            self.stats.record_fallback("tool_unavailable")
+            return None
+        if route["confidence"] < self.min_confidence:
+            self.stats.record_fallback("low_confidence")
+            return None
+        return route
+
+    def _answer(self, route: Dict[str, Any], observation: Any, started: float) -> Optional[Dict[str, Any]]:
+        if isinstance(observation, dict):
+            if "error" in observation:
+                self.stats.record_fallback("tool_error")
+                return None
+            answer = observation.get("summary") or str(observation)
+        else:
+            answer = str(observation)
+            if TOOL_ERROR.match(answer):
+                self.stats.record_fallback("tool_error")
+                return None
+
+        self.stats.record_routed(route["intent"], time.perf_counter() - started)
+        action = AgentAction(tool=route["tool"], tool_input=route["tool_input"],
+                             log=f"Fast path: {route['intent']} (confidence {route['confidence']})")
+        return {"analysis": answer, "intermediate_steps": [(action, observation)], "routed": route["intent"]}
+
+    def route(self, question: str, callbacks: List[Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        Answer a question through the fast path
+
+        Returns the analysis and intermediate steps, or None when the question should
+        go to the agent
+        """
+        started = time.perf_counter()
+        route = self._accept(question)
+        if route is None:
+            return None
+        try:
+            observation = self.tools[route["tool"]].run(route["tool_input"], callbacks=callbacks)
+        except Exception:
+            self.stats.record_fallback("tool_error")
+            return None
+        return self._answer(route, observation, started)
+
+    async def aroute(self, question: str, callbacks: List[Any] = None) -> Optional[Dict[str, Any]]:
+        """route() using the tools' async paths; callbacks receive the tool events"""
+        started = time.perf_counter()
+        route = self._accept(question)
+        if route is None:
+            return None
+        try:
+            observation = await self.tools[route["tool"]].arun(route["tool_input"], callbacks=callbacks)
+        except Exception:
+            self.stats.record_fallback("tool_error")
+            return None
+        return self._answer(route, observation, started)
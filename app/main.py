@@ -1,59 +1,101 @@
 from agent import MarketingAnalyticsAgent
 from langchain_openai import ChatOpenAI
-from langchain_community.graphs import Neo4jGraph
 import os
-from dotenv import load_dotenv
 from tools.analyze_campaign_tool import AnalyzeCampaignTool
 from tools.analyze_userBehavior_tool import AnalyzeUserBehaviorTool
 from tools.graph_query_tool import GraphQueryTool
-from langchain.memory import ConversationBufferMemory
+from bounded_memory import BoundedConversationMemory
 from tools.fallback_tool import FallbackTool
 from tools.schema_tool import SchemaTool
-# Load environment variables
+from tools.rank_campaigns_tool import RankCampaignsTool
+from tools.segment_audience_tool import SegmentAudienceTool
+from connections import (
+    get_async_graph, get_graph, get_memory_graph, get_schema_snapshot, query_cache, use_memory_graph,
+)
+from schema_snapshot import schema_prompt
+from answer_cache import AnswerCache
+from intent_router import IntentRouter
+from query_cache import read_data_version
+from instrumentation import AsyncTimedGraph, TimedGraph
 
-load_dotenv("config/.env_loader")
 
-def init_neo4j():
-    """Initialize Neo4j connection"""
-    url = os.getenv("NEO4J_URI")
-    username = os.getenv("NEO4J_USERNAME")
-    password = os.getenv("NEO4J_PASSWORD")
-    
-    if not all([url, username, password]):
-        raise ValueError("Please make sure NEO4J_URI, NEO4J_USERNAME, and NEO4J_PASSWORD are set in loader/.env_loader")
-    
-    return Neo4jGraph(url=url, username=username, password=password)
+def _answer_cache_embeddings():
+    """Embeddings for similarity matches in the answer cache, if ANSWER_CACHE_EMBEDDINGS names a model"""
+    model = os.getenv("ANSWER_CACHE_EMBEDDINGS")
+    if not model:
+        return None
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"), model=model)
+
+# Answers shared by the agents of every session in this process
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    embeddings=_answer_cache_embeddings(),
+    similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+)
 
-neo4j_graph = init_neo4j()
 
 def init_agent():
     """Initialize the marketing analytics agent system"""
-    # Initialize Neo4j connection
-    graph = init_neo4j()
+    # Graph backend shared by every agent in the process: Neo4j (default) or the in-process MemoryGraph
+    memory_backend = use_memory_graph()
+    if memory_backend:
+        graph = get_memory_graph()
+        async_graph = None
+    else:
+        graph = get_graph()
+        async_graph = get_async_graph()
+    # Time every query the tools send into the trace of the analyze call that sent it
+    graph = TimedGraph(graph)
+    async_graph = AsyncTimedGraph(async_graph) if async_graph is not None else None
+
+    # Schema snapshot served to schema_tool and the agent prompt
+    schema_snapshot = get_schema_snapshot()
+    try:
+        schema_summary = schema_prompt(schema_snapshot.get(graph))
+    except Exception as e:
+        print(f"Schema snapshot unavailable: {e}")
+        schema_summary = None
 
     # Initialize language model
     llm = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"),
         model="gpt-3.5-turbo",
-        temperature=0.7
+        temperature=0.7,
+        streaming=True,  # Emit tokens to callbacks for MarketingAnalyticsAgent.astream_analyze
+        stream_usage=True  # Report token usage of streamed responses to the instrumentation
     )
      
-    # Initialize memory
-    memory = ConversationBufferMemory(
+    # Initialize memory: recent turns within a token budget, older turns summarized
+    memory = BoundedConversationMemory(
+        llm=llm,
         memory_key="chat_history",
-        return_messages=True
+        return_messages=True,
+        max_token_limit=int(os.getenv("MEMORY_MAX_TOKENS", "2000")),
+        max_messages=int(os.getenv("MEMORY_MAX_MESSAGES", "20")),
     )
     
     # Initialize tools
     tools = [
-        AnalyzeCampaignTool(neo4j_graph=graph), 
-        AnalyzeUserBehaviorTool(neo4j_graph=graph),
-        GraphQueryTool(neo4j_graph=graph),
+        AnalyzeCampaignTool(neo4j_graph=graph, async_graph=async_graph),
+        RankCampaignsTool(neo4j_graph=graph, async_graph=async_graph),
+        SegmentAudienceTool(neo4j_graph=graph, async_graph=async_graph),
+        AnalyzeUserBehaviorTool(neo4j_graph=graph, async_graph=async_graph),
+        GraphQueryTool(neo4j_graph=graph, async_graph=async_graph),
         FallbackTool(llm=llm, memory=memory),
-        SchemaTool(neo4j_graph=graph)
+        SchemaTool(neo4j_graph=graph, async_graph=async_graph, schema_snapshot=schema_snapshot)
     ]
+    if memory_backend:
+        # Raw Cypher and the segmentation cube need a database
+        tools = [tool for tool in tools if not isinstance(tool, (GraphQueryTool, SegmentAudienceTool))]
 
     # Create agent
-    agent = MarketingAnalyticsAgent(tools=tools, llm=llm, memory=memory)
+    agent = MarketingAnalyticsAgent(
+        tools=tools, llm=llm, memory=memory, schema_summary=schema_summary,
+        answer_cache=answer_cache, data_version=lambda: read_data_version(graph),
+        router=IntentRouter(tools, min_confidence=float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.8"))),
+        parallel_tool_calls=int(os.getenv("PARALLEL_TOOL_CALLS", "4")),
+    )
     
     return agent
 
@@ -0,0 +1,441 @@
+"""
+In-process graph backend over compact NumPy arrays
+
+MemoryGraph loads the nodes/relationships JSON format of data_loader into:
+  - interned node ids (string id -> dense int index) and a label code per node
+  - one CSR adjacency per relationship type, outgoing and incoming, with the
+    relationship properties stored as columns in CSR order
+  - node properties stored as columns per label
+
+It answers the queries issued by AnalyzeCampaignTool, AnalyzeUserBehaviorTool and
+SchemaTool through the same query(query, params) call as Neo4jGraph, computing the
+aggregates with vectorized array operations instead of a database round trip.
+Arbitrary Cypher is not supported.
+"""
+import re
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from campaign_metrics import (
+    ALL_CAMPAIGN_METRICS_QUERY, CAMPAIGN_LEADERBOARD_QUERY, CAMPAIGN_METRICS_QUERY, CAMPAIGN_ROLLUP_QUERY,
+    CAMPAIGN_WINDOW_QUERY,
+)
+from data_loader import iter_graph_file
+from graph_schema import LABELS_QUERY, META_SCHEMA_QUERY, RELATIONSHIP_TYPES_QUERY
+from query_cache import READ_DATA_VERSION, normalize_query
+from user_metrics import USER_BEHAVIOR_QUERY, USER_BEHAVIOR_WINDOW_QUERY
+
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def _python_value(value):
+    """Convert NumPy scalars and missing values back to plain Python values"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _column(values: list):
+    """Pack a property column into the most compact array type that holds it"""
+    present = [v for v in values if v is not None]
+    numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present)
+    if present and numeric:
+        if len(present) == len(values) and all(isinstance(v, int) for v in present):
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _column_type(column) -> str:
+    if column.dtype == np.int64:
+        return "INTEGER"
+    if column.dtype == np.float64:
+        return "FLOAT"
+    return "STRING"
+
+
+def _gather(indptr, nodes):
+    """Positions of the CSR entries of every node in `nodes`, concatenated"""
+    if len(nodes) == 0:
+        return _EMPTY
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return _EMPTY
+    return np.arange(total) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+
+
+class _Adjacency:
+    """CSR adjacency of one relationship type, in both directions"""
+
+    def __init__(self, sources, targets, properties: Dict[str, list], node_count: int) -> None:
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        order = np.lexsort((targets, sources))
+        self.out_indptr = np.searchsorted(sources[order], np.arange(node_count + 1)).astype(np.int64)
+        self.out_targets = targets[order]
+        self.sources = sources[order]
+        self.properties = {k: _column(v)[order] for k, v in properties.items()}
+
+        # Incoming CSR, pointing back into the outgoing (edge) order
+        in_order = np.argsort(self.out_targets, kind="stable")
+        self.in_indptr = np.searchsorted(self.out_targets[in_order], np.arange(node_count + 1)).astype(np.int64)
+        self.in_edges = in_order
+
+        # Sorted (source, target) keys for vectorized edge-existence checks
+        self.node_count = node_count
+        self.pair_keys = self.sources * node_count + self.out_targets
+
+    def out_edges(self, nodes):
+        return _gather(self.out_indptr, nodes)
+
+    def in_edges_of(self, nodes):
+        return self.in_edges[_gather(self.in_indptr, nodes)]
+
+    def has_edges(self, sources, targets):
+        """Whether an edge of this type exists for each (source, target) pair"""
+        keys = sources * self.node_count + targets
+        if len(self.pair_keys) == 0:
+            return np.zeros(len(keys), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.pair_keys, keys), len(self.pair_keys) - 1)
+        return self.pair_keys[pos] == keys
+
+    def numeric(self, name: str, edges):
+        column = self.properties.get(name)
+        if column is None or column.dtype == object:
+            return np.zeros(len(edges))
+        return np.nan_to_num(column[edges].astype(np.float64))
+
+
+class MemoryGraph:
+    """Read-only graph held in NumPy arrays, queried like a Neo4jGraph"""
+
+    def __init__(self, nodes, relationships) -> None:
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.labels: List[str] = []
+        label_codes = []
+        columns: Dict[str, Dict[str, list]] = {}
+        members: Dict[str, List[int]] = {}
+
+        for node in nodes:
+            if node['id'] in self.index:
+                continue
+            idx = len(self.ids)
+            self.index[node['id']] = idx
+            self.ids.append(node['id'])
+            label = node['label']
+            if label not in self.labels:
+                self.labels.append(label)
+                columns[label] = {}
+                members[label] = []
+            label_codes.append(self.labels.index(label))
+
+            position = len(members[label])
+            members[label].append(idx)
+            label_columns = columns[label]
+            for k in node.get('properties', {}):
+                # Pad a property first seen on this node (setdefault would build the list every time)
+                if k not in label_columns:
+                    label_columns[k] = [None] * position
+            for k, values in label_columns.items():
+                values.append(node.get('properties', {}).get(k))
+
+        self.node_count = len(self.ids)
+        self.label_codes = np.array(label_codes, dtype=np.int8)
+        self.members = {label: np.array(idx, dtype=np.int64) for label, idx in members.items()}
+        self.columns = {label: {k: _column(v) for k, v in cols.items()} for label, cols in columns.items()}
+
+        # Position of every node inside its label's property columns
+        self.label_position = np.zeros(self.node_count, dtype=np.int64)
+        for idx in self.members.values():
+            self.label_position[idx] = np.arange(len(idx))
+
+        # Group relationships by type, keeping the first of duplicate (from, to) pairs
+        # like MERGE ... ON CREATE SET does
+        edges: Dict[str, Dict[str, Any]] = {}
+        for relationship in relationships:
+            source = self.index.get(relationship['from'])
+            target = self.index.get(relationship['to'])
+            if source is None or target is None:
+                continue
+            group = edges.setdefault(relationship['label'], {'pairs': set(), 'sources': [], 'targets': [], 'properties': {}})
+            if (source, target) in group['pairs']:
+                continue
+            group['pairs'].add((source, target))
+            count = len(group['sources'])
+            group['sources'].append(source)
+            group['targets'].append(target)
+            props = relationship.get('properties') or {}
+            for k in props:
+                if k not in group['properties']:
+                    group['properties'][k] = [None] * count
+            for k, values in group['properties'].items():
+                values.append(props.get(k))
+
+        self.adjacency = {
+            rel_type: _Adjacency(g['sources'], g['targets'], g['properties'], self.node_count)
+            for rel_type, g in edges.items()
+        }
+
+        self._name_tokens = {}
+        self._handlers: Dict[str, Callable] = {
+            normalize_query(CAMPAIGN_METRICS_QUERY): self._campaign_metrics,
+            normalize_query(CAMPAIGN_ROLLUP_QUERY): self._campaign_metrics,
+            normalize_query(CAMPAIGN_WINDOW_QUERY): self._campaign_metrics,
+            normalize_query(ALL_CAMPAIGN_METRICS_QUERY): self._all_campaign_metrics,
+            normalize_query(CAMPAIGN_LEADERBOARD_QUERY): self._all_campaign_metrics,
+            normalize_query(USER_BEHAVIOR_QUERY): self._user_behavior,
+            normalize_query(USER_BEHAVIOR_WINDOW_QUERY): self._user_behavior,
+            normalize_query(LABELS_QUERY): lambda params: [{"labels": list(self.labels)}],
+            normalize_query(RELATIONSHIP_TYPES_QUERY): lambda params: [{"types": list(self.adjacency)}],
+            normalize_query(META_SCHEMA_QUERY): self._meta_schema,
+            normalize_query(READ_DATA_VERSION): lambda params: [{"version": 0}],
+        }
+
+    @classmethod
+    def from_data(cls, data: dict) -> "MemoryGraph":
+        return cls(data['nodes'], data['relationships'])
+
+    @classmethod
+    def from_file(cls, file_path) -> "MemoryGraph":
+        """Load a graph JSON file, parsing it incrementally with iter_graph_file"""
+        nodes, relationships = [], []
+        for section, item in iter_graph_file(file_path):
+            (nodes if section == 'nodes' else relationships).append(item)
+        return cls(nodes, relationships)
+
+    def query(self, query: str, params: dict = {}) -> List[Dict[str, Any]]:
+        normalized = normalize_query(query)
+        handler = self._handlers.get(normalized)
+        if handler is None:
+            raise ValueError(f"MemoryGraph only answers the analysis tools' queries, not arbitrary Cypher: {normalized}")
+        return handler(params)
+
+    # Node helpers
+
+    def _prop(self, idx: int, name: str):
+        label = self.labels[self.label_codes[idx]]
+        column = self.columns[label].get(name)
+        if column is None:
+            return None
+        return _python_value(column[self.label_position[idx]])
+
+    def _find(self, label: str, text: str) -> List[int]:
+        """
+        Resolve free input to nodes of a label: exact id, then exact name, then nodes
+        whose name words start with every input word (exact phrase matches first)
+        """
+        idx = self.index.get(text)
+        if idx is not None and self.labels[self.label_codes[idx]] == label:
+            return [idx]
+
+        names = self.columns.get(label, {}).get("name")
+        if names is None:
+            return []
+        candidates = self.members[label]
+        exact = candidates[names == text]
+        if len(exact):
+            return exact.tolist()
+
+        words = re.findall(r"\w+", text.lower())
+        if not words:
+            return []
+        if label not in self._name_tokens:
+            self._name_tokens[label] = [re.findall(r"\w+", str(n).lower()) for n in names]
+        phrase = " ".join(words)
+        matches = []
+        for position, tokens in enumerate(self._name_tokens[label]):
+            if all(any(t.startswith(w) for t in tokens) for w in words):
+                rank = 0 if " ".join(tokens) == phrase else 1 if phrase in " ".join(tokens) else 2
+                matches.append((rank, len(tokens), int(candidates[position])))
+        return [idx for _, _, idx in sorted(matches)]
+
+    @staticmethod
+    def _dated(adjacency: _Adjacency, name: str, edges, params: dict):
+        """The edges whose date property lies in [$since, $until]; all edges without a window"""
+        if "since" not in params:
+            return edges
+        column = adjacency.properties.get(name)
+        if column is None or len(edges) == 0:
+            return _EMPTY
+        since, until = params["since"].isoformat(), params["until"].isoformat()
+        keep = np.array([v is not None and since <= str(v)[:10] <= until for v in column[edges]], dtype=bool)
+        return edges[keep]
+
+    # Query handlers
+
+    def _campaign_metrics(self, params: dict) -> List[Dict[str, Any]]:
+        found = self._find("Campaign", params["campaign_name"])
+        if not found:
+            return []
+        c = found[0]
+        part_of = self.adjacency.get("PART_OF")
+        viewed = self.adjacency.get("VIEWED")
+        clicked = self.adjacency.get("CLICKED")
+        converted = self.adjacency.get("CONVERTED")
+        targets = self.adjacency.get("TARGETS")
+
+        target_names = []
+        if targets is not None:
+            for d in targets.out_targets[targets.out_edges(np.array([c]))]:
+                age_group, gender = self._prop(d, "age_group"), self._prop(d, "gender")
+                if age_group is not None and gender is not None:
+                    target_names.append(f"{age_group}-{gender}")
+
+        ads = part_of.sources[part_of.in_edges_of(np.array([c]))] if part_of else _EMPTY
+        view_edges = viewed.in_edges_of(ads) if viewed else _EMPTY
+        viewers = np.unique(viewed.sources[view_edges]) if viewed else _EMPTY
+        if viewed is not None:
+            view_edges = self._dated(viewed, "date_first_viewed", view_edges, params)
+
+        clicks, total_clicks = 0, 0
+        if clicked is not None and len(ads):
+            click_edges = clicked.in_edges_of(ads)
+            if viewed is not None:
+                click_edges = click_edges[viewed.has_edges(clicked.sources[click_edges],
+                                                           clicked.out_targets[click_edges])]
+            else:
+                click_edges = _EMPTY
+            click_edges = self._dated(clicked, "date_last_clicked", click_edges, params)
+            clicks = len(click_edges)
+            total_clicks = int(clicked.numeric("click_count", click_edges).sum())
+
+        conversions, value = 0, 0.0
+        if converted is not None and len(viewers):
+            conversion_edges = self._dated(converted, "conversion_date", converted.out_edges(viewers), params)
+            conversions = len(np.unique(converted.out_targets[conversion_edges]))
+            value = float(converted.numeric("conversion_value", conversion_edges).sum())
+
+        return [dict(
+            has_rollup=True,
+            campaign_id=self.ids[c],
+            campaign_name=self._prop(c, "name"),
+            start=self._prop(c, "start_date"),
+            end=self._prop(c, "end_date"),
+            budget=self._prop(c, "campaign_budget"),
+            targets=list(dict.fromkeys(target_names)),
+            ad_count=len(ads),
+            views=len(view_edges),
+            clicks=clicks,
+            total_clicks=total_clicks,
+            conversions=conversions,
+            total_conversion_value=value,
+        )]
+
+    def _all_campaign_metrics(self, params: dict) -> List[Dict[str, Any]]:
+        """Counters of every campaign in one vectorized pass over the edge arrays"""
+        campaigns = self.members.get("Campaign", _EMPTY)
+        n = self.node_count
+        totals = {k: np.zeros(n) for k in ("ad_count", "views", "clicks", "total_clicks",
+                                             "conversions", "total_conversion_value")}
+        part_of = self.adjacency.get("PART_OF")
+        viewed = self.adjacency.get("VIEWED")
+        clicked = self.adjacency.get("CLICKED")
+        converted = self.adjacency.get("CONVERTED")
+
+        if part_of is not None:
+            ads, ad_campaigns = part_of.sources, part_of.out_targets
+            totals["ad_count"] = np.bincount(ad_campaigns, minlength=n).astype(float)
+
+            if viewed is not None:
+                view_degree = np.diff(viewed.in_indptr)
+                totals["views"] = np.bincount(ad_campaigns, weights=view_degree[ads], minlength=n)
+
+            if clicked is not None and viewed is not None:
+                valid = viewed.has_edges(clicked.sources, clicked.out_targets)
+                click_ads = clicked.out_targets[valid]
+                ad_clicks = np.bincount(click_ads, minlength=n)
+                ad_total_clicks = np.bincount(click_ads, weights=clicked.numeric("click_count", np.flatnonzero(valid)),
+                                              minlength=n)
+                totals["clicks"] = np.bincount(ad_campaigns, weights=ad_clicks[ads], minlength=n)
+                totals["total_clicks"] = np.bincount(ad_campaigns, weights=ad_total_clicks[ads], minlength=n)
+
+            if viewed is not None and converted is not None:
+                # Distinct (campaign, viewer) pairs, then the viewers' conversion edges
+                view_edges = viewed.in_edges[_gather(viewed.in_indptr, ads)]
+                pair_campaigns = np.repeat(ad_campaigns, np.diff(viewed.in_indptr)[ads])
+                pairs = np.unique(pair_campaigns * n + viewed.sources[view_edges])
+                pair_campaigns, viewers = pairs // n, pairs % n
+                conversion_edges = converted.out_edges(viewers)
+                edge_campaigns = np.repeat(pair_campaigns, np.diff(converted.out_indptr)[viewers])
+                totals["total_conversion_value"] = np.bincount(
+                    edge_campaigns, weights=converted.numeric("conversion_value", conversion_edges), minlength=n)
+                products = np.unique(edge_campaigns * n + converted.out_targets[conversion_edges])
+                totals["conversions"] = np.bincount(products // n, minlength=n).astype(float)
+
+        rows = []
+        for c in campaigns:
+            rows.append({
+                "has_rollup": True,
+                "campaign_id": self.ids[c],
+                "campaign_name": self._prop(c, "name"),
+                "start": self._prop(c, "start_date"),
+                "end": self._prop(c, "end_date"),
+                "budget": self._prop(c, "campaign_budget"),
+                "targets": [],
+                **{k: int(v[c]) for k, v in totals.items() if k != "total_conversion_value"},
+                "total_conversion_value": float(totals["total_conversion_value"][c]),
+            })
+        return rows
+
+    def _user_behavior(self, params: dict) -> List[Dict[str, Any]]:
+        rows = []
+        for user_input in params["inputs"]:
+            found = self._find("User", user_input["text"])
+            for u in found[:params["max_candidates"]]:
+                rows.append(dict(self._user_row(u, params), input=user_input["text"], match_count=len(found)))
+        return rows
+
+    def _user_row(self, u: int, params: dict = {}) -> Dict[str, Any]:
+        nodes = np.array([u])
+        row = {
+            "user_id": self.ids[u],
+            "name": self._prop(u, "name"),
+            "age": self._prop(u, "age"),
+            "location": self._prop(u, "location"),
+            "views": 0, "clicks": 0, "total_clicks": 0,
+            "conversions": 0, "total_conversion_value": 0.0,
+        }
+        if "VIEWED" in self.adjacency:
+            viewed = self.adjacency["VIEWED"]
+            row["views"] = len(self._dated(viewed, "date_first_viewed", viewed.out_edges(nodes), params))
+        if "CLICKED" in self.adjacency:
+            clicked = self.adjacency["CLICKED"]
+            edges = self._dated(clicked, "date_last_clicked", clicked.out_edges(nodes), params)
+            row["clicks"] = len(edges)
+            row["total_clicks"] = int(clicked.numeric("click_count", edges).sum())
+        if "CONVERTED" in self.adjacency:
+            converted = self.adjacency["CONVERTED"]
+            edges = self._dated(converted, "conversion_date", converted.out_edges(nodes), params)
+            row["conversions"] = len(np.unique(converted.out_targets[edges]))
+            row["total_conversion_value"] = float(converted.numeric("conversion_value", edges).sum())
+        return row
+
+    def _meta_schema(self, params: dict) -> List[Dict[str, Any]]:
+        value = {
+            label: {
+                "type": "node",
+                "count": len(self.members[label]),
+                "properties": {
+                    "id": {"type": "STRING"},
+                    **{k: {"type": _column_type(col)} for k, col in self.columns[label].items()},
+                },
+            }
+            for label in self.labels
+        }
+        for rel_type, adjacency in self.adjacency.items():
+            value[rel_type] = {
+                "type": "relationship",
+                "count": len(adjacency.sources),
+                "properties": {k: {"type": _column_type(col)} for k, col in adjacency.properties.items()},
+            }
+        return [{"value": value}]
@@ -0,0 +1,180 @@
+"""
+Shared result cache for read queries sent to Neo4j by the analysis tools
+
+Results are keyed by the normalized query text and parameters. The graph carries a
+data-version counter (a single (:GraphMeta {id: 'data_version'}) node) that every
+import bumps; when the cache sees a new version it drops all cached results.
+"""
+import copy
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from instrumentation import mark_query_cache_hit
+
+DATA_VERSION_ID = "data_version"
+
+READ_DATA_VERSION = """
+OPTIONAL MATCH (m:GraphMeta {id: $id})
+RETURN coalesce(m.version, 0) AS version
+"""
+
+BUMP_DATA_VERSION = """
+MERGE (m:GraphMeta {id: $id})
+SET m.version = coalesce(m.version, 0) + 1
+RETURN m.version AS version
+"""
+
+_WRITE_CLAUSES = re.compile(
+    r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b"
+    r"|\bapoc\.(create|merge|refactor|periodic|nodes\.delete)",
+    re.IGNORECASE,
+)
+
+
+def read_data_version(neo4j_graph) -> int:
+    """Return the graph's current data version (0 if it was never bumped)"""
+    return neo4j_graph.query(READ_DATA_VERSION, params={"id": DATA_VERSION_ID})[0]["version"]
+
+
+def bump_data_version(neo4j_graph) -> int:
+    """Increment the graph's data version so cached results are invalidated"""
+    return neo4j_graph.query(BUMP_DATA_VERSION, params={"id": DATA_VERSION_ID})[0]["version"]
+
+
+def is_write_query(query: str) -> bool:
+    """Whether a Cypher statement may modify the graph"""
+    return bool(_WRITE_CLAUSES.search(query))
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace so formatting differences map to the same cache key"""
+    return " ".join(query.split())
+
+
+class QueryCache:
+    """Thread-safe bounded LRU cache with a per-entry time-to-live"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return (hit, value) for a key, counting the lookup as a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def cache_key(query: str, params: dict) -> tuple:
+    """Key of a read query's result: normalized text plus the serialized parameters"""
+    return normalize_query(query), json.dumps(params, sort_keys=True, default=str)
+
+
+class CachedGraph:
+    """
+    Wrapper around a Neo4j graph client that serves repeated read queries from a QueryCache
+
+    Write statements bypass the cache and invalidate it. The graph's data version is
+    re-read at most every version_check_interval seconds, so imports run by another
+    process invalidate the cache shortly after they finish. Every other attribute is
+    delegated to the wrapped graph.
+    """
+
+    def __init__(self, graph, cache: QueryCache = None, version_check_interval: float = 5.0) -> None:
+        self.graph = graph
+        self.cache = cache if cache is not None else QueryCache()
+        self.version_check_interval = version_check_interval
+        self._data_version = None
+        self._version_checked_at = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+    def _version_check_due(self) -> bool:
+        return time.monotonic() - self._version_checked_at >= self.version_check_interval
+
+    def _set_data_version(self, version: int) -> None:
+        """Record the version just read, dropping the cached results if it moved"""
+        self._version_checked_at = time.monotonic()
+        if version != self._data_version:
+            if self._data_version is not None:
+                self.cache.clear()
+            self._data_version = version
+
+    def _sync_data_version(self) -> None:
+        if self._version_check_due():
+            self._set_data_version(read_data_version(self.graph))
+
+    # Rows are copied into and out of the cache (nested lists and maps included), so a
+    # caller editing its result cannot change what later hits return
+    def _cached(self, key) -> tuple:
+        hit, result = self.cache.get(key)
+        if hit:
+            mark_query_cache_hit()
+            result = copy.deepcopy(result)
+        return hit, result
+
+    def _store(self, key, result: List[Dict[str, Any]]) -> None:
+        self.cache.put(key, copy.deepcopy(result))
+
+    def invalidate(self) -> None:
+        """Drop all cached results and re-read the data version on the next query"""
+        self.cache.clear()
+        self._version_checked_at = 0.0
+
+    def query(self, query: str, params: dict = {}) -> List[Dict[str, Any]]:
+        if is_write_query(query):
+            result = self.graph.query(query, params=params)
+            self.invalidate()
+            return result
+
+        self._sync_data_version()
+        key = cache_key(query, params)
+        hit, result = self._cached(key)
+        if not hit:
+            result = self.graph.query(query, params=params)
+            self._store(key, result)
+        return result
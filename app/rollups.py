@@ -0,0 +1,216 @@
+"""
+Materialized per-campaign and per-user rollups
+
+Each campaign and user gets a (:CampaignStats {id}) / (:UserStats {id}) node holding
+the counters of campaign_metrics / user_metrics, so the analysis tools answer with a
+single indexed lookup. Refreshing a campaign's rollup also rebuilds its cells of the
+segmentation cube (segments.py). The loaders refresh the rollups of the entities
+touched by the relationships they write; recompute_rollups rebuilds (and verifies)
+all of them.
+"""
+import argparse
+
+from campaign_metrics import CAMPAIGN_COUNTERS, CAMPAIGN_COUNTER_FIELDS
+from user_metrics import USER_COUNTERS, USER_COUNTER_FIELDS
+from query_cache import bump_data_version
+from segments import refresh_segments
+
+
+ROLLUP_BATCH_SIZE = 500
+
+REFRESH_CAMPAIGN_ROLLUPS = """
+UNWIND $ids AS campaign_id
+MATCH (c:Campaign {id: campaign_id})
+""" + CAMPAIGN_COUNTERS + """
+MERGE (s:CampaignStats {id: c.id})
+SET s.ad_count = ad_count,
+    s.views = views,
+    s.clicks = clicks,
+    s.total_clicks = total_clicks,
+    s.conversions = conversions,
+    s.total_conversion_value = total_conversion_value,
+    s.updated_at = datetime()
+"""
+
+REFRESH_USER_ROLLUPS = """
+UNWIND $ids AS user_id
+MATCH (u:User {id: user_id})
+WITH u, """ + USER_COUNTERS + """ AS counters
+MERGE (s:UserStats {id: u.id})
+SET s += counters,
+    s.updated_at = datetime()
+"""
+
+# Campaigns whose counters or segment cells depend on the given ads, converting (or
+# re-segmented) users, demographics or campaigns
+AFFECTED_CAMPAIGNS = """
+CALL {
+    UNWIND $ad_ids AS ad_id
+    MATCH (:Ad {id: ad_id})-[:PART_OF]->(c:Campaign)
+    RETURN c.id AS id
+    UNION
+    UNWIND $converter_ids AS user_id
+    MATCH (:User {id: user_id})-[:VIEWED]->(:Ad)-[:PART_OF]->(c:Campaign)
+    RETURN c.id AS id
+    UNION
+    UNWIND $demographic_ids AS demographic_id
+    MATCH (:Demographic {id: demographic_id})<-[:BELONGS_TO]-(:User)-[:VIEWED]->(:Ad)-[:PART_OF]->(c:Campaign)
+    RETURN c.id AS id
+    UNION
+    UNWIND $campaign_ids AS id
+    RETURN id
+}
+RETURN collect(id) AS ids
+"""
+
+
+# Rollups and segment cells whose campaign or user was deleted
+ORPHAN_ROLLUPS = """
+CALL {
+    MATCH (s:CampaignStats) WHERE NOT EXISTS { MATCH (:Campaign {id: s.id}) }
+    DETACH DELETE s
+    RETURN count(*) AS campaigns
+}
+CALL {
+    MATCH (s:UserStats) WHERE NOT EXISTS { MATCH (:User {id: s.id}) }
+    DETACH DELETE s
+    RETURN count(*) AS users
+}
+CALL {
+    MATCH (s:SegmentStats) WHERE NOT EXISTS { MATCH (:Campaign {id: s.campaign_id}) }
+    DETACH DELETE s
+    RETURN count(*) AS segments
+}
+RETURN campaigns, users, segments
+"""
+
+
+class RollupTracker:
+    """Collects the ids touched by written relationships so their rollups can be refreshed"""
+
+    def __init__(self) -> None:
+        self.user_ids = set()
+        self.ad_ids = set()
+        self.converter_ids = set()
+        self.campaign_ids = set()
+        # Users whose demographic or location changed: their campaigns' segment cells move
+        self.segmented_user_ids = set()
+        # Demographics whose age group or gender changed: the cells of their members' campaigns
+        self.demographic_ids = set()
+
+    def track(self, relationships) -> None:
+        for relationship in relationships:
+            rel_type = relationship['label']
+            if rel_type in ('VIEWED', 'CLICKED'):
+                self.user_ids.add(relationship['from'])
+                self.ad_ids.add(relationship['to'])
+            elif rel_type == 'CONVERTED':
+                self.user_ids.add(relationship['from'])
+                self.converter_ids.add(relationship['from'])
+            elif rel_type == 'PART_OF':
+                self.ad_ids.add(relationship['from'])
+                self.campaign_ids.add(relationship['to'])
+            elif rel_type == 'BELONGS_TO':
+                self.segmented_user_ids.add(relationship['from'])
+
+    def track_nodes(self, nodes) -> None:
+        """
+        Track written nodes whose properties are copied into segment cells: users (location),
+        demographics (age group, gender) and campaigns (name)
+        """
+        for node in nodes:
+            if node['label'] == 'User':
+                self.segmented_user_ids.add(node['id'])
+            elif node['label'] == 'Demographic':
+                self.demographic_ids.add(node['id'])
+            elif node['label'] == 'Campaign':
+                self.campaign_ids.add(node['id'])
+
+    def flush(self, neo4j_graph) -> dict:
+        """Refresh the rollups of everything tracked so far and reset the tracker"""
+        campaign_ids = neo4j_graph.query(AFFECTED_CAMPAIGNS, params={
+            'ad_ids': list(self.ad_ids),
+            'converter_ids': list(self.converter_ids | self.segmented_user_ids),
+            'demographic_ids': list(self.demographic_ids),
+            'campaign_ids': list(self.campaign_ids),
+        })[0]['ids']
+        counts = refresh_rollups(neo4j_graph, campaign_ids=campaign_ids, user_ids=list(self.user_ids))
+        self.__init__()
+        return counts
+
+
+def _refresh(neo4j_graph, query: str, ids: list) -> None:
+    for start in range(0, len(ids), ROLLUP_BATCH_SIZE):
+        neo4j_graph.query(query, params={'ids': ids[start:start + ROLLUP_BATCH_SIZE]})
+
+
+def refresh_rollups(neo4j_graph, campaign_ids=None, user_ids=None) -> dict:
+    """
+    Recompute the rollups of the given campaigns and users, and the campaigns' segment cells
+
+    Args:
+        neo4j_graph: Graph client exposing query()
+        campaign_ids: Campaign ids to refresh, all campaigns when None
+        user_ids: User ids to refresh, all users when None
+
+    Returns:
+        Number of campaign and user rollups refreshed (campaign segment cells are
+        rebuilt with their campaign)
+    """
+    if campaign_ids is None:
+        campaign_ids = [r['id'] for r in neo4j_graph.query("MATCH (c:Campaign) RETURN c.id AS id")]
+    if user_ids is None:
+        user_ids = [r['id'] for r in neo4j_graph.query("MATCH (u:User) RETURN u.id AS id")]
+
+    _refresh(neo4j_graph, REFRESH_CAMPAIGN_ROLLUPS, list(campaign_ids))
+    _refresh(neo4j_graph, REFRESH_USER_ROLLUPS, list(user_ids))
+    refresh_segments(neo4j_graph, campaign_ids)
+    return {'campaigns': len(campaign_ids), 'users': len(user_ids)}
+
+
+def drop_orphan_rollups(neo4j_graph) -> dict:
+    """Delete the rollups and segment cells of campaigns and users that no longer exist"""
+    rows = neo4j_graph.query(ORPHAN_ROLLUPS)
+    return rows[0] if rows else {'campaigns': 0, 'users': 0, 'segments': 0}
+
+
+def _read_rollups(neo4j_graph, label: str, fields: list) -> dict:
+    rows = neo4j_graph.query(f"MATCH (s:{label}) RETURN s.id AS id, s AS stats")
+    return {row['id']: {field: row['stats'].get(field) for field in fields} for row in rows}
+
+
+def recompute_rollups(neo4j_graph, verify: bool = True) -> dict:
+    """
+    Maintenance command: rebuild every rollup from the raw edges
+
+    With verify=True the stored rollups are compared with the recomputed ones, and
+    the ids whose counters were missing or stale are reported.
+    """
+    if verify:
+        campaigns_before = _read_rollups(neo4j_graph, "CampaignStats", CAMPAIGN_COUNTER_FIELDS)
+        users_before = _read_rollups(neo4j_graph, "UserStats", USER_COUNTER_FIELDS)
+
+    counts = refresh_rollups(neo4j_graph)
+    bump_data_version(neo4j_graph)
+    print(f"Recomputed {counts['campaigns']} campaign and {counts['users']} user rollups")
+    if not verify:
+        return counts
+
+    campaigns_after = _read_rollups(neo4j_graph, "CampaignStats", CAMPAIGN_COUNTER_FIELDS)
+    users_after = _read_rollups(neo4j_graph, "UserStats", USER_COUNTER_FIELDS)
+    counts['stale_campaigns'] = sorted(k for k, v in campaigns_after.items() if campaigns_before.get(k) != v)
+    counts['stale_users'] = sorted(k for k, v in users_after.items() if users_before.get(k) != v)
+    print(f"Stale campaign rollups: {counts['stale_campaigns'] or 'none'}")
+    print(f"Stale user rollups: {counts['stale_users'] or 'none'}")
+    return counts
+
+
+if __name__ == "__main__":
+    from data_loader import load_graph
+
+    parser = argparse.ArgumentParser(description="Recompute the campaign and user rollups")
+    parser.add_argument("--no-verify", action="store_true",
+                        help="skip comparing the stored rollups with the recomputed ones")
+    args = parser.parse_args()
+
+    recompute_rollups(load_graph(), verify=not args.no_verify)
@@ -0,0 +1,177 @@
+"""
+Persisted snapshot of the graph schema for schema_tool and the agent prompt
+
+apoc.meta.schema() samples the whole store, so the labels, relationship types and
+property types are computed once and saved to data/.schema_snapshot.json together
+with the graph's data version. The loaders report the labels, types and properties
+they wrote (SchemaChanges), which are merged into the snapshot without re-sampling;
+the snapshot is only recomputed from the database when its data version no longer
+matches the graph's, e.g. after an import by a process that did not report it.
+"""
+import datetime
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+from graph_schema import LABELS_QUERY, META_SCHEMA_QUERY, RELATIONSHIP_TYPES_QUERY, ROLLUP_LABELS
+from query_cache import read_data_version
+
+
+SCHEMA_SNAPSHOT_PATH = Path(__file__).parent.parent / "data" / ".schema_snapshot.json"
+
+# Bookkeeping labels that are not part of the marketing data model
+INTERNAL_LABELS = set(ROLLUP_LABELS) | {"GraphMeta"}
+
+
+def property_type(value) -> str:
+    """Cypher type name of a property value, as reported by apoc.meta.schema()"""
+    if isinstance(value, bool):
+        return "BOOLEAN"
+    if isinstance(value, int):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "FLOAT"
+    if isinstance(value, datetime.datetime):
+        return "DATE_TIME"
+    if isinstance(value, datetime.date):
+        return "DATE"
+    if isinstance(value, (list, tuple)):
+        return "LIST"
+    if isinstance(value, dict):
+        return "MAP"
+    return "STRING"
+
+
+class SchemaChanges:
+    """Collects the labels, relationship types and property types written by a loader"""
+
+    def __init__(self) -> None:
+        self.entries = {}
+
+    def _track(self, name: str, kind: str, properties: dict) -> None:
+        entry = self.entries.setdefault(name, {"type": kind, "properties": {}})
+        for key, value in (properties or {}).items():
+            entry["properties"].setdefault(key, {"type": property_type(value)})
+
+    def track_nodes(self, nodes) -> None:
+        for node in nodes:
+            self._track(node['label'], "node", dict(node.get('properties') or {}, id=node['id']))
+
+    def track_relationships(self, relationships) -> None:
+        for relationship in relationships:
+            self._track(relationship['label'], "relationship", relationship.get('properties'))
+
+
+class SchemaSnapshot:
+    """
+    Thread-safe schema snapshot, persisted to path (kept in memory only when path is None)
+
+    A snapshot is a dict with the node labels, the relationship types, the properties
+    of every label and type (in the apoc.meta.schema() format) and the data version it
+    describes.
+    """
+
+    def __init__(self, path=SCHEMA_SNAPSHOT_PATH) -> None:
+        self.path = path
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        if self._snapshot is None and self.path is not None:
+            try:
+                with open(self.path) as f:
+                    self._snapshot = json.load(f)
+            except (OSError, ValueError):
+                pass
+        return self._snapshot
+
+    def _save(self, snapshot: Dict[str, Any]) -> None:
+        self._snapshot = snapshot
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _compute(self, neo4j_graph) -> Dict[str, Any]:
+        labels = neo4j_graph.query(LABELS_QUERY)[0]["labels"]
+        rel_types = neo4j_graph.query(RELATIONSHIP_TYPES_QUERY)[0]["types"]
+        meta = neo4j_graph.query(META_SCHEMA_QUERY)[0]["value"]
+        return {
+            "labels": [label for label in labels if label not in INTERNAL_LABELS],
+            "relationship_types": list(rel_types),
+            "properties": {
+                name: {
+                    "type": entry.get("type", "node"),
+                    "properties": {
+                        prop: {"type": info.get("type", "unknown")}
+                        for prop, info in entry.get("properties", {}).items()
+                    },
+                }
+                for name, entry in meta.items() if name not in INTERNAL_LABELS
+            },
+        }
+
+    def refresh(self, neo4j_graph) -> Dict[str, Any]:
+        """Recompute the snapshot from the database and persist it"""
+        with self._lock:
+            snapshot = self._compute(neo4j_graph)
+            snapshot["data_version"] = read_data_version(neo4j_graph)
+            self._save(snapshot)
+            print(f"Schema snapshot refreshed (data version {snapshot['data_version']})")
+            return snapshot
+
+    def get(self, neo4j_graph) -> Dict[str, Any]:
+        """Return the snapshot, recomputing it only if the graph changed since it was taken"""
+        with self._lock:
+            snapshot = self._load()
+            if snapshot is not None and snapshot.get("data_version") == read_data_version(neo4j_graph):
+                return snapshot
+        return self.refresh(neo4j_graph)
+
+    def apply(self, changes: SchemaChanges, data_version: int) -> bool:
+        """
+        Merge the changes a loader reported for the import that produced data_version
+
+        The changes are only applied on top of the snapshot of the preceding version;
+        otherwise the snapshot is left as is and recomputed on the next get().
+        Returns whether the snapshot was updated.
+        """
+        with self._lock:
+            snapshot = self._load()
+            if snapshot is None or snapshot.get("data_version") != data_version - 1:
+                return False
+
+            for name, entry in changes.entries.items():
+                names = snapshot["labels"] if entry["type"] == "node" else snapshot["relationship_types"]
+                if name not in names:
+                    names.append(name)
+                known = snapshot["properties"].setdefault(name, {"type": entry["type"], "properties": {}})
+                for prop, info in entry["properties"].items():
+                    known["properties"].setdefault(prop, info)
+            snapshot["data_version"] = data_version
+            self._save(snapshot)
+            return True
+
+    def invalidate(self) -> None:
+        """Forget the snapshot so the next get() recomputes it"""
+        with self._lock:
+            self._snapshot = None
+            if self.path is not None and os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def schema_prompt(snapshot: Dict[str, Any]) -> str:
+    """Compact plain-text description of a schema snapshot for the agent prompt"""
+    lines = [
+        "Graph schema:",
+        f"Node labels: {', '.join(snapshot['labels'])}",
+        f"Relationship types: {', '.join(snapshot['relationship_types'])}",
+    ]
+    for name, entry in snapshot["properties"].items():
+        props = ", ".join(f"{prop} ({info['type']})" for prop, info in entry["properties"].items())
+        lines.append(f"{name} properties: {props or 'none'}")
+    return "\n".join(lines)
@@ -0,0 +1,130 @@
+"""
+Precomputed audience segmentation cube
+
+Every campaign's viewers are aggregated by age group and gender (from the
+Demographic they belong to) and location into (:SegmentStats) cells keyed by
+campaign|age_group|gender|location, holding additive measures: viewers (users),
+views, clicks, total_clicks, conversions and total_conversion_value. Slices, dices
+and roll-ups to any subset of the dimensions are sums over cells, so segmentation
+questions never touch the raw edges. The cells of a campaign are rebuilt whenever
+its rollup is refreshed (see rollups.refresh_rollups).
+
+Counting follows campaign_metrics: clicks are those of viewers on ads they viewed,
+and conversions are the products each viewer converted on. Conversions are counted
+per viewer so that they add up across segments; a campaign's cube total can
+therefore exceed its distinct-product conversion count.
+"""
+from typing import Dict, List
+
+
+SEGMENT_BATCH_SIZE = 100
+
+# Cube dimension -> cell properties returned for it
+SEGMENT_DIMENSIONS = {
+    "campaign": ["campaign_id", "campaign_name"],
+    "age_group": ["age_group"],
+    "gender": ["gender"],
+    "location": ["location"],
+}
+
+SEGMENT_MEASURES = ["users", "views", "clicks", "total_clicks", "conversions", "total_conversion_value"]
+
+DELETE_SEGMENTS = """
+UNWIND $ids AS campaign_id
+MATCH (s:SegmentStats {campaign_id: campaign_id})
+DETACH DELETE s
+"""
+
+REFRESH_SEGMENTS = """
+UNWIND $ids AS campaign_id
+MATCH (c:Campaign {id: campaign_id})
+CALL {
+    WITH c
+    MATCH (u:User)-[:VIEWED]->(a:Ad)-[:PART_OF]->(c)
+    WITH u, count(a) AS views, collect(a) AS ads
+    CALL {
+        WITH u, ads
+        OPTIONAL MATCH (u)-[cl:CLICKED]->(a:Ad)
+        WHERE a IN ads
+        RETURN count(cl) AS clicks, sum(coalesce(toInteger(cl.click_count), 0)) AS total_clicks
+    }
+    CALL {
+        WITH u
+        OPTIONAL MATCH (u)-[conv:CONVERTED]->(p:Product)
+        RETURN count(DISTINCT p) AS conversions,
+               sum(coalesce(toFloat(conv.conversion_value), 0.0)) AS total_conversion_value
+    }
+    OPTIONAL MATCH (u)-[:BELONGS_TO]->(d:Demographic)
+    WITH u, views, clicks, total_clicks, conversions, total_conversion_value, head(collect(d)) AS d
+    RETURN coalesce(d.age_group, 'unknown') AS age_group,
+           coalesce(d.gender, u.gender, 'unknown') AS gender,
+           coalesce(u.location, 'unknown') AS location,
+           count(u) AS users,
+           sum(views) AS views,
+           sum(clicks) AS clicks,
+           sum(total_clicks) AS total_clicks,
+           sum(conversions) AS conversions,
+           sum(total_conversion_value) AS total_conversion_value
+}
+MERGE (s:SegmentStats {id: c.id + '|' + age_group + '|' + gender + '|' + location})
+SET s.campaign_id = c.id,
+    s.campaign_name = c.name,
+    s.age_group = age_group,
+    s.gender = gender,
+    s.location = location,
+    s.users = users,
+    s.views = views,
+    s.clicks = clicks,
+    s.total_clicks = total_clicks,
+    s.conversions = conversions,
+    s.total_conversion_value = total_conversion_value,
+    s.updated_at = datetime()
+"""
+
+# Filters of segment_query; a null list leaves that dimension unfiltered
+SEGMENT_FILTER = """
+MATCH (s:SegmentStats)
+WHERE ($campaigns IS NULL OR s.campaign_id IN $campaigns OR toLower(s.campaign_name) IN $campaigns)
+  AND ($age_groups IS NULL OR toLower(s.age_group) IN $age_groups)
+  AND ($genders IS NULL OR toLower(s.gender) IN $genders)
+  AND ($locations IS NULL OR toLower(s.location) IN $locations)
+"""
+
+CUBE_BUILT_QUERY = "RETURN EXISTS { MATCH (:SegmentStats) } AS built"
+
+
+def refresh_segments(neo4j_graph, campaign_ids: List[str]) -> int:
+    """Rebuild the cube cells of the given campaigns; returns the number of campaigns"""
+    campaign_ids = list(campaign_ids)
+    for start in range(0, len(campaign_ids), SEGMENT_BATCH_SIZE):
+        params = {'ids': campaign_ids[start:start + SEGMENT_BATCH_SIZE]}
+        neo4j_graph.query(DELETE_SEGMENTS, params=params)
+        neo4j_graph.query(REFRESH_SEGMENTS, params=params)
+    return len(campaign_ids)
+
+
+def segment_query(group_by: List[str]) -> str:
+    """
+    Cube query rolling the filtered cells up to the given dimensions
+
+    group_by is a list of SEGMENT_DIMENSIONS keys; an empty list returns the grand
+    total. Expects $campaigns, $age_groups, $genders and $locations (see SEGMENT_FILTER).
+    """
+    keys = [f"s.{prop} AS {prop}" for dimension in group_by for prop in SEGMENT_DIMENSIONS[dimension]]
+    measures = [f"sum(s.{measure}) AS {measure}" for measure in SEGMENT_MEASURES]
+    return SEGMENT_FILTER + "RETURN " + ", ".join(keys + measures) + "\n"
+
+
+def segment_filters(filters: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Parameters of segment_query from {dimension: values}, compared case-insensitively"""
+    def values(dimension):
+        if not filters.get(dimension):
+            return None
+        return [str(v).strip().lower() for v in filters[dimension]]
+
+    return {
+        "campaigns": values("campaign"),
+        "age_groups": values("age_group"),
+        "genders": values("gender"),
+        "locations": values("location"),
+    }
@@ -0,0 +1,67 @@
+"""
+Callback handler turning an agent run into a stream of UI events
+
+Events are dicts with a "type":
+    tool_start  {tool, input}
+    tool_end    {tool, output}
+    token       {text}   text of the final answer as the LLM generates it
+The ReAct reasoning before "Final Answer:" is not forwarded as tokens; tool events
+report that progress instead.
+"""
+import asyncio
+from typing import Any, Dict
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class StreamingEventHandler(AsyncCallbackHandler):
+    """Push tool and answer-token events of a run onto an asyncio.Queue"""
+
+    def __init__(self, queue: asyncio.Queue) -> None:
+        self.queue = queue
+        self._buffers = {}
+        self._answering = {}
+        self._tool_names = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._buffers[run_id] = ""
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._buffers[run_id] = ""
+
+    async def on_llm_new_token(self, token: str, *, run_id, **kwargs) -> None:
+        if run_id not in self._answering:
+            buffer = self._buffers.get(run_id, "") + token
+            self._buffers[run_id] = buffer
+            marker = buffer.find(FINAL_ANSWER_MARKER)
+            if marker < 0:
+                return
+            self._answering[run_id] = False
+            token = buffer[marker + len(FINAL_ANSWER_MARKER):]
+        if not self._answering[run_id]:
+            # Forward the answer from its first non-blank character on
+            token = token.lstrip()
+            if not token:
+                return
+            self._answering[run_id] = True
+        await self.queue.put({"type": "token", "text": token})
+
+    async def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        self._buffers.pop(run_id, None)
+        self._answering.pop(run_id, None)
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id, **kwargs) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name", "tool")
+        self._tool_names[run_id] = name
+        await self.queue.put({"type": "tool_start", "tool": name, "input": input_str})
+
+    async def on_tool_end(self, output: Any, *, run_id, **kwargs) -> None:
+        name = self._tool_names.pop(run_id, kwargs.get("name", "tool"))
+        await self.queue.put({"type": "tool_end", "tool": name, "output": output})
+
+    async def on_tool_error(self, error: BaseException, *, run_id, **kwargs) -> None:
+        name = self._tool_names.pop(run_id, kwargs.get("name", "tool"))
+        await self.queue.put({"type": "tool_end", "tool": name, "output": f"Error: {error}"})
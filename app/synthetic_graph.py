@@ -0,0 +1,249 @@
+"""
+Synthetic marketing graphs in the nodes/relationships format of data_loader
+
+generate_graph builds a graph like data/dummy_graph_data.json at any scale, with the
+skew real campaign data has:
+  - ad popularity follows a power law, so a few ads collect most of the views
+  - campaign sizes (ads per campaign) follow a power law
+  - views per user are geometric (most users view a few ads, some view many)
+  - every campaign has its own click-through and conversion rate (Beta distributed),
+    and products are converted with power-law popularity
+All draws are vectorized with NumPy, so millions of edges take seconds;
+write_graph_file streams the JSON instead of holding the records in memory.
+
+    python app/synthetic_graph.py --scale medium --out data/synthetic_medium.json
+"""
+import argparse
+import datetime
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+import numpy as np
+
+
+AGE_GROUPS = ["18-25", "26-35", "36-45", "46-55", "56+"]
+GENDERS = ["Female", "Male"]
+CATEGORIES = ["Tech", "Home", "Fashion", "Sports", "Beauty", "Food", "Travel", "Toys"]
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin"]
+CITIES = ["Springfield", "Riverside", "Franklin", "Greenville", "Bristol", "Clinton", "Fairview", "Salem",
+          "Madison", "Georgetown", "Arlington", "Ashland", "Dover", "Oxford", "Jackson", "Burlington"]
+
+# Entity counts per named scale; relationships grow with users * avg_views
+SCALES = {
+    "tiny": {"users": 100, "ads": 50, "campaigns": 20, "products": 30},
+    "small": {"users": 2_000, "ads": 400, "campaigns": 40, "products": 200},
+    "medium": {"users": 20_000, "ads": 2_000, "campaigns": 100, "products": 1_000},
+    "large": {"users": 200_000, "ads": 10_000, "campaigns": 300, "products": 5_000},
+    "xlarge": {"users": 1_000_000, "ads": 40_000, "campaigns": 1_000, "products": 20_000},
+}
+
+START_DATE = datetime.date(2024, 1, 1)
+
+
+def _powerlaw_weights(rng, size: int, exponent: float) -> np.ndarray:
+    """Probabilities drawn from a Pareto distribution (smaller exponent = heavier tail)"""
+    weights = rng.pareto(exponent, size) + 1.0
+    return weights / weights.sum()
+
+
+def _dates(days: np.ndarray) -> np.ndarray:
+    return (np.datetime64(START_DATE) + days.astype("timedelta64[D]")).astype(str)
+
+
+def _unique_pairs(sources: np.ndarray, targets: np.ndarray, width: int) -> np.ndarray:
+    """Indices of the first occurrence of each (source, target) pair, in input order"""
+    _, first = np.unique(sources.astype(np.int64) * width + targets, return_index=True)
+    return np.sort(first)
+
+
+def generate_arrays(users: int = 100, ads: int = 50, campaigns: int = 20, products: int = 30,
+                    avg_views: float = 5.0, ad_popularity_exponent: float = 1.2,
+                    campaign_size_exponent: float = 1.5, product_popularity_exponent: float = 1.5,
+                    seed: int = 0) -> Dict[str, Any]:
+    """
+    Draw a synthetic graph as NumPy columns
+
+    Returns a dict of node property columns and relationship (source, target, property)
+    columns keyed by label; generate_graph and write_graph_file turn it into records.
+    """
+    rng = np.random.default_rng(seed)
+    demographics = len(AGE_GROUPS) * len(GENDERS)
+
+    # Campaigns: a start date within the year, 2-8 weeks long, and their own funnel rates
+    campaign_start = rng.integers(0, 300, campaigns)
+    campaign_end = campaign_start + rng.integers(14, 57, campaigns)
+    campaign_ctr = rng.beta(2.0, 18.0, campaigns)
+    campaign_cvr = rng.beta(2.0, 10.0, campaigns)
+
+    # Ads: power-law campaign sizes and power-law popularity
+    ad_campaign = rng.choice(campaigns, size=ads, p=_powerlaw_weights(rng, campaigns, campaign_size_exponent))
+    ad_popularity = _powerlaw_weights(rng, ads, ad_popularity_exponent)
+
+    # Users: age, gender and the demographic they belong to
+    user_age = rng.integers(18, 70, users)
+    user_gender = rng.integers(0, len(GENDERS), users)
+    age_group = np.minimum((user_age - 16) // 10, len(AGE_GROUPS) - 1)
+    user_demographic = age_group * len(GENDERS) + user_gender
+
+    # Views: geometric views per user, ads picked by popularity, duplicate pairs dropped
+    views_per_user = np.minimum(rng.geometric(1.0 / max(avg_views, 1.0), users), ads)
+    view_user = np.repeat(np.arange(users), views_per_user)
+    view_ad = rng.choice(ads, size=len(view_user), p=ad_popularity)
+    keep = _unique_pairs(view_user, view_ad, ads)
+    view_user, view_ad = view_user[keep], view_ad[keep]
+    view_campaign = ad_campaign[view_ad]
+    view_day = campaign_start[view_campaign] + rng.integers(0, 1 << 30, len(view_user)) % (
+        campaign_end[view_campaign] - campaign_start[view_campaign])
+
+    # Clicks: a share of the views at the campaign's click-through rate
+    clicked = rng.random(len(view_user)) < campaign_ctr[view_campaign]
+    click_user, click_ad = view_user[clicked], view_ad[clicked]
+    click_day = view_day[clicked] + rng.integers(0, 7, len(click_user))
+
+    # Conversions: a share of the clicks at the campaign's conversion rate, products by popularity
+    converted = rng.random(len(click_user)) < campaign_cvr[ad_campaign[click_ad]]
+    conversion_user = click_user[converted]
+    conversion_product = rng.choice(products, size=len(conversion_user),
+                                    p=_powerlaw_weights(rng, products, product_popularity_exponent))
+    keep = _unique_pairs(conversion_user, conversion_product, products)
+    conversion_user, conversion_product = conversion_user[keep], conversion_product[keep]
+    conversion_day = click_day[converted][keep] + rng.integers(0, 3, len(conversion_user))
+    product_price = np.round(rng.lognormal(4.5, 0.8, products), 2)
+    quantity = rng.integers(1, 4, len(conversion_user))
+
+    # Each campaign targets 1-3 demographics
+    target_count = rng.integers(1, 4, campaigns)
+    target_campaign = np.repeat(np.arange(campaigns), target_count)
+    target_demographic = rng.integers(0, demographics, len(target_campaign))
+    keep = _unique_pairs(target_campaign, target_demographic, demographics)
+
+    return {
+        "users": {"age": user_age, "gender": user_gender,
+                  "first": rng.integers(0, len(FIRST_NAMES), users), "last": rng.integers(0, len(LAST_NAMES), users),
+                  "city": rng.integers(0, len(CITIES), users)},
+        "ads": {"category": rng.integers(0, len(CATEGORIES), ads), "budget": rng.integers(1_000, 10_000, ads)},
+        "campaigns": {"start": _dates(campaign_start), "end": _dates(campaign_end),
+                      "budget": rng.integers(5_000, 50_000, campaigns)},
+        "products": {"price": product_price, "category": rng.integers(0, len(CATEGORIES), products)},
+        "demographics": demographics,
+        "VIEWED": (view_user, view_ad, {"view_count": rng.geometric(0.4, len(view_user)),
+                                        "date_first_viewed": _dates(view_day)}),
+        "CLICKED": (click_user, click_ad, {"click_count": rng.geometric(0.6, len(click_user)),
+                                           "date_last_clicked": _dates(click_day)}),
+        "CONVERTED": (conversion_user, conversion_product, {
+            "conversion_value": np.round(product_price[conversion_product] * quantity, 2),
+            "conversion_date": _dates(conversion_day),
+        }),
+        "PART_OF": (np.arange(ads), ad_campaign, {}),
+        "TARGETS": (target_campaign[keep], target_demographic[keep], {}),
+        "BELONGS_TO": (np.arange(users), user_demographic, {}),
+    }
+
+
+# Source and target id prefixes of each relationship type
+ENDPOINTS = {
+    "VIEWED": ("user", "ad"),
+    "CLICKED": ("user", "ad"),
+    "CONVERTED": ("user", "product"),
+    "PART_OF": ("ad", "campaign"),
+    "TARGETS": ("campaign", "demographic"),
+    "BELONGS_TO": ("user", "demographic"),
+}
+
+
+def _iter_records(arrays: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield ("nodes" | "relationships", record) for every node, then every relationship"""
+    users = arrays["users"]
+    for i in range(len(users["age"])):
+        yield "nodes", {"id": f"user_{i + 1}", "label": "User", "properties": {
+            "name": f"{FIRST_NAMES[users['first'][i]]} {LAST_NAMES[users['last'][i]]}",
+            "age": int(users["age"][i]), "location": CITIES[users["city"][i]], "gender": GENDERS[users["gender"][i]]}}
+    ads = arrays["ads"]
+    for i in range(len(ads["budget"])):
+        yield "nodes", {"id": f"ad_{i + 1}", "label": "Ad", "properties": {
+            "title": f"{CATEGORIES[ads['category'][i]]} ad {i + 1}", "category": CATEGORIES[ads["category"][i]],
+            "ad_budget": int(ads["budget"][i])}}
+    campaigns = arrays["campaigns"]
+    for i in range(len(campaigns["budget"])):
+        yield "nodes", {"id": f"campaign_{i + 1}", "label": "Campaign", "properties": {
+            "name": f"Campaign {i + 1}", "start_date": str(campaigns["start"][i]), "end_date": str(campaigns["end"][i]),
+            "campaign_budget": int(campaigns["budget"][i])}}
+    products = arrays["products"]
+    for i in range(len(products["price"])):
+        yield "nodes", {"id": f"product_{i + 1}", "label": "Product", "properties": {
+            "name": f"{CATEGORIES[products['category'][i]]} product {i + 1}", "price": float(products["price"][i]),
+            "category": CATEGORIES[products["category"][i]]}}
+    for i in range(arrays["demographics"]):
+        yield "nodes", {"id": f"demographic_{i + 1}", "label": "Demographic", "properties": {
+            "age_group": AGE_GROUPS[i // len(GENDERS)], "gender": GENDERS[i % len(GENDERS)]}}
+
+    for label, (source_prefix, target_prefix) in ENDPOINTS.items():
+        sources, targets, properties = arrays[label]
+        columns = {k: v.tolist() for k, v in properties.items()}
+        for j, (source, target) in enumerate(zip(sources.tolist(), targets.tolist())):
+            record = {"from": f"{source_prefix}_{source + 1}", "to": f"{target_prefix}_{target + 1}", "label": label}
+            if columns:
+                record["properties"] = {k: v[j] for k, v in columns.items()}
+            yield "relationships", record
+
+
+def _scale_options(scale: str = None, **options) -> Dict[str, Any]:
+    counts = dict(SCALES[scale]) if scale else {}
+    counts.update({k: v for k, v in options.items() if v is not None})
+    return counts
+
+
+def generate_graph(scale: str = None, **options) -> dict:
+    """
+    Build a synthetic graph as {"nodes": [...], "relationships": [...]}
+
+    Args:
+        scale: One of SCALES; explicit counts in options override it
+        options: Arguments of generate_arrays (users, ads, campaigns, products, avg_views,
+            the power-law exponents and seed)
+    """
+    graph = {"nodes": [], "relationships": []}
+    for section, record in _iter_records(generate_arrays(**_scale_options(scale, **options))):
+        graph[section].append(record)
+    return graph
+
+
+def write_graph_file(path, scale: str = None, **options) -> Dict[str, int]:
+    """Stream a synthetic graph to a JSON file readable by data_loader; returns the record counts"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    counts = {"nodes": 0, "relationships": 0}
+    with open(path, "w") as f:
+        f.write('{"nodes": [')
+        section = "nodes"
+        for record_section, record in _iter_records(generate_arrays(**_scale_options(scale, **options))):
+            if record_section != section:
+                f.write('],\n"relationships": [')
+                section = record_section
+            f.write(("\n" if counts[section] == 0 else ",\n") + json.dumps(record))
+            counts[section] += 1
+        if section == "nodes":
+            f.write('],\n"relationships": [')
+        f.write("]}\n")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic marketing graph JSON file")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--ads", type=int)
+    parser.add_argument("--campaigns", type=int)
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--avg-views", type=float)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="output JSON path")
+    args = parser.parse_args()
+
+    counts = write_graph_file(args.out, scale=args.scale, users=args.users, ads=args.ads, campaigns=args.campaigns,
+                              products=args.products, avg_views=args.avg_views, seed=args.seed)
+    print(f"Wrote {counts['nodes']} nodes and {counts['relationships']} relationships to {args.out}")
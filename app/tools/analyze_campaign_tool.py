@@ -1,83 +1,88 @@
-from langchain.tools import BaseTool
-from typing import Dict, Any
-from langchain_community.graphs import Neo4jGraph
-from pydantic import Field
+import asyncio
+from typing import Dict, Any, Optional
 from langchain_core.tools import BaseTool
-
-
-from langchain.tools import BaseTool
-from typing import Dict, Any
-from langchain_community.graphs import Neo4jGraph
 from pydantic import Field
+from graph_schema import CAMPAIGN_NAME_FULLTEXT, aquery_with_scan_fallback, fulltext_search_term, query_with_scan_fallback
+from campaign_metrics import (CAMPAIGN_METRICS_QUERY, CAMPAIGN_ROLLUP_QUERY, CAMPAIGN_WINDOW_QUERY, campaign_result,
+                              campaign_scan_query)
+from date_window import parse_date_window
 
 class AnalyzeCampaignTool(BaseTool):
     name: str = "analyze_campaign"
     description: str = (
         "Analyze campaign performance, demographic targeting, and ad engagement in the Neo4j graph.\n\n"
-        "Input: campaign name or partial name (string).\n"
-        "Returns: budget, duration, targeted demographics, total ads, views, clicks, conversions, ROI.\n"
+        "Input: campaign name or partial name (string), optionally followed by a date window, "
+        "e.g. 'Campaign 1; last 30 days', 'Campaign 1; since 2024-09-01' or "
+        "'Campaign 1; from 2024-09-01 to 2024-09-30'.\n"
+        "Returns: budget, duration, targeted demographics, total ads, views, clicks, conversions, ROI "
+        "(within the window when one is given).\n"
         "Use when asked:\n"
         "- What is the performance of Campaign X?\n"
         "- How many ads were there, and how well did they perform?\n"
-        "- Who was targeted and what is the ROI?"
+        "- Who was targeted and what is the ROI?\n"
+        "- How did Campaign X do in September 2024?"
     )
 
-    neo4j_graph: Neo4jGraph = Field(description="Neo4j graph instance for querying campaign data.")
+    neo4j_graph: Any = Field(description="Neo4j graph instance (or CachedGraph wrapper) for querying campaign data.")
 
-    def _run(self, campaign_name: str) -> Dict[str, Any]:
-        query = """
-        MATCH (c:Campaign)
-        WHERE toLower(c.name) CONTAINS toLower($campaign_name)
-        OPTIONAL MATCH (c)-[:TARGETS]->(d:Demographic)
-        OPTIONAL MATCH (a:Ad)-[:PART_OF]->(c)
-        OPTIONAL MATCH (u:User)-[v:VIEWED]->(a)
-        OPTIONAL MATCH (u)-[cl:CLICKED]->(a)
-        OPTIONAL MATCH (u)-[conv:CONVERTED]->(p:Product)
-        RETURN 
-            c.name AS campaign_name,
-            c.start_date AS start,
-            c.end_date AS end,
-            c.campaign_budget AS budget,
-            collect(DISTINCT d.age_group + "-" + d.gender) AS targets,
-            count(DISTINCT a) AS ad_count,
-            count(DISTINCT v) AS views,
-            count(DISTINCT cl) AS clicks,
-            sum(toInteger(cl.click_count)) AS total_clicks,
-            count(DISTINCT p) AS conversions,
-            sum(toFloat(conv.conversion_value)) AS total_conversion_value
-        """
+    async_graph: Optional[Any] = Field(default=None, description="AsyncNeo4jGraph (or AsyncCachedGraph) used by _arun.")
+
+    @staticmethod
+    def _params(campaign_name: str) -> Dict[str, Any]:
+        return {
+            "campaign_name": campaign_name,
+            "search": fulltext_search_term(campaign_name),
+            "name_index": CAMPAIGN_NAME_FULLTEXT,
+        }
+
+    def _query(self, query: str, params: Dict[str, Any]):
+        return query_with_scan_fallback(self.neo4j_graph, query, params, campaign_scan_query(query))
 
-        result = self.neo4j_graph.query(query, params={"campaign_name": campaign_name})
+    async def _aquery(self, query: str, params: Dict[str, Any]):
+        return await aquery_with_scan_fallback(self.async_graph, query, params, campaign_scan_query(query))
+
+    @staticmethod
+    def _result(campaign_name: str, result, window=None) -> Dict[str, Any]:
         if not result:
             return {"error": f"No campaign matched name: {campaign_name}"}
+        return campaign_result(result[0], window)
 
-        r = result[0]
-        roi = (
-            float(r["total_conversion_value"] or 0) / float(r["budget"])
-            if r["budget"] not in (None, 0, "N/A") else None
-        )
+    def _run(self, campaign_name: str) -> Dict[str, Any]:
+        try:
+            campaign_name, window = parse_date_window(campaign_name)
+        except ValueError as e:
+            return {"error": str(e)}
+        params = self._params(campaign_name)
+        if not params["search"]:
+            return self._result(campaign_name, [])
 
-        return {
-            "campaign_name": r.get("campaign_name", "Unknown"),
-            "start_date": r.get("start", "N/A"),
-            "end_date": r.get("end", "N/A"),
-            "budget": r.get("budget", "N/A"),
-            "target_demographics": r.get("targets", []),
-            "ad_count": r["ad_count"],
-            "views": r["views"],
-            "clicks": r["clicks"],
-            "total_clicks": r["total_clicks"] or 0,
-            "conversions": r["conversions"],
-            "total_conversion_value": float(r["total_conversion_value"] or 0),
-            "roi": round(roi, 2) if roi is not None else "N/A",
-            "summary": (
-                f"Campaign '{r.get('campaign_name')}' ran from {r.get('start')} to {r.get('end')} "
-                f"with ${r.get('budget')} budget, targeting {', '.join(r.get('targets', []))}. "
-                f"It had {r['ad_count']} ads, {r['views']} views, {r['total_clicks']} clicks, and "
-                f"{r['conversions']} conversions totaling ${r['total_conversion_value']:.2f}. "
-                f"ROI: {round(roi, 2) if roi else 'N/A'}."
-            )
-        }
+        if window:
+            result = self._query(CAMPAIGN_WINDOW_QUERY, {**params, **window.params()})
+            return self._result(campaign_name, result, window)
+
+        # Read the materialized rollup; fall back to the live aggregation if it is missing
+        result = self._query(CAMPAIGN_ROLLUP_QUERY, params)
+        if result and not result[0]["has_rollup"]:
+            result = self._query(CAMPAIGN_METRICS_QUERY, params)
+        return self._result(campaign_name, result)
 
     async def _arun(self, campaign_name: str) -> Dict[str, Any]:
-        return self._run(campaign_name)
+        if self.async_graph is None:
+            return await asyncio.to_thread(self._run, campaign_name)
+
+        try:
+            campaign_name, window = parse_date_window(campaign_name)
+        except ValueError as e:
+            return {"error": str(e)}
+        params = self._params(campaign_name)
+        if not params["search"]:
+            return self._result(campaign_name, [])
+
+        if window:
+            result = await self._aquery(CAMPAIGN_WINDOW_QUERY, {**params, **window.params()})
+            return self._result(campaign_name, result, window)
+
+        result = await self._aquery(CAMPAIGN_ROLLUP_QUERY, params)
+        if result and not result[0]["has_rollup"]:
+            result = await self._aquery(CAMPAIGN_METRICS_QUERY, params)
+        return self._result(campaign_name, result)
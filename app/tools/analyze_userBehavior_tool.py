@@ -1,79 +1,134 @@
+import asyncio
+import json
+import re
 from langchain.tools import BaseTool
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from langchain_community.graphs import Neo4jGraph
 from pydantic import Field
+from graph_schema import USER_NAME_FULLTEXT, aquery_with_scan_fallback, fulltext_search_term, query_with_scan_fallback
+from user_metrics import USER_BEHAVIOR_QUERY, USER_BEHAVIOR_WINDOW_QUERY, user_result, user_scan_query
+from date_window import parse_date_window
 
 class AnalyzeUserBehaviorTool(BaseTool):
     name: str = "analyze_user_behavior"
     description: str = (
-    "Analyze a user's interaction with ads and products using their name.\n\n"
-    "Input: a user name or partial name as a plain string (e.g., 'Christopher Cross')\n"
+    "Analyze a user's interaction with ads and products using their name or id.\n\n"
+    "Input: a user name, partial name or id as a plain string (e.g., 'Christopher Cross' or 'user_12').\n"
+    "To compare several users at once, separate them with commas (e.g., 'Alice, Bob, Sarah').\n"
+    "Add a date window to count only activity inside it (e.g., 'Alice; last 30 days' or "
+    "'Alice, Bob; from 2024-09-01 to 2024-09-30').\n"
     "Output: behavior summary including views, clicks, conversions, and demographic info.\n\n"
     "Do not wrap the input in 'user_name = ...' format. Just pass the name as-is."
 )
 
 
-    neo4j_graph: Neo4jGraph = Field(description="Neo4j graph instance for querying user behavior data.")
+    neo4j_graph: Any = Field(description="Neo4j graph instance (or CachedGraph wrapper) for querying user behavior data.")
 
-    def _resolve_user_name(self, user_input: str) -> str:
-        # Try to find user by name
-        name_query = """
-        MATCH (u:User)
-        WHERE toLower(u.name) CONTAINS toLower($name)
-        RETURN u.name AS name
-        """
-        matches = self.neo4j_graph.query(name_query, params={"name": user_input})
+    async_graph: Optional[Any] = Field(default=None, description="AsyncNeo4jGraph (or AsyncCachedGraph) used by _arun.")
 
-        if not matches:
-            raise ValueError(f"No user found with name containing '{user_input}'")
+    max_candidates: int = Field(default=5, description="Users summarized when a name is ambiguous.")
 
-        if len(matches) == 1:
-            return matches[0]["name"]
+    @staticmethod
+    def _split_inputs(user_input: str) -> List[str]:
+        """Split a batch request ('Alice, Bob and Sarah' or a JSON list) into single inputs"""
+        text = user_input.strip()
+        if text.startswith("["):
+            try:
+                return [str(item).strip() for item in json.loads(text) if str(item).strip()]
+            except ValueError:
+                pass
+        parts = re.split(r"\s*(?:,|;|\n|\band\b)\s*", text, flags=re.IGNORECASE)
+        return [part.strip(" '\"") for part in parts if part.strip(" '\"")]
 
-        options = ", ".join([m["name"] for m in matches])
-        raise ValueError(f"Multiple users matched: {options}. Please be more specific.")
+    def _behavior_params(self, user_inputs: List[str], window=None) -> Dict[str, Any]:
+        """Parameters of USER_BEHAVIOR_QUERY; inputs without searchable words are left out"""
+        inputs = {text: {"text": text, "search": fulltext_search_term(text)} for text in user_inputs}
+        params = {
+            "inputs": [i for i in inputs.values() if i["search"]],
+            "name_index": USER_NAME_FULLTEXT,
+            "max_candidates": self.max_candidates,
+        }
+        if window:
+            params.update(window.params())
+        return params
 
-    def _run(self, user_input: str) -> Dict[str, Any]:
-        try:
-            user_name = self._resolve_user_name(user_input)
-        except Exception as e:
-            return {"error": str(e)}
+    @staticmethod
+    def _input_results(user_inputs: List[str], rows: List[Dict[str, Any]], window=None) -> List[Dict[str, Any]]:
+        rows_by_input = {}
+        for row in rows:
+            rows_by_input.setdefault(row["input"], []).append(row)
+
+        results = []
+        for text in user_inputs:
+            matches = rows_by_input.get(text, [])
+            if not matches:
+                results.append({"error": f"No user found with name containing '{text}'"})
+            elif matches[0]["match_count"] == 1:
+                results.append(user_result(matches[0], window))
+            else:
+                summaries = [user_result(r, window) for r in matches]
+                names = ", ".join(r["name"] for r in summaries)
+                more = matches[0]["match_count"] - len(summaries)
+                results.append({
+                    "error": f"Multiple users matched '{text}': {names}"
+                             + (f" and {more} more" if more > 0 else "") + ". Please be more specific.",
+                    "matches": summaries,
+                })
+        return results
+
+    def analyze_users(self, user_inputs: List[str], window=None) -> List[Dict[str, Any]]:
+        """
+        Resolve and summarize several users (names, partial names or ids) in one query
+
+        With a date_window.DateWindow only the activity inside it is counted.
 
-        query = """
-        MATCH (u:User)
-        WHERE u.name = $user_name
-        OPTIONAL MATCH (u)-[v:VIEWED]->(ad1:Ad)
-        OPTIONAL MATCH (u)-[c:CLICKED]->(ad2:Ad)
-        OPTIONAL MATCH (u)-[conv:CONVERTED]->(p:Product)
-        RETURN u.name AS name, u.age AS age, u.location AS location,
-               count(DISTINCT ad1) AS views,
-               count(DISTINCT ad2) AS clicks,
-               sum(toInteger(c.click_count)) AS total_clicks,
-               count(DISTINCT p) AS conversions,
-               sum(toFloat(conv.conversion_value)) AS total_conversion_value
+        Returns one result per input, in order: the user's behavior summary, an
+        ambiguity result listing the summaries of the matching users, or an error
         """
+        params = self._behavior_params(user_inputs, window)
+        query = USER_BEHAVIOR_WINDOW_QUERY if window else USER_BEHAVIOR_QUERY
+        rows = query_with_scan_fallback(self.neo4j_graph, query, params, user_scan_query(query)) \
+            if params["inputs"] else []
+        return self._input_results(user_inputs, rows, window)
 
-        result = self.neo4j_graph.query(query, params={"user_name": user_name})
-        if not result:
-            return {"error": f"No behavior data found for user '{user_name}'"}
+    async def aanalyze_users(self, user_inputs: List[str], window=None) -> List[Dict[str, Any]]:
+        """analyze_users on the async graph"""
+        params = self._behavior_params(user_inputs, window)
+        query = USER_BEHAVIOR_WINDOW_QUERY if window else USER_BEHAVIOR_QUERY
+        rows = await aquery_with_scan_fallback(self.async_graph, query, params, user_scan_query(query)) \
+            if params["inputs"] else []
+        return self._input_results(user_inputs, rows, window)
 
-        r = result[0]
+    @staticmethod
+    def _combine(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if len(results) == 1:
+            return results[0]
         return {
-            "name": r.get("name", "Unknown"),
-            "age": r.get("age", "N/A"),
-            "location": r.get("location", "N/A"),
-            "views": r["views"] or 0,
-            "clicks": r["clicks"] or 0,
-            "total_clicks": r["total_clicks"] or 0,
-            "conversions": r["conversions"] or 0,
-            "total_conversion_value": float(r["total_conversion_value"] or 0),
-            "summary": (
-                f"{r.get('name')} (age {r.get('age')}) viewed {r['views']} ads, "
-                f"clicked {r['total_clicks']} times on {r['clicks']} ads, "
-                f"and converted on {r['conversions']} products totaling "
-                f"${r['total_conversion_value']:.2f}."
-            )
+            "users": results,
+            "summary": " ".join(r.get("summary", r.get("error", "")) for r in results),
         }
 
+    def _run(self, user_input: str) -> Dict[str, Any]:
+        try:
+            user_input, window = parse_date_window(user_input)
+        except ValueError as e:
+            return {"error": str(e)}
+        user_inputs = self._split_inputs(user_input)
+        if not user_inputs:
+            return {"error": "Please provide a user name or id."}
+
+        return self._combine(self.analyze_users(user_inputs, window))
+
     async def _arun(self, user_input: str) -> Dict[str, Any]:
-        return self._run(user_input)
+        if self.async_graph is None:
+            return await asyncio.to_thread(self._run, user_input)
+
+        try:
+            user_input, window = parse_date_window(user_input)
+        except ValueError as e:
+            return {"error": str(e)}
+        user_inputs = self._split_inputs(user_input)
+        if not user_inputs:
+            return {"error": "Please provide a user name or id."}
+
+        return self._combine(await self.aanalyze_users(user_inputs, window))
@@ -3,7 +3,7 @@ from langchain.tools import BaseTool
 from langchain_openai import ChatOpenAI
 from pydantic import Field
 from typing import Optional
-from langchain.memory import ConversationBufferMemory
+from langchain.memory.chat_memory import BaseChatMemory
 
 class FallbackTool(BaseTool):
     name: str = "fallback_tool"
@@ -11,7 +11,7 @@ class FallbackTool(BaseTool):
     return_direct: bool = True  # ✅ Prevent infinite loops
 
     llm: ChatOpenAI
-    memory: ConversationBufferMemory  # Added memory field
+    memory: BaseChatMemory  # Shared with the agent (BoundedConversationMemory in main.py)
     fallback_prompt: str = Field(
         default=(
         "You are a friendly, humorous, and talkative AI assistant who enjoys casual conversation with the user. "
@@ -27,19 +27,18 @@ class FallbackTool(BaseTool):
         )
     )
 
+    def _history(self) -> str:
+        if not self.memory:
+            return ""
+        # BoundedConversationMemory keeps the rendered history up to date as turns are added
+        if hasattr(self.memory, "rendered_history"):
+            return self.memory.rendered_history()
+        return "".join(f"{msg.type.title()}: {msg.content}\n" for msg in self.memory.chat_memory.messages)
+
     def _run(self, query: str) -> str:
-        # Concatenate history
-        history = ""
-        if self.memory:
-            for msg in self.memory.chat_memory.messages:
-                history += f"{msg.type.title()}: {msg.content}\n"
-        prompt = self.fallback_prompt.format(history=history, query=query)
+        prompt = self.fallback_prompt.format(history=self._history(), query=query)
         return self.llm.invoke(prompt).content
 
     async def _arun(self, query: str) -> str:
-        history = ""
-        if self.memory:
-            for msg in self.memory.chat_memory.messages:
-                history += f"{msg.type.title()}: {msg.content}\n"
-        prompt = self.fallback_prompt.format(history=history, query=query)
+        prompt = self.fallback_prompt.format(history=self._history(), query=query)
         return (await self.llm.ainvoke(prompt)).content
@@ -1,7 +1,10 @@
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Optional
 from langchain_community.graphs import Neo4jGraph
 from langchain_core.tools import BaseTool
 from pydantic import Field
+from guarded_query import QueryRejected, arun_guarded, run_guarded
+from cypher_params import parameterize_cypher, plan_cache_stats
 
 class GraphQueryTool(BaseTool):
     name: str = "graph_query"
@@ -15,20 +18,65 @@ class GraphQueryTool(BaseTool):
     "- Perform graph pattern matching (e.g., campaigns → users)\n"
     "- Execute aggregations, counts, groupings, etc.\n\n"
     "-Ensure that your query uses correct Cypher syntax.\n"
+    "- Queries are read-only, row-capped and time-limited; "
+    "aggregate or filter instead of returning whole node sets.\n"
     "This tool is ideal when the user explicitly asks a technical query involving structure or data from the graph."
     )
 
-    neo4j_graph: Neo4jGraph = Field(..., description="Connected Neo4j graph database instance")
+    neo4j_graph: Any = Field(..., description="Connected Neo4j graph database instance (or CachedGraph wrapper)")
+
+    async_graph: Optional[Any] = Field(default=None, description="AsyncNeo4jGraph (or AsyncCachedGraph) used by _arun")
+
+    guarded: bool = Field(default=True, description="Run queries through guarded_query (cost check, row cap, timeout)")
+    max_rows: int = Field(default=50, description="Rows returned at most by a guarded query")
+    timeout_seconds: float = Field(default=10.0, description="Server-side transaction timeout of a guarded query")
+    row_budget: float = Field(default=1_000_000, description="Largest plan EstimatedRows a guarded query may have")
+    max_output_chars: int = Field(default=4000, description="Characters of formatted output passed back to the agent")
+    parameterize: bool = Field(default=True, description="Lift literals into parameters so repeated shapes reuse cached plans")
+
+    def _guard_options(self) -> Dict[str, Any]:
+        return {"max_rows": self.max_rows, "timeout": self.timeout_seconds, "row_budget": self.row_budget}
+
+    def _prepare(self, query: str):
+        """Canonicalize the query and lift its literals into parameters"""
+        if not self.parameterize:
+            return query, {}
+        text, params, lifted = parameterize_cypher(query)
+        plan_cache_stats.record(text, lifted)
+        return text, params
 
     def _run(self, query: str) -> str:
         try:
-            result = self.neo4j_graph.query(query)
-            return self._format_output(result)
+            query, params = self._prepare(query)
+            if not self.guarded:
+                return self._format_output(self.neo4j_graph.query(query, params=params))
+            return self._format_guarded(run_guarded(self.neo4j_graph, query, params, **self._guard_options()))
+        except QueryRejected as e:
+            return f"Query rejected: {str(e)}"
         except Exception as e:
             return f"Query execution failed: {str(e)}"
 
     async def _arun(self, query: str) -> str:
-        return self._run(query)
+        if self.async_graph is None:
+            return await asyncio.to_thread(self._run, query)
+        try:
+            query, params = self._prepare(query)
+            if not self.guarded:
+                return self._format_output(await self.async_graph.query(query, params=params))
+            return self._format_guarded(await arun_guarded(self.async_graph, query, params, **self._guard_options()))
+        except QueryRejected as e:
+            return f"Query rejected: {str(e)}"
+        except Exception as e:
+            return f"Query execution failed: {str(e)}"
+
+    def _format_guarded(self, result: Dict[str, Any]) -> str:
+        output = self._format_output(result["rows"])
+        if len(output) > self.max_output_chars:
+            output = output[:self.max_output_chars].rsplit("\n", 1)[0] + "\n..."
+        if result["truncated"]:
+            output += (f"\n[Truncated: showing the first {len(result['rows'])} rows. "
+                       "Add filters, aggregation or a smaller LIMIT for a complete answer.]")
+        return output
 
     def _format_output(self, result: List[Dict[str, Any]]) -> str:
         if not result:
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, List, Optional, Type
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+
+class ParallelToolsInput(BaseModel):
+    calls: str = Field(..., description='JSON list of [tool, input] pairs, e.g. [["analyze_campaign", "Black Friday"]]')
+
+
+class ParallelToolsTool(BaseTool):
+    name: str = "run_tools_in_parallel"
+    description: str = (
+        "Run several independent tool calls at once and get all their results in one observation. "
+        "Use it instead of one call per step when a question needs the same kind of lookup for "
+        "several entities, e.g. comparing campaigns or users.\n\n"
+        "Input: a JSON list of [tool name, tool input] pairs, e.g.\n"
+        '[["analyze_campaign", "Back to School"], ["analyze_campaign", "Black Friday"]]\n'
+        "Use when asked:\n"
+        "- Compare Back to School and Black Friday\n"
+        "- What did Alice and Bob do?"
+    )
+    args_schema: Type[BaseModel] = ParallelToolsInput
+    tools: List[BaseTool] = Field(..., description="Tools the calls may use")
+    max_concurrency: int = Field(default=4, description="Calls running at the same time at most")
+    max_calls: int = Field(default=10, description="Calls accepted in one input")
+
+    def _parse_calls(self, calls: str) -> List[Dict[str, str]]:
+        text = re.sub(r"^```(?:json)?|```$", "", (calls or "").strip()).strip()
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Input is not a JSON list of calls: {e}")
+        if isinstance(parsed, dict):
+            parsed = [parsed]
+        if not isinstance(parsed, list) or not parsed:
+            raise ValueError("Input must be a non-empty JSON list of calls")
+        if len(parsed) > self.max_calls:
+            raise ValueError(f"At most {self.max_calls} calls can run in one step")
+
+        available = {tool.name: tool for tool in self.tools}
+        result = []
+        for call in parsed:
+            # The description asks for pairs, since it is part of the agent's prompt template
+            # where braces are reserved; {"tool": ..., "input": ...} objects are accepted too
+            if isinstance(call, (list, tuple)) and len(call) == 2:
+                call = {"tool": call[0], "input": call[1]}
+            if not isinstance(call, dict) or "tool" not in call:
+                raise ValueError(f'Each call must be {{"tool": ..., "input": ...}}, got {call!r}')
+            if call["tool"] not in available:
+                raise ValueError(f"Unknown tool '{call['tool']}'; available: {', '.join(available)}")
+            tool_input = call.get("input", "")
+            if not isinstance(tool_input, str):
+                tool_input = json.dumps(tool_input)
+            result.append({"tool": call["tool"], "input": tool_input})
+        return result
+
+    @staticmethod
+    def _merge(calls: List[Dict[str, str]], results: List[Any]) -> str:
+        sections = []
+        for call, result in zip(calls, results):
+            if isinstance(result, Exception):
+                result = {"error": str(result)}
+            sections.append(f"### {call['tool']}({call['input']})\n{result}")
+        return "\n\n".join(sections)
+
+    def _run(self, calls: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        try:
+            parsed = self._parse_calls(calls)
+        except ValueError as e:
+            return f"Error: {e}"
+        available = {tool.name: tool for tool in self.tools}
+        callbacks = run_manager.get_child() if run_manager else None
+
+        def call_tool(call):
+            try:
+                return available[call["tool"]].run(call["input"], callbacks=callbacks)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+            # Each call keeps the caller's context (e.g. the request trace)
+            futures = [executor.submit(copy_context().run, call_tool, call) for call in parsed]
+            results = [future.result() for future in futures]
+        return self._merge(parsed, results)
+
+    async def _arun(self, calls: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> str:
+        try:
+            parsed = self._parse_calls(calls)
+        except ValueError as e:
+            return f"Error: {e}"
+        available = {tool.name: tool for tool in self.tools}
+        callbacks = run_manager.get_child() if run_manager else None
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+        async def call_tool(call):
+            async with semaphore:
+                return await available[call["tool"]].arun(call["input"], callbacks=callbacks)
+
+        results = await asyncio.gather(*(call_tool(call) for call in parsed), return_exceptions=True)
+        return self._merge(parsed, results)
@@ -0,0 +1,192 @@
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Type
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+from campaign_metrics import ALL_CAMPAIGN_METRICS_QUERY, CAMPAIGN_LEADERBOARD_QUERY
+
+
+RANK_METRICS = ["roi", "ctr", "conversion_rate", "spend", "views", "clicks", "conversions", "total_conversion_value"]
+
+# Phrases the agent may pass instead of a metric key, longest first
+METRIC_ALIASES = {
+    "return on investment": "roi",
+    "click-through rate": "ctr",
+    "click through rate": "ctr",
+    "conversion value": "total_conversion_value",
+    "conversion rate": "conversion_rate",
+    "revenue": "total_conversion_value",
+    "budget": "spend",
+    "spend": "spend",
+    "roi": "roi",
+    "ctr": "ctr",
+    "conversions": "conversions",
+    "clicks": "clicks",
+    "views": "views",
+}
+
+
+class RankCampaignsInput(BaseModel):
+    query: str = Field(default="metric=roi",
+                       description="Ranking options, e.g. 'metric=conversion_rate; top=5; order=desc; min_budget=10000'")
+
+
+class RankCampaignsTool(BaseTool):
+    name: str = "rank_campaigns"
+    description: str = (
+        "Rank all campaigns at once by ROI, CTR, conversion rate, spend, views, clicks, conversions "
+        "or conversion value, and return a compact leaderboard table.\n\n"
+        "Input: options as 'key=value' pairs separated by ';', all optional:\n"
+        f"- metric: one of {', '.join(RANK_METRICS)} (default roi)\n"
+        "- top: number of campaigns to return (default 10)\n"
+        "- order: desc (best first, default) or asc\n"
+        "- min_budget / max_budget / min_views: filters; name: only campaigns whose name contains it\n"
+        "Use when asked:\n"
+        "- Which campaign had the best ROI?\n"
+        "- Which campaign has the highest conversion rate?\n"
+        "- Top 5 campaigns by spend"
+    )
+    args_schema: Type[BaseModel] = RankCampaignsInput
+    neo4j_graph: Any = Field(..., description="Neo4j graph instance (or CachedGraph wrapper)")
+    async_graph: Optional[Any] = Field(default=None, description="AsyncNeo4jGraph (or AsyncCachedGraph) used by _arun")
+
+    def _parse_options(self, query: str) -> Dict[str, Any]:
+        text = (query or "").lower()
+        pairs = dict(re.findall(r"(\w+)\s*[=:]\s*([^;,\n]+)", text))
+        options = {"metric": "roi", "top": 10, "order": "desc"}
+
+        metric = pairs.get("metric", pairs.get("sort", "")).strip()
+        if metric not in RANK_METRICS:
+            # Whole-word aliases in the metric value, or in free text outside the key=value
+            # pairs, so a filter like name=electronics does not pick a metric
+            search = metric or re.sub(r"\w+\s*[=:]\s*[^;,\n]+", " ", text)
+            metric = next((m for alias, m in METRIC_ALIASES.items()
+                           if re.search(rf"\b{re.escape(alias)}\b", search)), "roi")
+        options["metric"] = metric
+
+        top = pairs.get("top") or pairs.get("k") or pairs.get("limit")
+        if top is None:
+            match = re.search(r"\btop\s+(\d+)", text)
+            top = match.group(1) if match else None
+        if top is not None and top.strip().isdigit():
+            options["top"] = max(1, int(top))
+
+        order = pairs.get("order", "").strip()
+        if order in ("asc", "desc"):
+            options["order"] = order
+        elif re.search(r"\b(lowest|worst|least|bottom)\b", text):
+            options["order"] = "asc"
+
+        for key in ("min_budget", "max_budget", "min_views"):
+            if key in pairs:
+                try:
+                    options[key] = float(pairs[key])
+                except ValueError:
+                    pass
+        if "name" in pairs:
+            options["name"] = pairs["name"].strip()
+        return options
+
+    def _campaign_rows(self) -> List[Dict[str, Any]]:
+        rows = self.neo4j_graph.query(CAMPAIGN_LEADERBOARD_QUERY)
+        # Without complete rollups, aggregate every campaign live in one query instead
+        if any(not r["has_rollup"] for r in rows):
+            rows = self.neo4j_graph.query(ALL_CAMPAIGN_METRICS_QUERY)
+        return rows
+
+    async def _acampaign_rows(self) -> List[Dict[str, Any]]:
+        rows = await self.async_graph.query(CAMPAIGN_LEADERBOARD_QUERY)
+        if any(not r["has_rollup"] for r in rows):
+            rows = await self.async_graph.query(ALL_CAMPAIGN_METRICS_QUERY)
+        return rows
+
+    @staticmethod
+    def _ratio(numerator, denominator):
+        return float(numerator) / float(denominator) if denominator else None
+
+    def rank(self, query: str = "") -> Dict[str, Any]:
+        """Compute every campaign's metrics and return the filtered, sorted leaderboard"""
+        return self._leaderboard(self._parse_options(query), self._campaign_rows())
+
+    def _leaderboard(self, options: Dict[str, Any], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        entries = []
+        for r in rows:
+            try:
+                budget = float(r["budget"])
+            except (TypeError, ValueError):
+                budget = None
+            views = r["views"] or 0
+            clicks = r["clicks"] or 0
+            conversions = r["conversions"] or 0
+            value = float(r["total_conversion_value"] or 0)
+            entries.append({
+                "campaign_id": r["campaign_id"],
+                "campaign_name": r["campaign_name"],
+                "spend": budget,
+                "views": views,
+                "clicks": clicks,
+                "conversions": conversions,
+                "total_conversion_value": value,
+                "roi": self._ratio(value, budget),
+                "ctr": self._ratio(clicks, views),
+                # Conversions are attributed to the campaign's viewers, so they are rated per view
+                "conversion_rate": self._ratio(conversions, views),
+            })
+
+        if "min_budget" in options:
+            entries = [e for e in entries if e["spend"] is not None and e["spend"] >= options["min_budget"]]
+        if "max_budget" in options:
+            entries = [e for e in entries if e["spend"] is not None and e["spend"] <= options["max_budget"]]
+        if "min_views" in options:
+            entries = [e for e in entries if e["views"] >= options["min_views"]]
+        if "name" in options:
+            entries = [e for e in entries if options["name"] in str(e["campaign_name"]).lower()]
+
+        metric = options["metric"]
+        ranked = sorted((e for e in entries if e[metric] is not None), key=lambda e: e[metric],
+                        reverse=options["order"] == "desc")
+        ranked += [e for e in entries if e[metric] is None]
+        return {"options": options, "total": len(entries), "campaigns": ranked[:options["top"]]}
+
+    def _format_table(self, result: Dict[str, Any]) -> str:
+        options = result["options"]
+        if not result["campaigns"]:
+            return "No campaigns matched the ranking filters."
+
+        def fmt(value, pattern):
+            return "N/A" if value is None else pattern.format(value)
+
+        lines = [
+            f"Campaigns ranked by {options['metric']} ({options['order']}), "
+            f"top {len(result['campaigns'])} of {result['total']}:",
+            "rank | campaign | spend | views | clicks | conversions | value | roi | ctr | conv_rate",
+        ]
+        for rank, e in enumerate(result["campaigns"], start=1):
+            lines.append(" | ".join([
+                str(rank),
+                f"{e['campaign_name']} ({e['campaign_id']})",
+                fmt(e["spend"], "${:,.0f}"),
+                str(e["views"]),
+                str(e["clicks"]),
+                str(e["conversions"]),
+                fmt(e["total_conversion_value"], "${:,.2f}"),
+                fmt(e["roi"], "{:.3f}"),
+                fmt(e["ctr"], "{:.1%}"),
+                fmt(e["conversion_rate"], "{:.1%}"),
+            ]))
+        return "\n".join(lines)
+
+    def _run(self, query: str = "") -> str:
+        try:
+            return self._format_table(self.rank(query))
+        except Exception as e:
+            return f"❌ Failed to rank campaigns: {str(e)}"
+
+    async def _arun(self, query: str = "") -> str:
+        if self.async_graph is None:
+            return await asyncio.to_thread(self._run, query)
+        try:
+            rows = await self._acampaign_rows()
+            return self._format_table(self._leaderboard(self._parse_options(query), rows))
+        except Exception as e:
+            return f"❌ Failed to rank campaigns: {str(e)}"
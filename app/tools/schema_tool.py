@@ -1,8 +1,10 @@
-from typing import Type
+import asyncio
+from typing import Any, Dict, List, Optional, Type
 from pydantic import BaseModel
 from langchain_core.tools import BaseTool
 from langchain_community.graphs import Neo4jGraph
 from pydantic import Field
+from graph_schema import LABELS_QUERY, META_SCHEMA_QUERY, RELATIONSHIP_TYPES_QUERY
 
 
 class SchemaInput(BaseModel):
@@ -17,27 +19,47 @@ class SchemaTool(BaseTool):
         "or what properties are available."
     )
     args_schema: Type[BaseModel] = SchemaInput  # Add type annotation
-    neo4j_graph: Neo4jGraph = Field(..., description="Neo4j graph database instance")
+    neo4j_graph: Any = Field(..., description="Neo4j graph database instance (or CachedGraph wrapper)")
+    async_graph: Optional[Any] = Field(default=None, description="AsyncNeo4jGraph (or AsyncCachedGraph) used by _arun")
+    schema_snapshot: Optional[Any] = Field(default=None, description="SchemaSnapshot serving the schema without sampling the graph")
+
+    @staticmethod
+    def _format_schema(node_labels: List[str], rel_types: List[str], node_props: Dict[str, Any]) -> str:
+        lines = [
+            "📦 Graph Database Schema:",
+            f"🏷️ Node Labels: {', '.join(node_labels)}",
+            f"🔗 Relationship Types: {', '.join(rel_types)}",
+            "🔍 Node Properties:"
+        ]
+        for label, props in node_props.items():
+            lines.append(f"  ▶ {label}:")
+            for prop, meta in props.get("properties", {}).items():
+                lines.append(f"    - {prop}: {meta.get('type', 'unknown')}")
+        return "\n".join(lines)
 
     def _run(self, query: str) -> str:
         try:
-            node_labels = self.neo4j_graph.query("CALL db.labels() YIELD label RETURN collect(label) AS labels")[0]["labels"]
-            rel_types = self.neo4j_graph.query("CALL db.relationshipTypes() YIELD relationshipType RETURN collect(relationshipType) AS types")[0]["types"]
-            node_props = self.neo4j_graph.query("CALL apoc.meta.schema() YIELD value RETURN value")[0]["value"]
-
-            lines = [
-                "📦 Graph Database Schema:",
-                f"🏷️ Node Labels: {', '.join(node_labels)}",
-                f"🔗 Relationship Types: {', '.join(rel_types)}",
-                "🔍 Node Properties:"
-            ]
-            for label, props in node_props.items():
-                lines.append(f"  ▶ {label}:")
-                for prop, meta in props.get("properties", {}).items():
-                    lines.append(f"    - {prop}: {meta.get('type', 'unknown')}")
-            return "\n".join(lines)
+            if self.schema_snapshot is not None:
+                snapshot = self.schema_snapshot.get(self.neo4j_graph)
+                return self._format_schema(snapshot["labels"], snapshot["relationship_types"], snapshot["properties"])
+
+            node_labels = self.neo4j_graph.query(LABELS_QUERY)[0]["labels"]
+            rel_types = self.neo4j_graph.query(RELATIONSHIP_TYPES_QUERY)[0]["types"]
+            node_props = self.neo4j_graph.query(META_SCHEMA_QUERY)[0]["value"]
+            return self._format_schema(node_labels, rel_types, node_props)
         except Exception as e:
             return f"❌ Failed to get schema: {str(e)}"
 
-    async def _arun(self, query: str) -> str:
-        return self._run(query)
+    async def _arun(self, query: str = "") -> str:
+        if self.async_graph is None or self.schema_snapshot is not None:
+            return await asyncio.to_thread(self._run, query)
+        try:
+            # The three schema queries are independent, so they run concurrently
+            labels, types, meta = await asyncio.gather(
+                self.async_graph.query(LABELS_QUERY),
+                self.async_graph.query(RELATIONSHIP_TYPES_QUERY),
+                self.async_graph.query(META_SCHEMA_QUERY),
+            )
+            return self._format_schema(labels[0]["labels"], types[0]["types"], meta[0]["value"])
+        except Exception as e:
+            return f"❌ Failed to get schema: {str(e)}"
@@ -0,0 +1,166 @@
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Type
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+from segments import CUBE_BUILT_QUERY, SEGMENT_MEASURES, segment_filters, segment_query
+
+
+SEGMENT_METRICS = SEGMENT_MEASURES + ["ctr", "conversion_rate"]
+
+# Words the agent may use for a dimension
+DIMENSION_ALIASES = {
+    "campaign": "campaign", "campaigns": "campaign", "campaign_name": "campaign", "campaign_id": "campaign",
+    "age_group": "age_group", "age": "age_group", "age_groups": "age_group",
+    "gender": "gender", "sex": "gender", "genders": "gender",
+    "location": "location", "city": "location", "region": "location", "locations": "location",
+}
+
+
+class SegmentAudienceInput(BaseModel):
+    query: str = Field(default="by=age_group,gender",
+                       description="Segmentation options, e.g. 'by=age_group,gender; campaign=Campaign 1; metric=ctr'")
+
+
+class SegmentAudienceTool(BaseTool):
+    name: str = "segment_audience"
+    description: str = (
+        "Break campaign audiences down by age group, gender and location from a precomputed segmentation "
+        "cube, and return a compact table of viewers, views, clicks, conversions and conversion value per "
+        "segment.\n\n"
+        "Input: options as 'key=value' pairs separated by ';', all optional:\n"
+        "- by: dimensions to group by, comma separated, from campaign, age_group, gender, location "
+        "(default age_group,gender; 'by=none' gives the overall total)\n"
+        "- campaign / age_group / gender / location: only these values, comma separated "
+        "(campaign takes names or ids)\n"
+        f"- metric: sort by one of {', '.join(SEGMENT_METRICS)} (default views)\n"
+        "- top: number of segments to return (default 20); order: desc (default) or asc\n"
+        "Use when asked:\n"
+        "- Which age group engages most with Campaign 3?\n"
+        "- Conversions by gender and location\n"
+        "- How do women aged 26-35 respond across campaigns?"
+    )
+    args_schema: Type[BaseModel] = SegmentAudienceInput
+    neo4j_graph: Any = Field(..., description="Neo4j graph instance (or CachedGraph wrapper)")
+    async_graph: Optional[Any] = Field(default=None, description="AsyncNeo4jGraph (or AsyncCachedGraph) used by _arun")
+
+    def _parse_options(self, query: str) -> Dict[str, Any]:
+        # A value runs to the next ';', newline or 'key=' so lists can use commas
+        pairs = {key.lower(): value.strip() for key, value in
+                 re.findall(r"(\w+)\s*[=:]\s*([^;\n]+?)\s*(?=;|\n|$|\b\w+\s*[=:])", query or "")}
+        options = {"by": ["age_group", "gender"], "filters": {}, "metric": "views", "top": 20, "order": "desc"}
+
+        by = pairs.get("by", pairs.get("group_by"))
+        if by is not None:
+            dimensions = [DIMENSION_ALIASES.get(word) for word in re.split(r"[\s,|+/&]+|\band\b", by.lower()) if word]
+            options["by"] = list(dict.fromkeys(d for d in dimensions if d))
+
+        for key, value in pairs.items():
+            dimension = DIMENSION_ALIASES.get(key)
+            if dimension is not None:
+                options["filters"][dimension] = [v.strip(" '\"") for v in re.split(r"[,|]", value) if v.strip(" '\"")]
+
+        metric = pairs.get("metric", pairs.get("sort", "")).lower()
+        if metric in SEGMENT_METRICS:
+            options["metric"] = metric
+        elif metric in ("viewers", "audience", "reach"):
+            options["metric"] = "users"
+        elif metric in ("revenue", "value", "conversion_value"):
+            options["metric"] = "total_conversion_value"
+
+        top = pairs.get("top") or pairs.get("limit")
+        if top is not None and top.isdigit():
+            options["top"] = max(1, int(top))
+        if pairs.get("order", "").lower() in ("asc", "desc"):
+            options["order"] = pairs["order"].lower()
+        return options
+
+    @staticmethod
+    def _query(options: Dict[str, Any]) -> tuple:
+        return segment_query(options["by"]), segment_filters(options["filters"])
+
+    @staticmethod
+    def _ratio(numerator, denominator):
+        return float(numerator) / float(denominator) if denominator else None
+
+    def _segments(self, options: Dict[str, Any], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        segments = []
+        for r in rows:
+            if not r["users"]:
+                continue
+            segment = {k: r[k] for k in r if k not in SEGMENT_MEASURES}
+            segment.update({m: r[m] or 0 for m in SEGMENT_MEASURES})
+            segment["total_conversion_value"] = float(segment["total_conversion_value"])
+            segment["ctr"] = self._ratio(segment["clicks"], segment["views"])
+            # Rated per view, like rank_campaigns
+            segment["conversion_rate"] = self._ratio(segment["conversions"], segment["views"])
+            segments.append(segment)
+
+        metric = options["metric"]
+        ranked = sorted((s for s in segments if s[metric] is not None), key=lambda s: s[metric],
+                        reverse=options["order"] == "desc")
+        ranked += [s for s in segments if s[metric] is None]
+        return {"options": options, "total": len(segments), "segments": ranked[:options["top"]]}
+
+    def segment(self, query: str = "") -> Dict[str, Any]:
+        """Roll the cube up to the requested dimensions and return the sorted segments"""
+        options = self._parse_options(query)
+        cypher, params = self._query(options)
+        rows = self.neo4j_graph.query(cypher, params=params)
+        if not any(r["users"] for r in rows) and not self.neo4j_graph.query(CUBE_BUILT_QUERY)[0]["built"]:
+            raise RuntimeError("the segmentation cube is empty; import the data or recompute the rollups")
+        return self._segments(options, rows)
+
+    async def asegment(self, query: str = "") -> Dict[str, Any]:
+        """segment on the async graph"""
+        options = self._parse_options(query)
+        cypher, params = self._query(options)
+        rows = await self.async_graph.query(cypher, params=params)
+        if not any(r["users"] for r in rows) and not (await self.async_graph.query(CUBE_BUILT_QUERY))[0]["built"]:
+            raise RuntimeError("the segmentation cube is empty; import the data or recompute the rollups")
+        return self._segments(options, rows)
+
+    def _format_table(self, result: Dict[str, Any]) -> str:
+        options = result["options"]
+        if not result["segments"]:
+            return "No segments matched the filters."
+
+        def fmt(value, pattern):
+            return "N/A" if value is None else pattern.format(value)
+
+        dimensions = options["by"]
+        filters = "; ".join(f"{k} in {', '.join(v)}" for k, v in options["filters"].items())
+        lines = [
+            f"Segments by {', '.join(dimensions) or 'total'}"
+            + (f" ({filters})" if filters else "")
+            + f", sorted by {options['metric']} ({options['order']}), "
+            f"top {len(result['segments'])} of {result['total']}:",
+            " | ".join(dimensions + ["viewers", "views", "clicks", "conversions", "value", "ctr", "conv_rate"]),
+        ]
+        for s in result["segments"]:
+            keys = [f"{s['campaign_name']} ({s['campaign_id']})" if d == "campaign" else str(s[d])
+                    for d in dimensions]
+            lines.append(" | ".join(keys + [
+                str(s["users"]),
+                str(s["views"]),
+                str(s["clicks"]),
+                str(s["conversions"]),
+                fmt(s["total_conversion_value"], "${:,.2f}"),
+                fmt(s["ctr"], "{:.1%}"),
+                fmt(s["conversion_rate"], "{:.1%}"),
+            ]))
+        return "\n".join(lines)
+
+    def _run(self, query: str = "") -> str:
+        try:
+            return self._format_table(self.segment(query))
+        except Exception as e:
+            return f"❌ Failed to segment the audience: {str(e)}"
+
+    async def _arun(self, query: str = "") -> str:
+        if self.async_graph is None:
+            return await asyncio.to_thread(self._run, query)
+        try:
+            return self._format_table(await self.asegment(query))
+        except Exception as e:
+            return f"❌ Failed to segment the audience: {str(e)}"
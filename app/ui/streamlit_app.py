@@ -12,8 +12,12 @@ st.set_page_config(page_title="Marketing Analytics Agent System", layout="center
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data_loader import load_data, insert_data, load_graph
-from main import init_agent
+from data_loader import load_graph, stream_insert_data, delta_insert_data, read_checkpoint, DEFAULT_DATA_PATH
+from main import init_agent, query_cache, answer_cache
+from rollups import recompute_rollups
+from cypher_params import plan_cache_stats
+from intent_router import router_stats
+from instrumentation import request_metrics
 
 # Define the logger
 logger = get_logger(__name__)
@@ -22,17 +26,50 @@ def render_data_loader():
     st.header("Data Catalogue Data Loader")
     st.caption("Go to http://localhost:7474/ to explore the graph.")
 
+    batch_size = st.number_input("Batch size", min_value=100, max_value=50000, value=1000, step=100)
+    delta = st.checkbox("Delta import (only write rows changed since the last delta import)")
+
+    checkpoint = read_checkpoint(DEFAULT_DATA_PATH)
+    resume = True
+    if checkpoint and not delta:
+        st.info(f"A previous import was interrupted after {checkpoint['nodes']} nodes and "
+                f"{checkpoint['relationships']} relationships.")
+        resume = st.checkbox("Resume from the last committed chunk", value=True)
+
     if st.button("Import", type="primary"):
         with st.spinner("Loading... This might take a minute or two."):
             try:
-                data = load_data()
                 graph = load_graph()
-                success = insert_data(data=data, neo4j_graph=graph)
-                st.success("Import successful", icon="✅")
+                if delta:
+                    stats = delta_insert_data(DEFAULT_DATA_PATH, neo4j_graph=graph, batch_size=int(batch_size))
+                    st.success("Import successful", icon="✅")
+                    for section in ("nodes", "relationships"):
+                        counts = stats[section]
+                        st.caption(f"{section.capitalize()}: {counts['new']} new, {counts['changed']} changed, "
+                                   f"{counts['deleted']} deleted, {counts['unchanged']} unchanged"
+                                   + (f", {counts['duplicate']} duplicate" if counts.get('duplicate') else ""))
+                    st.caption(f"Applied in {stats['seconds']}s")
+                else:
+                    stats = stream_insert_data(DEFAULT_DATA_PATH, neo4j_graph=graph,
+                                               batch_size=int(batch_size), resume=resume)
+                    st.success("Import successful", icon="✅")
+                    st.caption(f"Imported {stats['nodes']} nodes and {stats['relationships']} relationships "
+                               f"in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec)")
                 st.caption("Go to http://localhost:7474/ to interact with the database")
             except Exception as e:
                 st.error(f"Error: {e}", icon="🚨")
 
+    if st.button("Recompute rollups"):
+        with st.spinner("Recomputing campaign and user rollups..."):
+            try:
+                result = recompute_rollups(load_graph(), verify=True)
+                st.success(f"Recomputed {result['campaigns']} campaign and {result['users']} user rollups", icon="✅")
+                if result['stale_campaigns'] or result['stale_users']:
+                    st.warning(f"Stale campaign rollups: {result['stale_campaigns']}\n\n"
+                               f"Stale user rollups: {result['stale_users']}")
+            except Exception as e:
+                st.error(f"Error: {e}", icon="🚨")
+
 async def render_marketing_analysis():
     st.markdown("<h1 style='text-align: center;'>📊 Marketing Analytics Agent System</h1>", unsafe_allow_html=True)
     st.markdown("<p style='text-align: center;'>A marketing campaign analysis assistant based on Neo4j graph database</p>", unsafe_allow_html=True)
@@ -110,16 +147,40 @@ async def render_marketing_analysis():
     # User input box
     user_input = st.text_area("✍️ Please enter your analysis request:", height=100, placeholder="e.g.: What ads did user_23 click recently?")
 
+    bypass_cache = st.checkbox("Bypass answer cache", value=False,
+                               help="Always run the agent, even if this question was answered recently")
+
     # Analyze button
     if st.button("🔍 Analyze", type="primary"):
         if user_input.strip():
-            with st.spinner("Analyzing, please wait..."):
-                try:
-                    result = await st.session_state.agent.analyze(query=user_input)
-
-                    # Analysis result
-                    st.markdown("### ✅ Analysis Result")
-                    st.write(result["analysis"])
+            # Tool progress and the answer are shown as the agent produces them
+            status = st.status("Analyzing, please wait...", expanded=False)
+            st.markdown("### ✅ Analysis Result")
+            caption = st.empty()
+            answer_box = st.empty()
+            answer = ""
+            async for event in st.session_state.agent.astream_analyze(query=user_input,
+                                                                      use_cache=not bypass_cache):
+                if event["type"] == "tool_start":
+                    status.update(label=f"Running `{event['tool']}`...")
+                    status.markdown(f"**Tool:** `{event['tool']}` — input `{event['input']}`")
+                elif event["type"] == "tool_end":
+                    status.markdown(f"`{event['tool']}` finished")
+                elif event["type"] == "token":
+                    answer += event["text"]
+                    answer_box.markdown(answer + "▌")
+                elif event["type"] == "error":
+                    status.update(label="Analysis failed", state="error")
+                    answer_box.empty()
+                    st.error(f"Error: {event['error']}")
+                elif event["type"] == "final":
+                    result = event["result"]
+                    status.update(label="Analysis complete", state="complete")
+                    if result.get("cached"):
+                        caption.caption(f"Answered from the answer cache ({result['cached']} match)")
+                    elif result.get("routed"):
+                        caption.caption(f"Answered on the fast path ({result['routed']} question)")
+                    answer_box.write(result["analysis"])
 
                     # Intermediate steps
                     with st.expander("📂 View Analysis Steps"):
@@ -128,8 +189,6 @@ async def render_marketing_analysis():
                             st.markdown(f"**Input:** `{step[0].tool_input}`")
                             st.markdown(f"**Output:**\n```{step[1]}\n```")
                             st.markdown("---")
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
         else:
             st.warning("⚠️ Please enter a valid analysis request.")
 
@@ -164,19 +223,49 @@ def render_chat_history():
 
 def render_tool_debug():
     st.header("🧪 Tool Call Debug")
-    if "agent" in st.session_state:
-        try:
-            result = st.session_state.agent.last_result  # Assume you save the last result in analyze()
-            st.markdown("### 🔧 Tool Call Process")
-            for step in result["intermediate_steps"]:
-                st.markdown(f"**Tool:** `{step[0].tool}`")
-                st.markdown(f"**Input:** `{step[0].tool_input}`")
-                st.markdown(f"**Output:**\n```{step[1]}\n```")
-                st.markdown("---")
-        except Exception:
-            st.info("No tool usage records yet. Please ask a question in Marketing Analysis first.")
-    else:
+    result = st.session_state.agent.last_result if "agent" in st.session_state else None
+    if "agent" not in st.session_state:
         st.info("Agent is not initialized.")
+    elif result is None:
+        st.info("No tool usage records yet. Please ask a question in Marketing Analysis first.")
+    else:
+        trace = result["trace"]
+        st.markdown("### ⏱️ Latency Breakdown (last request)")
+        st.caption(f"{trace['question']} — answered by {trace['outcome']}")
+        cols = st.columns(4)
+        cols[0].metric("Total", f"{trace['total_ms']:.0f} ms")
+        cols[1].metric("LLM", f"{trace['llm_ms']:.0f} ms", f"{trace['llm_calls']} calls", delta_color="off")
+        cols[2].metric("Tools", f"{trace['tool_ms']:.0f} ms", f"{trace['tool_calls']} calls", delta_color="off")
+        cols[3].metric("Graph", f"{trace['graph_ms']:.0f} ms", f"{trace['graph_queries']} queries", delta_color="off")
+        st.caption(f"Tokens: {trace['prompt_tokens']} prompt / {trace['completion_tokens']} completion · "
+                   f"rows returned: {trace['rows']} · query cache hits: {trace['query_cache_hits']}")
+        if trace["steps"]:
+            st.dataframe(trace["steps"], use_container_width=True)
+
+        st.markdown("### 🔧 Tool Call Process")
+        for step in result["intermediate_steps"]:
+            st.markdown(f"**Tool:** `{step[0].tool}`")
+            st.markdown(f"**Input:** `{step[0].tool_input}`")
+            st.markdown(f"**Output:**\n```{step[1]}\n```")
+            st.markdown("---")
+
+    st.markdown("### 📈 Request Latency (recent requests)")
+    st.json(request_metrics.summary())
+    st.download_button("Download traces (JSONL)", request_metrics.to_jsonl(), file_name="agent_traces.jsonl")
+    with st.expander("Prometheus metrics"):
+        st.code(request_metrics.to_prometheus(), language="text")
+
+    st.markdown("### 🗄️ Query Result Cache")
+    st.json(query_cache.stats())
+
+    st.markdown("### 💬 Answer Cache")
+    st.json(answer_cache.stats())
+
+    st.markdown("### ⚡ Fast-Path Router")
+    st.json(router_stats.stats())
+
+    st.markdown("### 🧩 graph_query Plan Reuse")
+    st.json(plan_cache_stats.stats())
 
 def main():
     # Create sidebar navigation
@@ -0,0 +1,141 @@
+from typing import Any, Dict
+
+
+# Behavior counters of the user bound to `u`, as a map of subquery expressions that
+# each follow one edge type from the user:
+#   - views: ads viewed
+#   - clicks / total_clicks: ads clicked and the sum of their click_count
+#   - conversions / total_conversion_value: products converted and their value
+USER_COUNTERS = """{
+    views: COUNT { (u)-[:VIEWED]->(:Ad) },
+    clicks: COUNT { (u)-[:CLICKED]->(:Ad) },
+    total_clicks: reduce(total = 0, n IN COLLECT {
+        MATCH (u)-[c:CLICKED]->(:Ad) RETURN coalesce(toInteger(c.click_count), 0)
+    } | total + n),
+    conversions: COUNT { (u)-[:CONVERTED]->(:Product) },
+    total_conversion_value: reduce(total = 0.0, v IN COLLECT {
+        MATCH (u)-[conv:CONVERTED]->(:Product) RETURN coalesce(toFloat(conv.conversion_value), 0.0)
+    } | total + v)
+}"""
+
+# USER_COUNTERS restricted to engagement dated inside [$since, $until]
+USER_WINDOW_COUNTERS = """{
+    views: COUNT { (u)-[v:VIEWED]->(:Ad) WHERE v.date_first_viewed >= $since AND v.date_first_viewed <= $until },
+    clicks: COUNT { (u)-[c:CLICKED]->(:Ad) WHERE c.date_last_clicked >= $since AND c.date_last_clicked <= $until },
+    total_clicks: reduce(total = 0, n IN COLLECT {
+        MATCH (u)-[c:CLICKED]->(:Ad)
+        WHERE c.date_last_clicked >= $since AND c.date_last_clicked <= $until
+        RETURN coalesce(toInteger(c.click_count), 0)
+    } | total + n),
+    conversions: COUNT {
+        (u)-[conv:CONVERTED]->(:Product) WHERE conv.conversion_date >= $since AND conv.conversion_date <= $until
+    },
+    total_conversion_value: reduce(total = 0.0, v IN COLLECT {
+        MATCH (u)-[conv:CONVERTED]->(:Product)
+        WHERE conv.conversion_date >= $since AND conv.conversion_date <= $until
+        RETURN coalesce(toFloat(conv.conversion_value), 0.0)
+    } | total + v)
+}"""
+
+# Counters stored on the (:UserStats {id}) rollup node of each user
+USER_COUNTER_FIELDS = ["views", "clicks", "total_clicks", "conversions", "total_conversion_value"]
+
+USER_FULLTEXT_MATCH = """
+        WITH input
+        CALL db.index.fulltext.queryNodes($name_index, input.search) YIELD node
+        RETURN node AS u, 2 AS priority
+"""
+
+# Stand-in for the full-text lookup on a database created before the index existed
+USER_SCAN_MATCH = """
+        WITH input
+        MATCH (u:User) WHERE toLower(u.name) CONTAINS toLower(input.text)
+        RETURN u, 2 AS priority
+"""
+
+# Resolve and summarize a batch of users in one round trip.
+#
+# $inputs is a list of {text, search} maps (search from graph_schema.fulltext_search_term).
+# Each input is resolved through the id constraint, then the exact name (text index),
+# then the full-text name index, keeping only the users found by the most exact lookup.
+# For each of those users (at most $max_candidates per input) the counters are read
+# from the UserStats rollup, or aggregated live when the rollup is missing. Inputs that
+# match no user produce no rows.
+USER_LOOKUP = """
+UNWIND $inputs AS input
+CALL {
+    WITH input
+    CALL {
+        WITH input
+        MATCH (u:User {id: input.text}) RETURN u, 0 AS priority
+        UNION
+        WITH input
+        MATCH (u:User {name: input.text}) RETURN u, 1 AS priority
+        UNION""" + USER_FULLTEXT_MATCH + """    }
+    WITH u, min(priority) AS priority
+    WITH priority, collect(u) AS users
+    ORDER BY priority
+    LIMIT 1
+    RETURN users
+}
+UNWIND users[..$max_candidates] AS u
+"""
+
+USER_BEHAVIOR_RETURN = """
+RETURN input.text AS input, match_count,
+       u.id AS user_id, u.name AS name, u.age AS age, u.location AS location,
+       m.views AS views, m.clicks AS clicks, m.total_clicks AS total_clicks,
+       m.conversions AS conversions, m.total_conversion_value AS total_conversion_value
+"""
+
+USER_BEHAVIOR_QUERY = USER_LOOKUP + """
+OPTIONAL MATCH (s:UserStats {id: u.id})
+WITH input, size(users) AS match_count, u,
+     CASE WHEN s IS NULL THEN """ + USER_COUNTERS + """
+     ELSE s {.views, .clicks, .total_clicks, .conversions, .total_conversion_value} END AS m
+""" + USER_BEHAVIOR_RETURN
+
+# USER_BEHAVIOR_QUERY within a date window ($since, $until), always aggregated live
+USER_BEHAVIOR_WINDOW_QUERY = USER_LOOKUP + """
+WITH input, size(users) AS match_count, u, """ + USER_WINDOW_COUNTERS + """ AS m
+""" + USER_BEHAVIOR_RETURN
+
+
+def user_scan_query(query: str) -> str:
+    """A USER_LOOKUP based query with the full-text lookup replaced by a label scan"""
+    return query.replace(USER_FULLTEXT_MATCH, USER_SCAN_MATCH)
+
+
+def user_result(r: Dict[str, Any], window=None) -> Dict[str, Any]:
+    """
+    Build the analyze_user_behavior result dict from a user behavior row
+
+    With a date_window.DateWindow the counters are those of the window.
+    """
+    views = r["views"] or 0
+    clicks = r["clicks"] or 0
+    total_clicks = r["total_clicks"] or 0
+    conversions = r["conversions"] or 0
+    total_conversion_value = float(r["total_conversion_value"] or 0)
+    period = f"{window.describe().capitalize()}, " if window else ""
+
+    result = {
+        "user_id": r.get("user_id"),
+        "name": r.get("name", "Unknown"),
+        "age": r.get("age", "N/A"),
+        "location": r.get("location", "N/A"),
+        "views": views,
+        "clicks": clicks,
+        "total_clicks": total_clicks,
+        "conversions": conversions,
+        "total_conversion_value": total_conversion_value,
+        "summary": (
+            f"{period}{r.get('name')} (age {r.get('age')}) viewed {views} ads, "
+            f"clicked {total_clicks} times on {clicks} ads, "
+            f"and converted on {conversions} products totaling "
+            f"${total_conversion_value:.2f}."
+        )
+    }
+    if window:
+        result["date_window"] = window.describe()
+    return result
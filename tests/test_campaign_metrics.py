@@ -0,0 +1,111 @@
+"""
+CAMPAIGN_METRICS_QUERY against the OPTIONAL MATCH chain it replaced, on Neo4j
+
+Both queries run on the dummy data imported into a test database. Set NEO4J_TEST_URI,
+NEO4J_TEST_USERNAME and NEO4J_TEST_PASSWORD (and optionally NEO4J_TEST_DATABASE) to
+run them; the tests wipe that database, so never point them at real data. Without
+them the tests are skipped.
+"""
+import json
+import os
+
+import pytest
+
+import data_loader
+from campaign_metrics import CAMPAIGN_LOOKUP, CAMPAIGN_METRICS_QUERY
+from data_loader import DEFAULT_DATA_PATH, bulk_insert_data
+from graph_schema import CAMPAIGN_NAME_FULLTEXT, fulltext_search_term
+from schema_snapshot import SchemaSnapshot
+
+
+# The query CAMPAIGN_METRICS_QUERY replaced, as analyze_campaign ran it before
+OLD_CAMPAIGN_METRICS_QUERY = CAMPAIGN_LOOKUP + """
+OPTIONAL MATCH (c)-[:TARGETS]->(d:Demographic)
+OPTIONAL MATCH (a:Ad)-[:PART_OF]->(c)
+OPTIONAL MATCH (u:User)-[v:VIEWED]->(a)
+OPTIONAL MATCH (u)-[cl:CLICKED]->(a)
+OPTIONAL MATCH (u)-[conv:CONVERTED]->(p:Product)
+RETURN
+    c.name AS campaign_name,
+    collect(DISTINCT d.age_group + "-" + d.gender) AS targets,
+    count(DISTINCT a) AS ad_count,
+    count(DISTINCT v) AS views,
+    count(DISTINCT cl) AS clicks,
+    sum(toInteger(cl.click_count)) AS total_clicks,
+    count(DISTINCT p) AS conversions,
+    sum(toFloat(conv.conversion_value)) AS total_conversion_value
+"""
+
+# The intended conversion value: every conversion of the campaign's distinct viewers, once
+VIEWER_CONVERSION_VALUE_QUERY = """
+MATCH (c:Campaign {id: $campaign_name})
+OPTIONAL MATCH (u:User)-[:VIEWED]->(:Ad)-[:PART_OF]->(c)
+WITH DISTINCT u
+OPTIONAL MATCH (u)-[conv:CONVERTED]->(:Product)
+RETURN sum(toFloat(conv.conversion_value)) AS total_conversion_value
+"""
+
+COUNTERS = ("ad_count", "views", "clicks", "total_clicks", "conversions")
+
+
+@pytest.fixture(scope="module")
+def neo4j_graph():
+    url = os.getenv("NEO4J_TEST_URI")
+    if not url:
+        pytest.skip("NEO4J_TEST_URI is not set")
+    from langchain_community.graphs import Neo4jGraph
+
+    graph = Neo4jGraph(url=url, username=os.getenv("NEO4J_TEST_USERNAME", "neo4j"),
+                       password=os.getenv("NEO4J_TEST_PASSWORD"), database=os.getenv("NEO4J_TEST_DATABASE"),
+                       refresh_schema=False)
+    graph.query("MATCH (n) DETACH DELETE n")
+    with open(DEFAULT_DATA_PATH) as f:
+        data = json.load(f)
+    # Keep the import from touching the app's persisted schema snapshot
+    patch = pytest.MonkeyPatch()
+    patch.setattr(data_loader, "get_schema_snapshot", lambda: SchemaSnapshot(None))
+    try:
+        bulk_insert_data(data, graph)
+    finally:
+        patch.undo()
+    graph.query("CALL db.awaitIndexes(300)")
+    yield graph
+    graph.query("MATCH (n) DETACH DELETE n")
+
+
+def _campaigns(neo4j_graph):
+    rows = neo4j_graph.query("MATCH (c:Campaign) RETURN c.id AS id")
+    return sorted((r["id"] for r in rows), key=lambda i: int(i.split("_")[1]))
+
+
+def _metrics(neo4j_graph, query, campaign):
+    rows = neo4j_graph.query(query, params={
+        "campaign_name": campaign, "search": fulltext_search_term(campaign), "name_index": CAMPAIGN_NAME_FULLTEXT})
+    assert len(rows) == 1
+    return rows[0]
+
+
+def test_counters_match_the_old_query(neo4j_graph):
+    for campaign in _campaigns(neo4j_graph):
+        old = _metrics(neo4j_graph, OLD_CAMPAIGN_METRICS_QUERY, campaign)
+        new = _metrics(neo4j_graph, CAMPAIGN_METRICS_QUERY, campaign)
+        assert sorted(new["targets"]) == sorted(old["targets"]), campaign
+        for field in COUNTERS:
+            assert (new[field] or 0) == (old[field] or 0), (campaign, field)
+
+
+def test_conversion_value_counts_each_conversion_once(neo4j_graph):
+    # Intended change: the old chain added a viewer's conversions once per row the viewer
+    # appears in (every campaign ad viewed, every click), inflating the value
+    inflated = []
+    for campaign in _campaigns(neo4j_graph):
+        old = _metrics(neo4j_graph, OLD_CAMPAIGN_METRICS_QUERY, campaign)["total_conversion_value"] or 0.0
+        new = _metrics(neo4j_graph, CAMPAIGN_METRICS_QUERY, campaign)["total_conversion_value"] or 0.0
+        intended = neo4j_graph.query(VIEWER_CONVERSION_VALUE_QUERY,
+                                     params={"campaign_name": campaign})[0]["total_conversion_value"] or 0.0
+        assert new == pytest.approx(intended), campaign
+        assert old >= new - 1e-6, campaign
+        if old > new + 1e-6:
+            inflated.append(campaign)
+    assert inflated == ["campaign_2", "campaign_3", "campaign_4", "campaign_7", "campaign_13",
+                        "campaign_14", "campaign_16", "campaign_17", "campaign_18"]
@@ -0,0 +1,97 @@
+import data_loader
+from data_loader import DEFAULT_DATA_PATH, delta_insert_data
+from query_cache import BUMP_DATA_VERSION, READ_DATA_VERSION
+from schema_snapshot import SchemaSnapshot
+
+
+class _Transaction:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def run(self, query, **params):
+        self.graph.writes.append((query, params["rows"]))
+        return self
+
+    def consume(self):
+        return None
+
+
+class _Session:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, fn, *args):
+        return fn(_Transaction(self.graph), *args)
+
+
+class _Driver:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def session(self, database=None):
+        return _Session(self.graph)
+
+
+class FakeGraph:
+    """Records the batched writes and keeps the data version; other queries return nothing"""
+
+    def __init__(self):
+        self.version = 0
+        self.writes = []
+        self._driver = _Driver(self)
+        self._database = "neo4j"
+
+    def query(self, query, params=None):
+        if query == READ_DATA_VERSION:
+            return [{"version": self.version}]
+        if query == BUMP_DATA_VERSION:
+            self.version += 1
+            return [{"version": self.version}]
+        if "AS ids" in query:
+            return [{"ids": []}]
+        return []
+
+
+def test_reimporting_an_unchanged_file_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, "get_schema_snapshot", lambda: SchemaSnapshot(None))
+    graph = FakeGraph()
+    manifest_path = tmp_path / "manifest.sqlite"
+
+    first = delta_insert_data(DEFAULT_DATA_PATH, graph, manifest_path=manifest_path)
+    assert first["relationships"]["duplicate"] == 8
+    assert first["relationships"]["changed"] == 0
+
+    for _ in range(3):
+        graph.writes.clear()
+        stats = delta_insert_data(DEFAULT_DATA_PATH, graph, manifest_path=manifest_path)
+        for section in ("nodes", "relationships"):
+            assert stats[section]["new"] == 0
+            assert stats[section]["changed"] == 0
+            assert stats[section]["deleted"] == 0
+        assert stats["relationships"]["unchanged"] == first["relationships"]["new"]
+        assert stats["relationships"]["duplicate"] == 8
+        assert graph.writes == []
+
+
+def test_duplicate_relationships_keep_the_first_row(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, "get_schema_snapshot", lambda: SchemaSnapshot(None))
+    graph = FakeGraph()
+    data_path = tmp_path / "graph.json"
+    data_path.write_text("""{
+        "nodes": [{"id": "u1", "label": "User", "properties": {}},
+                  {"id": "a1", "label": "Ad", "properties": {}}],
+        "relationships": [{"from": "u1", "to": "a1", "label": "VIEWED", "properties": {"n": 1}},
+                          {"from": "u1", "to": "a1", "label": "VIEWED", "properties": {"n": 2}}]
+    }""")
+
+    stats = delta_insert_data(data_path, graph, manifest_path=tmp_path / "manifest.sqlite", batch_size=1)
+
+    assert stats["relationships"] == {"new": 1, "changed": 0, "unchanged": 0, "deleted": 0, "duplicate": 1}
+    written = [row for query, rows in graph.writes if "VIEWED" in query for row in rows]
+    assert [row["properties"] for row in written] == [{"n": 1}]
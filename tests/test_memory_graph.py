@@ -0,0 +1,133 @@
+"""
+MemoryGraph's campaign metrics handler against the OPTIONAL MATCH chain it replaced
+
+MemoryGraph does not run Cypher: it answers CAMPAIGN_METRICS_QUERY with a Python
+handler. These tests check that handler against a row-by-row Python replay of the old
+chain on the dummy data. The Cypher of CAMPAIGN_METRICS_QUERY itself is compared with
+the old query on Neo4j in test_campaign_metrics.py. The last test checks the error for
+queries MemoryGraph has no handler for.
+"""
+import json
+
+import pytest
+
+from campaign_metrics import CAMPAIGN_METRICS_QUERY
+from data_loader import DEFAULT_DATA_PATH
+from memory_graph import MemoryGraph
+
+
+class LoadedGraph:
+    """The dummy data as a Neo4j import leaves it: one edge per (type, from, to), first row wins"""
+
+    def __init__(self, data):
+        self.labels = {node["id"]: node["label"] for node in data["nodes"]}
+        self.edges = {}
+        for r in data["relationships"]:
+            if r["from"] in self.labels and r["to"] in self.labels:
+                self.edges.setdefault((r["label"], r["from"], r["to"]), r.get("properties") or {})
+
+    def out(self, rel_type, source, label):
+        return [(key, props) for key, props in self.edges.items()
+                if key[0] == rel_type and key[1] == source and self.labels[key[2]] == label]
+
+    def into(self, rel_type, target, label):
+        return [(key, props) for key, props in self.edges.items()
+                if key[0] == rel_type and key[2] == target and self.labels[key[1]] == label]
+
+
+def old_query_rows(graph, campaign):
+    """
+    Rows of the old chain for one campaign, as (ad, view, click, conversion) with each
+    relationship a (key, properties) pair and None where an OPTIONAL MATCH found nothing:
+
+        OPTIONAL MATCH (c)-[:TARGETS]->(d:Demographic)
+        OPTIONAL MATCH (a:Ad)-[:PART_OF]->(c)
+        OPTIONAL MATCH (u:User)-[v:VIEWED]->(a)
+        OPTIONAL MATCH (u)-[cl:CLICKED]->(a)
+        OPTIONAL MATCH (u)-[conv:CONVERTED]->(p:Product)
+    """
+    rows = []
+    for _ in graph.out("TARGETS", campaign, "Demographic") or [None]:
+        for ad in [key[1] for key, _ in graph.into("PART_OF", campaign, "Ad")] or [None]:
+            for view in (graph.into("VIEWED", ad, "User") if ad else []) or [None]:
+                user = view and view[0][1]
+                clicks = [c for c in graph.out("CLICKED", user, "Ad") if c[0][2] == ad] if user else []
+                for click in clicks or [None]:
+                    for conversion in (graph.out("CONVERTED", user, "Product") if user else []) or [None]:
+                        rows.append((ad, view, click, conversion))
+    return rows
+
+
+def old_query_metrics(graph, campaign):
+    rows = old_query_rows(graph, campaign)
+    views = {view[0] for _, view, _, _ in rows if view}
+    clicks = [click for _, _, click, _ in rows if click]
+    conversions = [conversion for _, _, _, conversion in rows if conversion]
+    return {
+        "ad_count": len({ad for ad, _, _, _ in rows if ad}),
+        "views": len(views),
+        "clicks": len({key for key, _ in clicks}),
+        "total_clicks": sum(int(props["click_count"]) for _, props in clicks),
+        "conversions": len({key[2] for key, _ in conversions}),
+        # sum() over the rows: a conversion is added once per row its viewer appears in
+        "total_conversion_value": sum(float(props["conversion_value"]) for _, props in conversions),
+    }
+
+
+def viewer_conversion_value(graph, campaign):
+    """The intended value: every conversion of the campaign's distinct viewers, once"""
+    ads = [key[1] for key, _ in graph.into("PART_OF", campaign, "Ad")]
+    viewers = {key[1] for ad in ads for key, _ in graph.into("VIEWED", ad, "User")}
+    return sum(float(props["conversion_value"]) for user in viewers
+               for _, props in graph.out("CONVERTED", user, "Product"))
+
+
+with open(DEFAULT_DATA_PATH) as f:
+    DATA = json.load(f)
+GRAPH = LoadedGraph(DATA)
+CAMPAIGNS = sorted((i for i, label in GRAPH.labels.items() if label == "Campaign"), key=lambda i: int(i.split("_")[1]))
+
+
+@pytest.fixture(scope="module")
+def memory_graph():
+    return MemoryGraph.from_data(DATA)
+
+
+def new_query_metrics(memory_graph, campaign):
+    rows = memory_graph.query(CAMPAIGN_METRICS_QUERY, params={
+        "campaign_name": campaign, "search": campaign, "name_index": "campaign_name_fulltext"})
+    assert len(rows) == 1
+    return rows[0]
+
+
+@pytest.mark.parametrize("campaign", CAMPAIGNS)
+def test_handler_counters_match_the_old_query(memory_graph, campaign):
+    old = old_query_metrics(GRAPH, campaign)
+    new = new_query_metrics(memory_graph, campaign)
+    for field in ("ad_count", "views", "clicks", "total_clicks", "conversions"):
+        assert (new[field] or 0) == old[field], field
+
+
+@pytest.mark.parametrize("campaign", CAMPAIGNS)
+def test_handler_counts_each_conversion_once(memory_graph, campaign):
+    new = new_query_metrics(memory_graph, campaign)
+    assert new["total_conversion_value"] == pytest.approx(viewer_conversion_value(GRAPH, campaign))
+
+
+def test_handler_fixes_the_old_conversion_value(memory_graph):
+    # Intended change: the old chain repeated a viewer's conversions for every campaign
+    # ad they viewed (and every click row), so its value was inflated for 9 campaigns
+    inflated = []
+    for campaign in CAMPAIGNS:
+        old = old_query_metrics(GRAPH, campaign)["total_conversion_value"]
+        new = new_query_metrics(memory_graph, campaign)["total_conversion_value"]
+        assert old >= new - 1e-6
+        if old > new + 1e-6:
+            inflated.append(campaign)
+    assert inflated == ["campaign_2", "campaign_3", "campaign_4", "campaign_7", "campaign_13",
+                        "campaign_14", "campaign_16", "campaign_17", "campaign_18"]
+
+
+def test_unsupported_query_names_the_query(memory_graph):
+    with pytest.raises(ValueError, match=r"arbitrary Cypher: MATCH \(n\) RETURN count\(n\)"):
+        memory_graph.query("MATCH (n)\n    RETURN count(n)")
@@ -0,0 +1,35 @@
+"""
+CachedGraph hands out copies of cached rows, so callers cannot corrupt later hits
+"""
+from query_cache import CachedGraph
+
+
+class CountingGraph:
+    """Graph stub that answers every read with the same rows and counts the calls"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def query(self, query, params={}):
+        if "GraphMeta" in query:
+            return [{"version": 1}]
+        self.calls += 1
+        return [{"campaign_name": "Summer Sale", "targets": ["18-24-F"], "views": 3}]
+
+
+def test_mutating_a_result_does_not_change_later_hits():
+    graph = CountingGraph()
+    cached = CachedGraph(graph)
+    query = "MATCH (c:Campaign) RETURN c.name AS campaign_name"
+
+    first = cached.query(query)
+    first[0]["views"] = 0
+    first[0]["targets"].append("65+-M")
+    first.append({"campaign_name": "extra"})
+
+    second = cached.query(query)
+    second[0]["campaign_name"] = "changed"
+    third = cached.query(query)
+
+    assert graph.calls == 1
+    assert third == [{"campaign_name": "Summer Sale", "targets": ["18-24-F"], "views": 3}]
@@ -0,0 +1,34 @@
+import rollups
+from rollups import AFFECTED_CAMPAIGNS, RollupTracker
+
+
+class RecordingGraph:
+    def __init__(self):
+        self.params = None
+
+    def query(self, query, params=None):
+        if query == AFFECTED_CAMPAIGNS:
+            self.params = params
+            return [{"ids": ["campaign_1"]}]
+        return []
+
+
+def test_renamed_campaigns_and_changed_demographics_mark_segments_dirty(monkeypatch):
+    refreshed = {}
+    monkeypatch.setattr(rollups, "refresh_rollups",
+                        lambda graph, campaign_ids, user_ids: refreshed.update(campaigns=campaign_ids, users=user_ids))
+    tracker = RollupTracker()
+    tracker.track_nodes([
+        {"id": "campaign_1", "label": "Campaign", "properties": {"name": "Back to School"}},
+        {"id": "demo_1", "label": "Demographic", "properties": {"age_group": "18-24", "gender": "Female"}},
+        {"id": "user_1", "label": "User", "properties": {"location": "Denver"}},
+        {"id": "ad_1", "label": "Ad", "properties": {}},
+    ])
+    graph = RecordingGraph()
+    tracker.flush(graph)
+
+    assert graph.params["campaign_ids"] == ["campaign_1"]
+    assert graph.params["demographic_ids"] == ["demo_1"]
+    assert graph.params["converter_ids"] == ["user_1"]
+    assert refreshed["campaigns"] == ["campaign_1"]
+    assert not tracker.campaign_ids and not tracker.demographic_ids